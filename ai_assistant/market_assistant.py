@@ -1,23 +1,45 @@
 import os
+import time
 import logging
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
-from google import genai
 import pandas as pd
 import streamlit as st
-try:
-    from groq import Groq
-except ImportError:
-    Groq = None
+
+class LocalProvider:
+    """
+    Offline stand-in for an LLM client. Answers deterministically after an
+    optional delay, so the assistant can be exercised without network access.
+    Select it with AI_PROVIDER=local or MarketAssistant(client=LocalProvider()).
+    """
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def complete(self, prompt: str) -> str:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return f"[LOCAL] {prompt}"
+
 
 class MarketAssistant:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, client=None):
         if api_key is None:
             api_key = os.getenv("GROQ_API_KEY")
         self.api_key = api_key
         self.provider = "google"
         self.client = None
         self.available = False
+
+        if client is None and os.getenv("AI_PROVIDER", "").lower() == "local":
+            client = LocalProvider()
+        if client is not None:
+            self.provider = "local"
+            self.client = client
+            self.model_name = "local"
+            self.available = True
+            return
         
         if not self.api_key:
             print("AI/LLM connection failed: No API key provided or found in environment variables (GROQ_API_KEY or GOOGLE_API_KEY).")
@@ -25,8 +47,12 @@ class MarketAssistant:
             return
 
         try:
+            # Provider SDKs are imported here, not at module load: google.genai alone
+            # adds most of a second to the dashboard's cold start.
             if self.api_key.startswith("gsk_"):
-                if Groq is None:
+                try:
+                    from groq import Groq
+                except ImportError:
                     print("Groq library not found. Install with `pip install groq`")
                 else:
                     self.provider = "groq"
@@ -35,6 +61,7 @@ class MarketAssistant:
                     self.available = True
                     print("AI Assistant: Connected to Groq 🚀")
             else:
+                from google import genai
                 self.client = genai.Client(api_key=self.api_key)
                 self.model_name = "gemini-1.5-flash"
                 self.available = True
@@ -44,6 +71,48 @@ class MarketAssistant:
             print(f"AI/LLM connection failed: {e}")
             self.available = False
 
+    def commentary_prompt(self, z_score: float, correlation: float) -> str:
+        return (
+            f"You are a crypto quant trader. "
+            f"Metrics: Z-Score {z_score:.2f} (Threshold 2.0), Correlation {correlation:.2f}. "
+            f"Explain regime and action in 1 sentence."
+        )
+
+    def question_prompt(self, question: str, context: dict) -> str:
+        z = context.get('z_score', 0)
+        corr = context.get('correlation', 0)
+        return (
+            f"Context: Z-Score {z:.2f}, Correlation {corr:.2f}. "
+            f"Question: {question}. Answer as Risk Manager in 1 sentence."
+        )
+
+    def complete(self, prompt: str) -> str:
+        """
+        Send one prompt to the configured provider. Raises on provider errors.
+        """
+        if self.provider == "groq":
+            response = self.client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.model_name,
+            )
+            return response.choices[0].message.content
+        elif self.provider == "local":
+            return self.client.complete(prompt)
+        else:
+            response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=prompt
+            )
+            return response.text
+
+    @staticmethod
+    def describe_error(e: Exception) -> str:
+        if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
+            return "⚠️ API Quota Exceeded. Try again later."
+        if "503" in str(e) or "UNAVAILABLE" in str(e):
+            return "⚠️ AI Service Overloaded. Try again later."
+        return f"Error: {e}"
+
     def generate_commentary(self, z_score: float, correlation: float, stationarity: dict) -> str:
         if not self.available:
             return "AI Assistant unavailable."
@@ -51,36 +120,19 @@ class MarketAssistant:
         if pd.isna(z_score):
             return "Insufficient data."
 
-        context_prompt = (
-            f"You are a crypto quant trader. "
-            f"Metrics: Z-Score {z_score:.2f} (Threshold 2.0), Correlation {correlation:.2f}. "
-            f"Explain regime and action in 1 sentence."
-        )
-        
         try:
-            if self.provider == "groq":
-                response = self.client.chat.completions.create(
-                    messages=[{"role": "user", "content": context_prompt}],
-                    model=self.model_name,
-                )
-                return response.choices[0].message.content
-            else:
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=context_prompt
-                )
-                return response.text
+            return self.complete(self.commentary_prompt(z_score, correlation))
         except Exception as e:
             print(f"AI Error: {e}. Switching to fallback.")
             if "authentication" in str(e).lower() or "key" in str(e).lower():
                 st.toast(f"❌ AI Auth Error: Check API Key", icon="⚠️")
             else:
                 st.toast(f"⚠️ AI Error: {e}", icon="🤖")
-            return self._generate_fallback(z_score, correlation)
+            return self.generate_fallback(z_score, correlation)
 
-    def _generate_fallback(self, z: float, corr: float) -> str:
+    def generate_fallback(self, z: float, corr: float) -> str:
         """
-        Deterministic fallback logic when AI is unavailable.
+        Deterministic commentary for when the AI provider is unavailable or fails.
         """
         action = "HOLD"
         regime = "Neutral"
@@ -107,31 +159,7 @@ class MarketAssistant:
         if not self.available:
             return "AI Assistant offline."
 
-        z = context.get('z_score', 0)
-        corr = context.get('correlation', 0)
-        
-        prompt = (
-            f"Context: Z-Score {z:.2f}, Correlation {corr:.2f}. "
-            f"Question: {question}. Answer as Risk Manager in 1 sentence."
-        )
-        
         try:
-            if self.provider == "groq":
-                response = self.client.chat.completions.create(
-                    messages=[{"role": "user", "content": prompt}],
-                    model=self.model_name,
-                )
-                return response.choices[0].message.content
-            else:
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=prompt
-                )
-                return response.text
+            return self.complete(self.question_prompt(question, context))
         except Exception as e:
-            if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                return "⚠️ API Quota Exceeded. Try again later."
-            if "503" in str(e) or "UNAVAILABLE" in str(e):
-                return "⚠️ AI Service Overloaded. Try again later."
-            return f"Error: {e}"
-
+            return self.describe_error(e)
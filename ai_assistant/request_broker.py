@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Hashable
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED_MSG = "⚠️ Too many AI requests. Try again in a few seconds."
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire after `ttl` seconds.
+    """
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def values(self) -> list:
+        with self._lock:
+            return [value for value, _ in self._data.values()]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: `rate` tokens per second, bursts up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _wait_time(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """
+        Take one token, waiting up to `timeout` seconds. Returns False if none became available.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                wait = self._wait_time()
+            if wait == 0.0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class AssistantBroker:
+    """
+    Runs MarketAssistant calls on a background pool so the dashboard never blocks.
+
+    Responses are cached on quantised metrics (plus the question), identical
+    in-flight requests share one Future, and a token bucket keeps the provider
+    below its quota. Callers poll `Future.done()` and render a pending state.
+    """
+    Z_BUCKET = 0.25
+    CORR_BUCKET = 0.05
+
+    def __init__(self, assistant, max_workers: int = 2, cache_size: int = 256, ttl: float = 300.0,
+                 rate_per_minute: float = 20, burst: int = 5, rate_wait: float = 10.0):
+        self.assistant = assistant
+        self.cache = TTLCache(cache_size, ttl)
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.rate_wait = rate_wait
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-broker")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quantize(value: float, step: float) -> float:
+        if pd.isna(value):
+            return 0.0
+        return round(round(value / step) * step, 4)
+
+    def submit_commentary(self, z_score: float, correlation: float) -> Future:
+        z = self._quantize(z_score, self.Z_BUCKET)
+        corr = self._quantize(correlation, self.CORR_BUCKET)
+        if not self.assistant.available:
+            return self._resolved("AI Assistant unavailable.")
+        prompt = self.assistant.commentary_prompt(z, corr)
+        fallback = lambda e: self.assistant.generate_fallback(z, corr)
+        return self._submit(('commentary', z, corr), prompt, fallback)
+
+    def submit_question(self, question: str, context: dict) -> Future:
+        z = self._quantize(context.get('z_score', 0), self.Z_BUCKET)
+        corr = self._quantize(context.get('correlation', 0), self.CORR_BUCKET)
+        if not self.assistant.available:
+            return self._resolved("AI Assistant offline.")
+        prompt = self.assistant.question_prompt(question, {'z_score': z, 'correlation': corr})
+        key = ('question', ' '.join(question.lower().split()), z, corr)
+        return self._submit(key, prompt, self.assistant.describe_error)
+
+    @staticmethod
+    def _resolved(value: str) -> Future:
+        future = Future()
+        future.set_result(value)
+        return future
+
+    def _submit(self, key: Hashable, prompt: str, on_error: Callable[[Exception], str]) -> Future:
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self._resolved(cached)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                # _call caches before leaving _inflight, so a call that finished since the
+                # check above is found here rather than repeated
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return self._resolved(cached)
+                future = self._executor.submit(self._call, key, prompt, on_error)
+                self._inflight[key] = future
+        return future
+
+    def _call(self, key: Hashable, prompt: str, on_error: Callable[[Exception], str]) -> str:
+        try:
+            if not self.bucket.acquire(timeout=self.rate_wait):
+                return RATE_LIMITED_MSG
+            try:
+                answer = self.assistant.complete(prompt)
+            except Exception as e:
+                logger.error(f"AI Error: {e}")
+                return on_error(e)
+            # Only successful provider answers are cached; errors are retried next time.
+            self.cache.put(key, answer)
+            return answer
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,33 +1,78 @@
+import threading
+import time
 from datetime import datetime
 import pandas as pd
 
+ALERT_TYPES = ("Z-SCORE HIGH", "Z-SCORE LOW")
+
 class AlertEngine:
-    def __init__(self, storage_engine):
+    """
+    Z-score threshold alerts.
+
+    While a breach persists, one alert is logged per `cooldown` seconds instead
+    of one per check. The storage layer folds a pair's consecutive alerts into
+    an episode; when the breach clears, the engine records how long it really
+    lasted and its peak value. One engine can be shared by several threads
+    (e.g. every dashboard session); checks are serialised by a lock.
+    """
+    def __init__(self, storage_engine, cooldown: float = 30.0):
         self.storage = storage_engine
-        
+        self.cooldown = cooldown
+        # (pair, alert type) -> [epoch seconds of the last logged alert,
+        #                        timestamp of the last unlogged breach (None if none since),
+        #                        peak value since the last logged alert]
+        self.active = {}
+        self._lock = threading.Lock()
+
     def check_alerts(self, symbol_a: str, symbol_b: str, z_score: float, threshold: float):
         """
         Check if z-score exceeds threshold.
         """
         if pd.isna(z_score):
             return
-            
+
         timestamp = datetime.utcnow().isoformat()
-        
-        if z_score > threshold:
-            msg = f"Z-Score ({z_score:.2f}) > Threshold ({threshold})"
-            self._trigger_alert(timestamp, f"{symbol_a}-{symbol_b}", "Z-SCORE HIGH", msg, z_score)
-            
-        if z_score < -threshold:
-            msg = f"Z-Score ({z_score:.2f}) < Threshold ({-threshold})"
-            self._trigger_alert(timestamp, f"{symbol_a}-{symbol_b}", "Z-SCORE LOW", msg, z_score)
-
-    def _trigger_alert(self, timestamp, symbol, alert_type, message, value):
+        pair = f"{symbol_a}-{symbol_b}"
+        breached = {
+            "Z-SCORE HIGH": z_score > threshold,
+            "Z-SCORE LOW": z_score < -threshold,
+        }
+        with self._lock:
+            for alert_type in ALERT_TYPES:
+                key = (pair, alert_type)
+                if breached[alert_type]:
+                    bound = threshold if alert_type == "Z-SCORE HIGH" else -threshold
+                    sign = ">" if alert_type == "Z-SCORE HIGH" else "<"
+                    msg = f"Z-Score ({z_score:.2f}) {sign} Threshold ({bound})"
+                    self._on_breach(key, timestamp, msg, z_score)
+                elif key in self.active:
+                    self._on_clear(key)
+
+    def _on_breach(self, key: tuple, timestamp: str, message: str, value: float):
+        now = time.time()
+        state = self.active.get(key)
+        if state is not None and now - state[0] < self.cooldown:
+            state[1] = timestamp
+            if abs(value) > abs(state[2]):
+                state[2] = value
+            return
+        peak = value if state is None or abs(value) >= abs(state[2]) else state[2]
+        self._trigger_alert(timestamp, key[0], key[1], message, value, peak)
+        self.active[key] = [now, None, value]
+
+    def _on_clear(self, key: tuple):
+        _, last_breach, peak = self.active.pop(key)
+        # Breaches after the last logged alert only extend the episode
+        if last_breach is not None:
+            self.storage.extend_alert_episode(key[0], key[1], last_breach, peak)
+
+    def _trigger_alert(self, timestamp, symbol, alert_type, message, value, peak=None):
         alert_data = {
             'timestamp': timestamp,
             'symbol': symbol,
             'type': alert_type,
             'message': message,
-            'value': value
+            'value': value,
+            'peak': value if peak is None else peak,
         }
         self.storage.log_alert(alert_data)
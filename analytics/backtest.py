@@ -0,0 +1,219 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from analytics.rolling import Rolling
+from analytics.resampler import Resampler
+
+
+@dataclass
+class BacktestResult:
+    """
+    Per-bar arrays share `index`. Position is +1 long spread (long A, short
+    hedge_ratio * B), -1 short spread, 0 flat, decided at the bar's close.
+    PnL, equity and drawdown are in quote currency per unit of A.
+    """
+    index: pd.Index
+    position: np.ndarray
+    hedge_ratio: np.ndarray
+    pnl: np.ndarray
+    equity: np.ndarray
+    drawdown: np.ndarray
+    turnover: np.ndarray
+    trades: pd.DataFrame
+    stats: dict = field(default_factory=dict)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'position': self.position,
+            'hedge_ratio': self.hedge_ratio,
+            'pnl': self.pnl,
+            'equity': self.equity,
+            'drawdown': self.drawdown,
+            'turnover': self.turnover,
+        }, index=self.index)
+
+
+class Backtest:
+    """
+    Vectorized pairs backtest on the spread z-score, using the same signal as
+    Stats.calculate_zscore and the AlertEngine thresholds.
+
+    Rules (evaluated on each bar's z-score):
+      - enter short spread when z > entry_z, long spread when z < -entry_z
+      - exit when |z| <= exit_z
+      - stop out when |z| >= stop_z; no re-entry until z has come back inside exit_z
+    """
+
+    @staticmethod
+    def positions(z: np.ndarray, entry_z: float = 2.0, exit_z: float = 0.5, stop_z: float = None) -> np.ndarray:
+        """
+        Turn a z-score array into target positions without a per-bar loop.
+        Each bar either sets a new state (entry/exit/stop) or carries the
+        previous one, which is a forward fill over the event array.
+        """
+        z = np.asarray(z, dtype=np.float64)
+        absz = np.abs(z)
+        events = np.full(len(z), np.nan)
+        events[z > entry_z] = -1.0
+        events[z < -entry_z] = 1.0
+        exits = absz <= exit_z
+        events[exits] = 0.0
+        events[np.isnan(z)] = 0.0
+
+        if stop_z is not None:
+            stops = absz >= stop_z
+            # Lockout state: switched on by a stop, off by the next exit.
+            lock = np.full(len(z), np.nan)
+            lock[exits] = 0.0
+            lock[stops] = 1.0
+            lock = Rolling.ffill(lock)
+            events[(lock == 1.0) & (absz > entry_z)] = np.nan
+            events[stops] = 0.0
+
+        pos = Rolling.ffill(events)
+        return np.nan_to_num(pos).astype(np.int8)
+
+    @staticmethod
+    def hedge_ratios(a: np.ndarray, b: np.ndarray, method: str = 'static', window: int = 50) -> np.ndarray:
+        """
+        'static': one OLS hedge ratio over the whole sample, as Spread.calculate_spread does
+        (this looks ahead). 'rolling': trailing OLS over `window` bars, known at each bar's close.
+        """
+        if method == 'rolling':
+            beta = Rolling.beta(a, b, window)
+            return np.nan_to_num(Rolling.ffill(beta), nan=1.0)
+        bc = b - b.mean()
+        var = np.dot(bc, bc)
+        beta = np.dot(bc, a - a.mean()) / var if var > 0 else 1.0
+        return np.full(len(a), beta)
+
+    @staticmethod
+    def _align(price_a, price_b):
+        if isinstance(price_a, pd.Series) and isinstance(price_b, pd.Series):
+            df = pd.concat([price_a, price_b], axis=1, join='inner').dropna()
+            return df.index, df.iloc[:, 0].to_numpy(np.float64), df.iloc[:, 1].to_numpy(np.float64)
+        a = np.asarray(price_a, dtype=np.float64)
+        b = np.asarray(price_b, dtype=np.float64)
+        return pd.RangeIndex(len(a)), a, b
+
+    @staticmethod
+    def run(price_a, price_b, window: int = 50, entry_z: float = 2.0, exit_z: float = 0.5,
+            stop_z: float = None, hedge_method: str = 'static', cost_bps: float = 0.0,
+            bars_per_year: float = None) -> BacktestResult:
+        """
+        Backtest the z-score strategy on two close-price series (or arrays).
+        """
+        index, a, b = Backtest._align(price_a, price_b)
+        hedge = Backtest.hedge_ratios(a, b, hedge_method, window)
+        z = Rolling.zscore(a - hedge * b, window)
+        target = Backtest.positions(z, entry_z, exit_z, stop_z)
+        del z
+        return Backtest.evaluate(index, a, b, hedge, target, cost_bps, bars_per_year)
+
+    @staticmethod
+    def evaluate(index, a: np.ndarray, b: np.ndarray, hedge: np.ndarray, target: np.ndarray,
+                 cost_bps: float = 0.0, bars_per_year: float = None, with_trades: bool = True) -> BacktestResult:
+        """
+        PnL, turnover, drawdown and trade statistics for a target position array.
+        Positions decided at bar t's close earn the price change from t to t+1.
+        with_trades=False skips building the per-trade frame (stats are still computed).
+        """
+        n = len(a)
+        qa = target.astype(np.float64)
+        qb = -qa * hedge
+
+        pnl = np.zeros(n)
+        if n > 1:
+            pnl[1:] = qa[:-1] * np.diff(a) + qb[:-1] * np.diff(b)
+
+        dqa = np.abs(np.diff(qa, prepend=0.0))
+        dqb = np.abs(np.diff(qb, prepend=0.0))
+        turnover = dqa * a + dqb * b
+        del dqa, dqb, qb
+        cost = turnover * (cost_bps / 1e4)
+        net = pnl - cost
+
+        equity = np.cumsum(net)
+        drawdown = equity - np.maximum.accumulate(equity) if n else equity
+
+        held = np.empty(n, dtype=np.int8)
+        if n:
+            held[0] = 0
+            held[1:] = target[:-1]
+        starts, bars, trade_pnl = Backtest._trade_arrays(held, pnl)
+        num_trades = len(starts)
+        if with_trades:
+            trades = pd.DataFrame({
+                'entry': index[starts],
+                'exit': index[starts + bars - 1],
+                'side': held[starts],
+                'bars': bars,
+                'pnl': trade_pnl,
+            })
+        else:
+            trades = pd.DataFrame(columns=['entry', 'exit', 'side', 'bars', 'pnl'])
+
+        if bars_per_year is None:
+            bars_per_year = Backtest.bars_per_year(index)
+        std = net.std() if n > 1 else 0.0
+        sharpe = net.mean() / std * np.sqrt(bars_per_year) if std > 0 else 0.0
+
+        stats = {
+            'total_pnl': float(pnl.sum()),
+            'total_cost': float(cost.sum()),
+            'net_pnl': float(equity[-1]) if n else 0.0,
+            'sharpe': float(sharpe),
+            'max_drawdown': float(drawdown.min()) if n else 0.0,
+            'turnover': float(turnover.sum()),
+            'exposure': float(np.count_nonzero(held) / n) if n else 0.0,
+            'num_trades': num_trades,
+            'win_rate': float((trade_pnl > 0).mean()) if num_trades else 0.0,
+            'avg_trade_pnl': float(trade_pnl.mean()) if num_trades else 0.0,
+            'avg_bars_held': float(bars.mean()) if num_trades else 0.0,
+        }
+        return BacktestResult(index, target, hedge, net, equity, drawdown, turnover, trades, stats)
+
+    @staticmethod
+    def _trade_arrays(held: np.ndarray, pnl: np.ndarray):
+        """
+        Group consecutive bars with the same non-zero held position into trades.
+        Returns (start index, bars held, pnl) per trade.
+        """
+        n = len(held)
+        if n == 0 or not held.any():
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        change = np.empty(n, dtype=bool)
+        change[0] = True
+        np.not_equal(held[1:], held[:-1], out=change[1:])
+        in_trade = held != 0
+        starts = np.flatnonzero(change & in_trade)
+        trade_id = np.cumsum(change & in_trade)[in_trade] - 1
+        bars = np.bincount(trade_id)
+        trade_pnl = np.bincount(trade_id, weights=pnl[in_trade])
+        return starts, bars, trade_pnl
+
+    @staticmethod
+    def bars_per_year(index) -> float:
+        """
+        Annualisation factor from the median bar spacing of a DatetimeIndex (1.0 without one).
+        """
+        if isinstance(index, pd.DatetimeIndex) and len(index) > 1:
+            head = index[:10_000]
+            seconds = (head[1:] - head[:-1]).median().total_seconds()
+            if seconds > 0:
+                return 365 * 24 * 3600 / seconds
+        return 1.0
+
+    @staticmethod
+    def load_closes(storage, symbol_a: str, symbol_b: str, timeframe: str = '1s',
+                    lookback_minutes: int = 60 * 24):
+        """
+        Resample stored ticks for both symbols and return their close series.
+        """
+        df_a = Resampler.resample(storage.get_ticks(symbol_a, lookback_minutes=lookback_minutes), timeframe)
+        df_b = Resampler.resample(storage.get_ticks(symbol_b, lookback_minutes=lookback_minutes), timeframe)
+        if df_a.empty or df_b.empty:
+            return pd.Series(dtype=float), pd.Series(dtype=float)
+        return df_a['close'], df_b['close']
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pandas as pd
+
+from analytics.resampler import Resampler
+from diagnostics.memory import sizeof
+from storage.tick_buffer import TickBuffer
+
+
+class BarCache:
+    """
+    Per-(symbol, timeframe) OHLCV cache shared by every pair within one refresh cycle.
+
+    Ticks are read once per symbol and resampled once per (symbol, timeframe),
+    however many pairs use them. Calling begin_cycle() starts a new refresh and
+    drops the previous cycle's entries. Ticks live in one TickBuffer per symbol
+    across cycles, so each cycle reads only the ticks stored since the last one;
+    a buffer no pair has used for a whole lookback is dropped at the next cycle.
+    """
+    def __init__(self, storage, lookback_minutes: int = 10, clock=None):
+        self.storage = storage
+        self.lookback_minutes = lookback_minutes
+        self.clock = clock or time.time_ns
+        self._lock = threading.Lock()
+        self._ticks = {}
+        self._bars = {}
+        self._buffers = {}
+        self.cycle = 0
+        self.hits = 0
+        self.misses = 0
+        self.tick_reads = 0
+        self.rows_read = 0
+        self.buffers_dropped = 0
+        self.time_saved = 0.0
+
+    def begin_cycle(self):
+        with self._lock:
+            self._ticks.clear()
+            self._bars.clear()
+            self.cycle += 1
+            # Symbols no session displays any more; re-reading them later costs no more than keeping them
+            now = self.clock()
+            for key in [k for k, b in self._buffers.items() if b.stale(now)]:
+                del self._buffers[key]
+                self.buffers_dropped += 1
+
+    def reset(self):
+        """
+        Forget the tick buffers too, e.g. after the database was cleared.
+        """
+        with self._lock:
+            self._buffers.clear()
+        self.begin_cycle()
+
+    def _buffer(self, symbol: str, price_source: str = 'trade') -> TickBuffer:
+        key = (symbol, price_source)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = TickBuffer(self.storage, symbol, self.lookback_minutes, price_source,
+                                                     self.clock)
+        return buffer
+
+    def _get_ticks(self, symbol: str, price_source: str = 'trade'):
+        """
+        Returns (ticks, read_seconds); the read happens once per symbol and price source per cycle.
+        """
+        key = (symbol, price_source)
+        entry = self._ticks.get(key)
+        if entry is None:
+            start = time.perf_counter()
+            buffer = self._buffer(symbol, price_source)
+            self.rows_read += buffer.refresh()
+            entry = (buffer.frame(), time.perf_counter() - start)
+            self._ticks[key] = entry
+            self.tick_reads += 1
+        return entry
+
+    def tick_arrays(self, symbol: str, price_source: str = 'trade'):
+        """
+        (int64 ns timestamps, price, size) of a symbol's lookback window, from its buffer.
+        """
+        with self._lock:
+            self._get_ticks(symbol, price_source)
+            return self._buffer(symbol, price_source).arrays()
+
+    def get_bars(self, symbol: str, timeframe: str, price_source: str = 'trade') -> pd.DataFrame:
+        """
+        OHLCV bars of trades, or of the quote mid / microprice (zero volume).
+        """
+        key = (symbol, timeframe, price_source)
+        with self._lock:
+            entry = self._bars.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.time_saved += entry[1]
+                return entry[0]
+
+            self.misses += 1
+            ticks, read_cost = self._get_ticks(symbol, price_source)
+            start = time.perf_counter()
+            bars = Resampler.resample(ticks, timeframe)
+            # A hit saves both the tick read and the resample
+            self._bars[key] = (bars, read_cost + time.perf_counter() - start)
+            return bars
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cycles': self.cycle,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'tick_reads': self.tick_reads,
+                'rows_read': self.rows_read,
+                # Latest refresh vs the window it maintains, averaged over symbols
+                'rows_per_read': sum(b.last_rows for b in self._buffers.values()) / max(len(self._buffers), 1),
+                'window_rows': sum(len(b) for b in self._buffers.values()) / max(len(self._buffers), 1),
+                'buffers': len(self._buffers),
+                'buffers_dropped': self.buffers_dropped,
+                'time_saved_s': self.time_saved,
+            }
+
+    def memory_usage(self) -> dict:
+        """
+        Bytes held by the tick buffers (allocated capacity) and this cycle's frames.
+        """
+        with self._lock:
+            return {'tick_buffers': sum(b.nbytes for b in self._buffers.values()),
+                    'cycle_frames': sizeof([self._ticks, self._bars])}
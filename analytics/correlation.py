@@ -1,3 +1,8 @@
+import threading
+import time
+from typing import Dict, Iterable
+
+import numpy as np
 import pandas as pd
 
 class Correlation:
@@ -5,9 +10,216 @@ class Correlation:
     def rolling_correlation(series_a: pd.Series, series_b: pd.Series, window: int = 20) -> pd.Series:
         if series_a.empty or series_b.empty:
             return pd.Series()
-            
+
         df = pd.concat([series_a, series_b], axis=1, join='inner')
         if df.empty:
             return pd.Series()
-            
+
         return df.iloc[:,0].rolling(window=window).corr(df.iloc[:,1])
+
+
+class EwmCovariance:
+    """
+    Streaming exponentially weighted covariance of log returns across a symbol universe.
+
+    Each closed bar of aligned returns r is one rank-1 update, O(N^2) with no
+    history kept:
+
+        d = r - mean;  mean += alpha * d;  cov = (1 - alpha) * (cov + alpha * d d')
+
+    which equals pandas ewm(alpha=alpha, adjust=False).cov(bias=True). The decay
+    is kept as a separate scale factor (cov = scale * S), so each bar is a single
+    BLAS symmetric rank-1 update of S's upper triangle. A symbol without a return
+    on a bar contributes d = 0, so its variances decay instead of absorbing a
+    stale price jump.
+    """
+    # Fold the scale back into S before it underflows
+    MIN_SCALE = 1e-150
+
+    def __init__(self, symbols: Iterable[str], halflife: float = 60.0, timeframe: str = '1s',
+                 min_periods: int = 20, max_pending: int = 5):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.halflife = halflife
+        self.alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        self.timeframe = timeframe
+        self.step_ns = pd.Timedelta(timeframe).value
+        self.min_periods = min_periods
+        self.max_pending = max_pending
+        n = len(self.symbols)
+        # Imported on first use: scipy.linalg takes ~0.4 s to load
+        from scipy.linalg.blas import dsyr
+        self._dsyr = dsyr
+        self.mean = np.zeros(n)
+        # Upper triangle of S, Fortran order for BLAS
+        self._s = np.zeros((n, n), order='F')
+        self._scale = 1.0
+        self.last_close = np.full(n, np.nan)
+        self.count = 0
+        self.last_start_ns = None
+        self.pending: Dict[int, Dict[str, float]] = {}
+        self.update_seconds = 0.0
+        # Reentrant: sync() and on_bar() hold it across their updates
+        self._lock = threading.RLock()
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.min_periods
+
+    def update(self, returns: np.ndarray):
+        """
+        Add one bar of returns (NaN where a symbol has none).
+        """
+        start = time.perf_counter()
+        r = np.asarray(returns, dtype=np.float64)
+        missing = ~np.isfinite(r)
+        with self._lock:
+            if self.count == 0:
+                self.mean[:] = np.where(missing, 0.0, r)
+            else:
+                a = self.alpha
+                d = r - self.mean
+                d[missing] = 0.0
+                self.mean += a * d
+                self._scale *= 1.0 - a
+                self._dsyr(a * (1.0 - a) / self._scale, d, a=self._s, overwrite_a=1)
+                if self._scale < self.MIN_SCALE:
+                    self._s *= self._scale
+                    self._scale = 1.0
+            self.count += 1
+        self.update_seconds += time.perf_counter() - start
+
+    def update_prices(self, closes: np.ndarray):
+        """
+        Add one bar of closes; the first bar only sets the reference prices.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.log(closes / self.last_close)
+        seen = np.isfinite(closes) & (closes > 0)
+        first = not np.isfinite(self.last_close).any()
+        self.last_close[seen] = closes[seen]
+        if not first:
+            self.update(r)
+
+    def on_bar(self, bar) -> bool:
+        """
+        Feed a closed bar (ingestion.bar_builder.Bar). Returns True when the bar
+        completed a bar start across the universe and the matrix was updated.
+        Starts still missing symbols after `max_pending` newer starts are applied
+        with those symbols' returns missing.
+        """
+        if bar.timeframe != self.timeframe or bar.symbol not in self.index:
+            return False
+        with self._lock:
+            if self.last_start_ns is not None and bar.start_ns <= self.last_start_ns:
+                return False
+            closes = self.pending.setdefault(bar.start_ns, {})
+            closes[bar.symbol] = bar.close
+            complete = len(closes) == len(self.symbols)
+            if not complete and len(self.pending) <= self.max_pending:
+                return False
+            cutoff = bar.start_ns if complete else min(self.pending)
+            for start in sorted(s for s in self.pending if s <= cutoff):
+                row = np.full(len(self.symbols), np.nan)
+                for symbol, close in self.pending.pop(start).items():
+                    row[self.index[symbol]] = close
+                self.update_prices(row)
+                self.last_start_ns = start
+            return True
+
+    def sync(self, closes: pd.DataFrame, now_ns: int):
+        """
+        Apply every closed bar of an aligned close frame (one column per symbol)
+        newer than the last applied bar.
+        """
+        if closes.empty:
+            return
+        ts = closes.index.values.astype('datetime64[ns]').astype(np.int64)
+        values = closes.reindex(columns=self.symbols).to_numpy(dtype=np.float64)
+        with self._lock:
+            new = ts + self.step_ns <= now_ns
+            if self.last_start_ns is not None:
+                new &= ts > self.last_start_ns
+            if not new.any():
+                return
+            for row in values[new]:
+                self.update_prices(row)
+            self.last_start_ns = int(ts[new][-1])
+
+    @property
+    def cov(self) -> np.ndarray:
+        with self._lock:
+            upper = np.triu(self._s)
+            scale = self._scale
+        cov = upper + np.triu(upper, 1).T
+        cov *= scale
+        return cov
+
+    def std(self) -> np.ndarray:
+        with self._lock:
+            return np.sqrt(np.maximum(np.diag(self._s) * self._scale, 0.0))
+
+    def corr(self) -> np.ndarray:
+        cov = self.cov
+        sd = np.sqrt(np.maximum(np.diag(cov), 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(sd, sd)
+        corr[~np.isfinite(corr)] = np.nan
+        np.clip(corr, -1.0, 1.0, out=corr)
+        np.fill_diagonal(corr, np.where(sd > 0, 1.0, np.nan))
+        return corr
+
+    def corr_frame(self, clustered: bool = True) -> pd.DataFrame:
+        corr = self.corr()
+        order = EwmCovariance.cluster_order(corr) if clustered else np.arange(len(self.symbols))
+        labels = [self.symbols[i] for i in order]
+        return pd.DataFrame(corr[np.ix_(order, order)], index=labels, columns=labels)
+
+    @staticmethod
+    def cluster_order(corr: np.ndarray) -> np.ndarray:
+        """
+        Leaf order of an average-linkage clustering on the distance sqrt((1 - rho) / 2),
+        so correlated symbols sit next to each other in the heatmap.
+        """
+        n = len(corr)
+        if n < 3:
+            return np.arange(n)
+        # Imported on first use, like statsmodels in Stationarity
+        from scipy.cluster.hierarchy import leaves_list, linkage
+        from scipy.spatial.distance import squareform
+        rho = np.nan_to_num(corr, nan=0.0)
+        dist = np.sqrt(np.clip((1.0 - rho) / 2.0, 0.0, 1.0))
+        np.fill_diagonal(dist, 0.0)
+        return leaves_list(linkage(squareform(dist, checks=False), method='average'))
+
+    def eigen_stats(self, corr: np.ndarray = None) -> dict:
+        """
+        Regime statistics of the correlation matrix's eigenvalues:
+
+        top_share        largest eigenvalue / N, the weight of the common (market) mode
+        absorption       share of variance in the top N/5 eigenvalues
+        effective_rank   exp(entropy) of the normalized eigenvalues; low when one factor dominates
+        n_signal         eigenvalues above the Marchenko-Pastur noise edge for the
+                         effective sample size (2 - alpha) / alpha
+        mean_corr        average off-diagonal correlation
+        """
+        corr = self.corr() if corr is None else corr
+        valid = ~np.isnan(np.diag(corr))
+        c = np.nan_to_num(corr[np.ix_(valid, valid)], nan=0.0)
+        n = len(c)
+        if n < 2:
+            return {'top_share': np.nan, 'absorption': np.nan, 'effective_rank': np.nan,
+                    'n_signal': 0, 'mean_corr': np.nan}
+        eig = np.clip(np.linalg.eigvalsh(c)[::-1], 0.0, None)
+        p = eig / eig.sum()
+        nz = p[p > 0]
+        t_eff = (2.0 - self.alpha) / self.alpha
+        mp_edge = (1.0 + np.sqrt(n / t_eff)) ** 2
+        return {
+            'top_share': float(eig[0] / n),
+            'absorption': float(eig[:max(1, n // 5)].sum() / n),
+            'effective_rank': float(np.exp(-np.sum(nz * np.log(nz)))),
+            'n_signal': int(np.sum(eig > mp_edge)),
+            'mean_corr': float((c.sum() - np.trace(c)) / (n * (n - 1))),
+        }
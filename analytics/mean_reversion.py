@@ -0,0 +1,232 @@
+import math
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics.rolling import Rolling
+
+LN2 = math.log(2.0)
+HURST_LAGS = (2, 4, 8, 16, 32, 64)
+VR_LAG = 8
+
+
+def _hurst_weights(lags: Sequence[int]) -> np.ndarray:
+    """
+    OLS slope of log(std) on log(lag) as a fixed linear combination of the log stds.
+    """
+    x = np.log(np.asarray(lags, dtype=np.float64))
+    xc = x - x.mean()
+    return xc / np.dot(xc, xc)
+
+
+def _half_life(b: np.ndarray) -> np.ndarray:
+    """
+    Half-life in bars from the AR(1) slope b of d(s) on s: phi = 1 + b.
+    Not mean reverting (phi >= 1) is inf; overshooting (phi <= 0) is NaN.
+    """
+    phi = 1.0 + np.asarray(b, dtype=np.float64)
+    out = np.full(phi.shape, np.inf)
+    out[~np.isfinite(phi) | (phi <= 0)] = np.nan
+    ok = (phi > 0) & (phi < 1)
+    out[ok] = -LN2 / np.log(phi[ok])
+    return out
+
+
+class MeanReversion:
+    """
+    Mean-reversion diagnostics of spreads: AR(1) half-life, Hurst exponent and
+    Lo-MacKinlay variance ratio.
+
+    Every diagnostic comes in three forms:
+      - one spread (1-D array) -> float
+      - a matrix of spreads, one per column -> one value per column, computed
+        with column-wise NumPy reductions so a whole pair universe is one call
+      - rolling over a 1-D spread -> array aligned to the input, from
+        cumulative sums (O(n) per lag, independent of the window)
+
+    Windows count bars (levels), so the rolling value at the last bar with
+    window=len(spread) equals the single-spread value. Inputs must be gap free.
+    """
+
+    # Single spread
+
+    @staticmethod
+    def half_life(spread) -> float:
+        return float(MeanReversion.half_life_batch(np.asarray(spread, dtype=np.float64)[:, None])[0])
+
+    @staticmethod
+    def hurst(spread, lags: Sequence[int] = HURST_LAGS) -> float:
+        return float(MeanReversion.hurst_batch(np.asarray(spread, dtype=np.float64)[:, None], lags)[0])
+
+    @staticmethod
+    def variance_ratio(spread, q: int = VR_LAG) -> Tuple[float, float]:
+        vr, z = MeanReversion.variance_ratio_batch(np.asarray(spread, dtype=np.float64)[:, None], q)
+        return float(vr[0]), float(z[0])
+
+    # Batched: one column per spread
+
+    @staticmethod
+    def half_life_batch(spreads: np.ndarray) -> np.ndarray:
+        """
+        Half-life in bars of each column, from the OLS regression (with intercept)
+        of s[t] - s[t-1] on s[t-1].
+        """
+        s = np.asarray(spreads, dtype=np.float64)
+        if len(s) < 3:
+            return np.full(s.shape[1], np.nan)
+        x = s[:-1] - s[:-1].mean(axis=0)
+        dy = np.diff(s, axis=0)
+        var = np.einsum('ij,ij->j', x, x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            b = np.einsum('ij,ij->j', x, dy) / var
+        return _half_life(b)
+
+    @staticmethod
+    def hurst_batch(spreads: np.ndarray, lags: Sequence[int] = HURST_LAGS) -> np.ndarray:
+        """
+        Hurst exponent of each column from the scaling of lagged differences,
+        std(s[t+lag] - s[t]) ~ lag^H: 0.5 for a random walk, below 0.5 when
+        mean reverting. Lags longer than the series are dropped.
+        """
+        s = np.asarray(spreads, dtype=np.float64)
+        lags = [int(lag) for lag in lags if lag < len(s) - 1]
+        if len(lags) < 2:
+            return np.full(s.shape[1], np.nan)
+        log_std = np.empty((len(lags), s.shape[1]))
+        with np.errstate(divide='ignore'):
+            for i, lag in enumerate(lags):
+                log_std[i] = np.log(np.std(s[lag:] - s[:-lag], axis=0))
+        h = _hurst_weights(lags) @ log_std
+        h[~np.isfinite(h)] = np.nan
+        return h
+
+    @staticmethod
+    def variance_ratio_batch(spreads: np.ndarray, q: int = VR_LAG) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Lo-MacKinlay variance ratio VR(q) of each column with overlapping q-bar
+        differences, and its z-statistic under homoskedastic random-walk returns.
+        VR < 1 (z < 0) indicates mean reversion.
+        """
+        s = np.asarray(spreads, dtype=np.float64)
+        n = len(s) - 1
+        if n <= q or q < 2:
+            nan = np.full(s.shape[1], np.nan)
+            return nan, nan.copy()
+        r = np.diff(s, axis=0)
+        mu = r.mean(axis=0)
+        var1 = np.sum((r - mu) ** 2, axis=0) / (n - 1)
+        rq = s[q:] - s[:-q]
+        # m already divides by q, so varq estimates the one-bar variance
+        m = q * (n - q + 1) * (1.0 - q / n)
+        varq = np.sum((rq - q * mu) ** 2, axis=0) / m
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vr = varq / var1
+        z = (vr - 1.0) / math.sqrt(2.0 * (2 * q - 1) * (q - 1) / (3.0 * q * n))
+        return vr, z
+
+    # Rolling over one spread
+
+    @staticmethod
+    def rolling_half_life(spread, window: int) -> np.ndarray:
+        s = np.asarray(spread, dtype=np.float64)
+        out = np.full(len(s), np.nan)
+        if len(s) < 3 or window < 3:
+            return out
+        # Regression over the window - 1 returns inside each window of levels
+        b = Rolling.beta(np.diff(s), s[:-1], window - 1)
+        out[1:] = _half_life(b)
+        out[:window - 1] = np.nan
+        return out
+
+    @staticmethod
+    def rolling_hurst(spread, window: int, lags: Sequence[int] = HURST_LAGS) -> np.ndarray:
+        s = np.asarray(spread, dtype=np.float64)
+        n = len(s)
+        lags = [int(lag) for lag in lags if lag < window - 1]
+        out = np.full(n, np.nan)
+        if len(lags) < 2 or n < window:
+            return out
+        weights = _hurst_weights(lags)
+        h = np.zeros(n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for w, lag in zip(weights, lags):
+                d = s[lag:] - s[:-lag]
+                # The window - lag differences that fit inside each window of levels
+                _, std = Rolling.mean_std(d, window - lag, ddof=0)
+                h[lag:] += w * np.log(std)
+        h[:window - 1] = np.nan
+        h[~np.isfinite(h)] = np.nan
+        return h
+
+    @staticmethod
+    def rolling_variance_ratio(spread, window: int, q: int = VR_LAG) -> Tuple[np.ndarray, np.ndarray]:
+        s = np.asarray(spread, dtype=np.float64)
+        n_total = len(s)
+        n = window - 1
+        vr = np.full(n_total, np.nan)
+        if n <= q or q < 2 or n_total < window:
+            return vr, vr.copy()
+        r = np.diff(s)
+        r_ref = r[0]
+        c1 = Rolling.cumsum0(r - r_ref)
+        c2 = Rolling.cumsum0((r - r_ref) ** 2)
+        sum1 = Rolling.window_sum(c1, n)
+        mu = sum1 / n + r_ref
+        var1 = (Rolling.window_sum(c2, n) - sum1 * sum1 / n) / (n - 1)
+
+        # Sum of (rq - q mu)^2 over the n - q + 1 q-bar differences in the window
+        rq = s[q:] - s[:-q]
+        k = n - q + 1
+        q_ref = rq[0]
+        sq1 = Rolling.window_sum(Rolling.cumsum0(rq - q_ref), k)
+        sq2 = Rolling.window_sum(Rolling.cumsum0((rq - q_ref) ** 2), k)
+        shift = q_ref - q * mu[q - 1:]
+        ssq = sq2 + 2.0 * shift * sq1 + k * shift * shift
+        m = q * k * (1.0 - q / n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vr[q:] = (ssq / m) / var1[q - 1:]
+        vr[:window - 1] = np.nan
+        vr[~np.isfinite(vr)] = np.nan
+        z = (vr - 1.0) / math.sqrt(2.0 * (2 * q - 1) * (q - 1) / (3.0 * q * n))
+        return vr, z
+
+    # Pair universe
+
+    @staticmethod
+    def pair_spreads(prices: pd.DataFrame, pairs: Iterable[Tuple[str, str]]) -> Tuple[List[Tuple[str, str]], np.ndarray, np.ndarray]:
+        """
+        Spreads a - hedge * b of many pairs from aligned prices (one column per
+        symbol, no gaps), with each pair's OLS hedge ratio as in Spread.calculate_spread.
+        Returns (pairs kept, hedge ratios, spread matrix with one column per pair).
+        """
+        pairs = [(a, b) for a, b in pairs if a in prices.columns and b in prices.columns]
+        if not pairs or prices.empty:
+            return pairs, np.empty(0), np.empty((len(prices), 0))
+        p = prices.to_numpy(dtype=np.float64)
+        col = {c: i for i, c in enumerate(prices.columns)}
+        ia = np.array([col[a] for a, _ in pairs])
+        ib = np.array([col[b] for _, b in pairs])
+        pc = p - p.mean(axis=0)
+        var = np.einsum('ij,ij->j', pc[:, ib], pc[:, ib])
+        cov = np.einsum('ij,ij->j', pc[:, ib], pc[:, ia])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hedge = np.where(var > 0, cov / var, 1.0)
+        return pairs, hedge, p[:, ia] - hedge * p[:, ib]
+
+    @staticmethod
+    def screen(prices: pd.DataFrame, pairs: Iterable[Tuple[str, str]], lags: Sequence[int] = HURST_LAGS,
+               q: int = VR_LAG) -> pd.DataFrame:
+        """
+        Hedge ratio, half-life (bars), Hurst exponent and variance ratio of every pair,
+        one row per pair, computed in a handful of matrix operations.
+        """
+        pairs, hedge, spreads = MeanReversion.pair_spreads(prices.dropna(), pairs)
+        vr, vr_z = MeanReversion.variance_ratio_batch(spreads, q)
+        return pd.DataFrame({
+            'hedge_ratio': hedge,
+            'half_life': MeanReversion.half_life_batch(spreads),
+            'hurst': MeanReversion.hurst_batch(spreads, lags),
+            f'vr_{q}': vr,
+            'vr_z': vr_z,
+        }, index=pd.Index([f"{a} / {b}" for a, b in pairs], name='pair'))
@@ -0,0 +1,172 @@
+import itertools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics.backtest import Backtest
+from analytics.resampler import Resampler
+from analytics.rolling import Rolling
+
+logger = logging.getLogger(__name__)
+
+# Pool workers' views onto the shared price arrays, filled by _init_worker.
+_SHARED = {}
+_HANDLES = []
+
+
+def _init_worker(specs: dict):
+    # Pool workers share the parent's resource tracker, so attaching here does not
+    # take ownership; the parent unlinks the blocks when the sweep finishes.
+    _SHARED.clear()
+    for timeframe, (name, n) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _HANDLES.append(shm)
+        _SHARED[timeframe] = np.ndarray((2, n), dtype=np.float64, buffer=shm.buf)
+
+
+def _run_group(task: tuple, shared: dict = None) -> List[dict]:
+    """
+    Evaluate every threshold for one (timeframe, hedge method, window).
+    The z-score is computed once per group; with a static hedge the spread's
+    cumulative sums are also shared by every window of the timeframe.
+    shared: prices and hedge caches of an in-process run (default: the worker's).
+    """
+    if shared is None:
+        shared = _SHARED
+    timeframe, method, window, thresholds, exit_z, stop_mult, cost_bps, bars_per_year = task
+    prices = shared[timeframe]
+    a, b = prices[0], prices[1]
+    if len(a) <= window:
+        return []
+
+    cache_key = (timeframe, method)
+    if method == 'static':
+        cached = shared.get(cache_key)
+        if cached is None:
+            hedge = Backtest.hedge_ratios(a, b, 'static')
+            spread = a - hedge * b
+            cached = (hedge, spread, Rolling.moments(spread))
+            shared[cache_key] = cached
+        hedge, spread, moments = cached
+        z = Rolling.zscore(spread, window, moments)
+    else:
+        hedge = Backtest.hedge_ratios(a, b, 'rolling', window)
+        z = Rolling.zscore(a - hedge * b, window)
+
+    index = pd.RangeIndex(len(a))
+    rows = []
+    for entry_z in thresholds:
+        stop_z = entry_z * stop_mult if stop_mult else None
+        target = Backtest.positions(z, entry_z, exit_z, stop_z)
+        result = Backtest.evaluate(index, a, b, hedge, target, cost_bps, bars_per_year, with_trades=False)
+        rows.append({'timeframe': timeframe, 'hedge_method': method, 'window': window,
+                     'entry_z': entry_z, **result.stats})
+    return rows
+
+
+class ParameterSweep:
+    """
+    Grid or random search over window, z threshold, timeframe and hedge-ratio
+    method for one pair.
+
+    Close prices for each timeframe are placed in shared memory once and mapped
+    by every pool worker, so tasks only carry parameters. Work is split into one
+    task per (timeframe, method, window) so rolling sums are reused inside a task.
+    """
+    def __init__(self, closes: Dict[str, Tuple[pd.Series, pd.Series]]):
+        self.prices = {}
+        self.bars_per_year = {}
+        for timeframe, (close_a, close_b) in closes.items():
+            df = pd.concat([close_a, close_b], axis=1, join='inner').dropna()
+            self.prices[timeframe] = np.ascontiguousarray(df.to_numpy(np.float64).T)
+            self.bars_per_year[timeframe] = Backtest.bars_per_year(df.index)
+
+    @staticmethod
+    def from_storage(storage, symbol_a: str, symbol_b: str, timeframes: List[str],
+                     lookback_minutes: int = 60 * 24) -> 'ParameterSweep':
+        """
+        Read each symbol's ticks once and resample them for every timeframe.
+        """
+        ticks_a = storage.get_ticks(symbol_a, lookback_minutes=lookback_minutes)
+        ticks_b = storage.get_ticks(symbol_b, lookback_minutes=lookback_minutes)
+        closes = {}
+        for tf in timeframes:
+            df_a = Resampler.resample(ticks_a, tf)
+            df_b = Resampler.resample(ticks_b, tf)
+            if not df_a.empty and not df_b.empty:
+                closes[tf] = (df_a['close'], df_b['close'])
+        return ParameterSweep(closes)
+
+    @staticmethod
+    def grid(windows, thresholds, timeframes, hedge_methods=('static',)) -> List[dict]:
+        return [{'timeframe': tf, 'hedge_method': m, 'window': int(w), 'entry_z': float(z)}
+                for tf, m, w, z in itertools.product(timeframes, hedge_methods, windows, thresholds)]
+
+    @staticmethod
+    def random(n: int, window_range=(10, 200), threshold_range=(1.0, 3.0), timeframes=('1s',),
+               hedge_methods=('static',), seed: int = None) -> List[dict]:
+        rng = np.random.default_rng(seed)
+        windows = rng.integers(window_range[0], window_range[1] + 1, n)
+        thresholds = np.round(rng.uniform(threshold_range[0], threshold_range[1], n), 2)
+        tfs = rng.choice(list(timeframes), n)
+        methods = rng.choice(list(hedge_methods), n)
+        return [{'timeframe': str(tf), 'hedge_method': str(m), 'window': int(w), 'entry_z': float(z)}
+                for tf, m, w, z in zip(tfs, methods, windows, thresholds)]
+
+    def _tasks(self, params: List[dict], exit_z: float, stop_mult: float, cost_bps: float) -> list:
+        groups = {}
+        for p in params:
+            if p['timeframe'] not in self.prices:
+                continue
+            key = (p['timeframe'], p['hedge_method'], p['window'])
+            groups.setdefault(key, []).append(p['entry_z'])
+        return [(tf, m, w, sorted(set(zs)), exit_z, stop_mult, cost_bps, self.bars_per_year[tf])
+                for (tf, m, w), zs in groups.items()]
+
+    def run(self, params: List[dict], workers: int = None, exit_z: float = 0.5,
+            stop_mult: float = None, cost_bps: float = 0.0) -> pd.DataFrame:
+        """
+        Evaluate all parameter combinations and return one row of backtest stats per combination.
+        stop_mult: optional stop level as a multiple of each entry threshold.
+        """
+        tasks = self._tasks(params, exit_z, stop_mult, cost_bps)
+        # Largest windows first so the slowest groups do not end up last in the queue
+        tasks.sort(key=lambda t: -t[2])
+        workers = workers or os.cpu_count() or 1
+
+        if workers == 1 or len(tasks) <= 1:
+            # A run-local dict, so concurrent sweeps (one per session) never share caches
+            shared = dict(self.prices)
+            rows = [row for task in tasks for row in _run_group(task, shared)]
+            return pd.DataFrame(rows)
+
+        blocks = []
+        try:
+            specs = {}
+            for tf, arr in self.prices.items():
+                shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                np.ndarray(arr.shape, dtype=np.float64, buffer=shm.buf)[:] = arr
+                blocks.append(shm)
+                specs[tf] = (shm.name, arr.shape[1])
+
+            # Forking the multi-threaded dashboard process could copy a lock another
+            # thread holds (sqlite, logging); forkserver workers start from a clean process
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            context = multiprocessing.get_context(method)
+            if method == "forkserver":
+                # Workers fork from a server that already imported NumPy/pandas
+                context.set_forkserver_preload([__name__])
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(specs,)) as pool:
+                rows = [row for group in pool.map(_run_group, tasks, chunksize=1) for row in group]
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+        return pd.DataFrame(rows)
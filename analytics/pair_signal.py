@@ -0,0 +1,126 @@
+import math
+from collections import deque
+from typing import Optional
+
+
+class PairSignal:
+    """
+    Spread z-score for one pair, updated once per closed bar in O(1).
+
+    Matches the dashboard's calculation: the hedge ratio is the OLS slope of A
+    on B over the last `hedge_window` bars, and the z-score compares the latest
+    spread with the last `window` spreads, all at the current hedge ratio. Both
+    only need running sums of a, b, a*a, b*b and a*b over each window, since
+    mean and variance of a - beta*b follow from them. Prices are shifted by a
+    reference pair to keep the sums well conditioned; every `rebase_every` bars
+    the reference moves to the window's means and both sums are rebuilt from
+    the retained bars, so add/subtract rounding cannot accumulate over days.
+    Bars of one leg wait at most `max_pending` bar starts for the other leg.
+    """
+    def __init__(self, symbol_a: str, symbol_b: str, timeframe: str, window: int = 50, hedge_window: int = 600,
+                 rebase_every: int = None, max_pending: int = 5):
+        self.symbol_a = symbol_a
+        self.symbol_b = symbol_b
+        self.timeframe = timeframe
+        self.window = window
+        self.hedge_window = max(hedge_window, window)
+        self.ref = None
+        self.history = deque()
+        self.pending = {}
+        self.max_pending = max_pending
+        # [n, sum a, sum b, sum aa, sum bb, sum ab] over each window
+        self.hedge_sums = [0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        self.z_sums = [0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        self.hedge_ratio = 1.0
+        self.zscore = math.nan
+        self.spread = math.nan
+        self.last_start_ns = None
+        self.rebase_every = rebase_every or self.hedge_window
+        self.steps = 0
+
+    @staticmethod
+    def _add(sums: list, a: float, b: float, sign: int):
+        sums[0] += sign
+        sums[1] += sign * a
+        sums[2] += sign * b
+        sums[3] += sign * a * a
+        sums[4] += sign * b * b
+        sums[5] += sign * a * b
+
+    def _rebase(self):
+        """
+        Re-centre the reference on the retained bars and rebuild both sums from them.
+        """
+        n = len(self.history)
+        da = sum(a for a, _ in self.history) / n
+        db = sum(b for _, b in self.history) / n
+        self.ref = (self.ref[0] + da, self.ref[1] + db)
+        self.history = deque((a - da, b - db) for a, b in self.history)
+        self.hedge_sums = [0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        self.z_sums = [0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        for i, (a, b) in enumerate(self.history):
+            self._add(self.hedge_sums, a, b, 1)
+            if i >= n - self.window:
+                self._add(self.z_sums, a, b, 1)
+
+    def on_bar(self, bar) -> Optional[float]:
+        """
+        Feed a closed bar of either leg. Returns the new z-score once both legs
+        have closed the same bar, otherwise None.
+        """
+        if bar.timeframe != self.timeframe or bar.symbol not in (self.symbol_a, self.symbol_b):
+            return None
+        if self.last_start_ns is not None and bar.start_ns <= self.last_start_ns:
+            return None
+        closes = self.pending.setdefault(bar.start_ns, {})
+        closes[bar.symbol] = bar.close
+        if len(closes) < 2:
+            # A leg that went quiet must not grow the map by one start per bar of the other
+            while len(self.pending) > self.max_pending:
+                del self.pending[min(self.pending)]
+            return None
+
+        # Both legs closed this bar; anything older can no longer pair up
+        for start in [s for s in self.pending if s <= bar.start_ns]:
+            del self.pending[start]
+        self.last_start_ns = bar.start_ns
+        return self.step(closes[self.symbol_a], closes[self.symbol_b])
+
+    def step(self, price_a: float, price_b: float) -> float:
+        """
+        Advance by one aligned bar and return the z-score (NaN until `window` bars).
+        """
+        if self.ref is None:
+            self.ref = (price_a, price_b)
+        elif self.steps % self.rebase_every == 0:
+            self._rebase()
+        self.steps += 1
+        a = price_a - self.ref[0]
+        b = price_b - self.ref[1]
+
+        self.history.append((a, b))
+        self._add(self.hedge_sums, a, b, 1)
+        self._add(self.z_sums, a, b, 1)
+        if len(self.history) > self.window:
+            old = self.history[-self.window - 1]
+            self._add(self.z_sums, old[0], old[1], -1)
+        if len(self.history) > self.hedge_window:
+            old = self.history.popleft()
+            self._add(self.hedge_sums, old[0], old[1], -1)
+
+        n, sa, sb, _, sbb, sab = self.hedge_sums
+        var_b = sbb - sb * sb / n
+        if n >= 2 and var_b > 1e-12 * max(sbb, 1.0):
+            self.hedge_ratio = (sab - sa * sb / n) / var_b
+        beta = self.hedge_ratio
+        self.spread = price_a - beta * price_b
+
+        n, sa, sb, saa, sbb, sab = self.z_sums
+        self.zscore = math.nan
+        if n >= self.window and n > 1:
+            mean = (sa - beta * sb) / n
+            ss = (saa - 2 * beta * sab + beta * beta * sbb) - n * mean * mean
+            var = ss / (n - 1)
+            if var > 0:
+                self.zscore = (a - beta * b - mean) / math.sqrt(var)
+        return self.zscore
@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class Rolling:
+    """
+    NumPy rolling-window kernels built on cumulative sums.
+
+    Each statistic costs O(n) regardless of the window, and the cumulative
+    sums can be computed once and reused for many windows. Inputs are 1-D
+    float arrays without gaps; the first `window - 1` outputs are NaN, like
+    pandas rolling with min_periods=window.
+    """
+
+    @staticmethod
+    def cumsum0(x: np.ndarray) -> np.ndarray:
+        """
+        Cumulative sum with a leading zero, so that window sums are c[i+w] - c[i].
+        """
+        out = np.empty(len(x) + 1, dtype=np.float64)
+        out[0] = 0.0
+        np.cumsum(x, out=out[1:])
+        return out
+
+    @staticmethod
+    def window_sum(csum: np.ndarray, window: int) -> np.ndarray:
+        """
+        Rolling sum from a `cumsum0` array, aligned to the input length.
+        """
+        n = len(csum) - 1
+        out = np.full(n, np.nan)
+        if window <= n:
+            np.subtract(csum[window:], csum[:-window], out=out[window - 1:])
+        return out
+
+    @staticmethod
+    def moments(x: np.ndarray):
+        """
+        Shifted cumulative first and second moments of x.
+        Shifting by a reference value keeps the variance well conditioned on long series.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        ref = x[0] if len(x) else 0.0
+        d = x - ref
+        return ref, Rolling.cumsum0(d), Rolling.cumsum0(d * d)
+
+    @staticmethod
+    def mean_std(x: np.ndarray, window: int, moments=None, ddof: int = 1):
+        """
+        Rolling mean and standard deviation. Pass precomputed `moments(x)` to
+        reuse them across windows.
+        """
+        ref, s1, s2 = moments if moments is not None else Rolling.moments(x)
+        sum1 = Rolling.window_sum(s1, window)
+        sum2 = Rolling.window_sum(s2, window)
+        mean = sum1 / window
+        var = (sum2 - sum1 * mean) / (window - ddof)
+        np.maximum(var, 0.0, out=var)
+        return mean + ref, np.sqrt(var)
+
+    @staticmethod
+    def zscore(x: np.ndarray, window: int, moments=None) -> np.ndarray:
+        """
+        Same result as Stats.calculate_zscore, without pandas.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        mean, std = Rolling.mean_std(x, window, moments)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = (x - mean) / std
+        z[~np.isfinite(z)] = np.nan
+        return z
+
+    @staticmethod
+    def beta(y: np.ndarray, x: np.ndarray, window: int) -> np.ndarray:
+        """
+        Rolling OLS slope of y on x (with intercept), i.e. a rolling hedge ratio.
+        """
+        y = np.asarray(y, dtype=np.float64)
+        x = np.asarray(x, dtype=np.float64)
+        dx = x - (x[0] if len(x) else 0.0)
+        dy = y - (y[0] if len(y) else 0.0)
+        sx = Rolling.window_sum(Rolling.cumsum0(dx), window)
+        sy = Rolling.window_sum(Rolling.cumsum0(dy), window)
+        sxy = Rolling.window_sum(Rolling.cumsum0(dx * dy), window)
+        sxx = Rolling.window_sum(Rolling.cumsum0(dx * dx), window)
+        cov = sxy - sx * sy / window
+        var = sxx - sx * sx / window
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = cov / var
+        beta[~np.isfinite(beta)] = np.nan
+        return beta
+
+    @staticmethod
+    def ffill(x: np.ndarray) -> np.ndarray:
+        """
+        Forward-fill NaNs (leading NaNs stay NaN).
+        """
+        idx = np.where(np.isnan(x), 0, np.arange(len(x)))
+        np.maximum.accumulate(idx, out=idx)
+        return x[idx]
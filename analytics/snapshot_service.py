@@ -0,0 +1,273 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, NamedTuple, Optional
+
+import pandas as pd
+
+from analytics.bar_cache import BarCache
+from analytics.stats import Stats
+from analytics.spread import Spread
+from analytics.correlation import Correlation, EwmCovariance
+from diagnostics.memory import sizeof
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotKey(NamedTuple):
+    symbol_a: str
+    symbol_b: str
+    timeframe: str
+    window: int
+    # 'trade', or the quote 'mid' / 'micro'price (storage.tick_buffer.PRICE_SOURCES)
+    price_source: str = 'trade'
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Immutable result of one analytics pass for a (pair, timeframe, window) key.
+    Sessions share the same instance, so consumers must treat the frames as read-only.
+    """
+    key: SnapshotKey
+    bar_time: Optional[pd.Timestamp]
+    computed_at: float
+    df_a: pd.DataFrame
+    df_b: pd.DataFrame
+    spread: pd.Series
+    zscore: pd.Series
+    corr: pd.Series
+    hedge_ratio: float
+    curr_z: float
+    curr_spread: float
+    curr_corr: float
+
+    @property
+    def has_data(self) -> bool:
+        return not self.df_a.empty and not self.df_b.empty
+
+
+def build_snapshot(key: SnapshotKey, df_a: pd.DataFrame, df_b: pd.DataFrame) -> Snapshot:
+    """
+    Run spread, z-score and correlation over two OHLCV frames.
+    """
+    spread = pd.Series()
+    zscore = pd.Series()
+    corr = pd.Series()
+    hedge_ratio = 1.0
+    curr_z = curr_spread = curr_corr = 0.0
+
+    if not df_a.empty and not df_b.empty and 'close' in df_a.columns and 'close' in df_b.columns:
+        spread, hedge_ratio = Spread.calculate_spread(df_a['close'], df_b['close'])
+        if hedge_ratio is None:
+            hedge_ratio = 1.0
+        zscore = Stats.calculate_zscore(spread, window=key.window)
+        corr = Correlation.rolling_correlation(df_a['close'], df_b['close'], window=key.window)
+
+        curr_z = zscore.iloc[-1] if not zscore.empty and not pd.isna(zscore.iloc[-1]) else 0.0
+        curr_spread = spread.iloc[-1] if not spread.empty and not pd.isna(spread.iloc[-1]) else 0.0
+        curr_corr = corr.iloc[-1] if not corr.empty and not pd.isna(corr.iloc[-1]) else 0.0
+
+    bar_time = df_a.index[-1] if not df_a.empty else None
+    return Snapshot(key, bar_time, time.time(), df_a, df_b, spread, zscore, corr,
+                    float(hedge_ratio), float(curr_z), float(curr_spread), float(curr_corr))
+
+
+class AnalyticsService:
+    """
+    Process-wide analytics worker shared by every dashboard session.
+
+    Each subscribed key is recomputed once per bar close of its timeframe and
+    published as an immutable Snapshot. Sessions hold leases on the keys they
+    display; a key whose lease count drops to zero is evicted. Bars come from a
+    shared BarCache, so a symbol used by several pairs is read and resampled
+    once per refresh cycle.
+    """
+    MAX_MATRICES = 4
+
+    def __init__(self, storage, lookback_minutes: int = 10, lease_seconds: float = 30.0,
+                 poll_interval: float = 0.25, vwap=None, clock=None):
+        """
+        vwap: optional analytics.vwap.VwapBook kept current for every subscribed symbol.
+        clock: ns since the epoch deciding bar closes (default wall time), e.g. simulated time in a soak test.
+        """
+        self.storage = storage
+        self.vwap = vwap
+        self.lookback_minutes = lookback_minutes
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.clock = clock or time.time_ns
+        self.bar_cache = BarCache(storage, lookback_minutes, self.clock)
+        self._lock = threading.Lock()
+        self._leases: Dict[SnapshotKey, Dict[str, float]] = {}
+        self._snapshots: Dict[SnapshotKey, Snapshot] = {}
+        self._last_bar: Dict[SnapshotKey, int] = {}
+        self._matrices: Dict[tuple, EwmCovariance] = {}
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="analytics-service", daemon=True)
+        self.thread.start()
+        logger.info("Analytics service started.")
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+        logger.info("Analytics service stopped.")
+
+    def subscribe(self, key: SnapshotKey, session_id: str) -> Optional[Snapshot]:
+        """
+        Acquire or renew a session's lease on a key and return its latest snapshot.
+        The first subscriber of a key computes the initial snapshot synchronously.
+        """
+        with self._lock:
+            self._leases.setdefault(key, {})[session_id] = time.monotonic()
+            snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            # Start a fresh cycle so the first snapshot is not built from stale cached bars
+            self.bar_cache.begin_cycle()
+            snapshot = self._refresh(key)
+        return snapshot
+
+    def unsubscribe(self, key: SnapshotKey, session_id: str):
+        with self._lock:
+            sessions = self._leases.get(key)
+            if sessions is not None:
+                sessions.pop(session_id, None)
+                if not sessions:
+                    self._evict(key)
+
+    def latest(self, key: SnapshotKey) -> Optional[Snapshot]:
+        with self._lock:
+            return self._snapshots.get(key)
+
+    def refcount(self, key: SnapshotKey) -> int:
+        with self._lock:
+            return len(self._leases.get(key, {}))
+
+    def clear(self):
+        """
+        Drop all published snapshots, e.g. after the database was reset.
+        """
+        with self._lock:
+            self._snapshots.clear()
+            self._last_bar.clear()
+            self._matrices.clear()
+        self.bar_cache.reset()
+        if self.vwap is not None:
+            self.vwap.clear()
+
+    def trim(self):
+        """
+        Release what can be rebuilt (tick buffers, correlation matrices) but keep the
+        published snapshots, e.g. when the process is over its memory budget.
+        """
+        with self._lock:
+            self._matrices.clear()
+        self.bar_cache.reset()
+
+    def memory_usage(self) -> dict:
+        with self._lock:
+            usage = {'snapshots': sizeof(self._snapshots), 'matrices': sizeof(self._matrices)}
+        usage.update(self.bar_cache.memory_usage())
+        if self.vwap is not None:
+            usage['vwap'] = sizeof(self.vwap.trackers)
+        return usage
+
+    def correlation_matrix(self, symbols, timeframe: str, halflife: float = 60.0,
+                           price_source: str = 'trade') -> EwmCovariance:
+        """
+        Streaming EWM covariance of a symbol universe, brought up to date with the
+        bars closed since the previous call (warmed up over the lookback on first use).
+        """
+        key = (tuple(symbols), timeframe, float(halflife), price_source)
+        with self._lock:
+            matrix = self._matrices.pop(key, None) or EwmCovariance(symbols, halflife, timeframe)
+            # Most recently used last; keep a few universes per process
+            self._matrices[key] = matrix
+            while len(self._matrices) > self.MAX_MATRICES:
+                self._matrices.pop(next(iter(self._matrices)))
+        closes = {s: self.bar_cache.get_bars(s, timeframe, price_source) for s in symbols}
+        closes = pd.DataFrame({s: df['close'] for s, df in closes.items() if 'close' in df})
+        matrix.sync(closes, self.clock())
+        return matrix
+
+    def _evict(self, key: SnapshotKey):
+        self._leases.pop(key, None)
+        self._snapshots.pop(key, None)
+        self._last_bar.pop(key, None)
+
+    def _prune_leases(self):
+        cutoff = time.monotonic() - self.lease_seconds
+        with self._lock:
+            for key in list(self._leases):
+                sessions = self._leases[key]
+                for session_id in [s for s, seen in sessions.items() if seen < cutoff]:
+                    del sessions[session_id]
+                if not sessions:
+                    self._evict(key)
+            return list(self._leases)
+
+    @staticmethod
+    def _bar_id(timeframe: str, now: float) -> int:
+        seconds = pd.Timedelta(timeframe).total_seconds()
+        return int(now // seconds)
+
+    def _refresh(self, key: SnapshotKey) -> Snapshot:
+        df_a = self.bar_cache.get_bars(key.symbol_a, key.timeframe, key.price_source)
+        df_b = self.bar_cache.get_bars(key.symbol_b, key.timeframe, key.price_source)
+        snapshot = build_snapshot(key, df_a, df_b)
+
+        with self._lock:
+            # Only publish if a session still holds the key; it may have been evicted meanwhile.
+            if key in self._leases:
+                self._snapshots[key] = snapshot
+                self._last_bar[key] = self._bar_id(key.timeframe, self.clock() / 1e9)
+        return snapshot
+
+    def poll(self) -> list:
+        """
+        One pass of the worker: refresh the keys whose bar closed since their last
+        snapshot. Returns the keys refreshed.
+        """
+        now = self.clock() / 1e9
+        due = [key for key in self._prune_leases()
+               if self._last_bar.get(key) != self._bar_id(key.timeframe, now)]
+        if due:
+            self.bar_cache.begin_cycle()
+        for key in due:
+            try:
+                self._refresh(key)
+            except Exception as e:
+                logger.error(f"Analytics refresh failed for {key}: {e}")
+        if due and self.vwap is not None:
+            try:
+                self._update_vwap({s for key in due for s in (key.symbol_a, key.symbol_b)})
+            except Exception as e:
+                logger.error(f"VWAP update failed: {e}")
+        return due
+
+    def _run(self):
+        while self.running:
+            self.poll()
+            time.sleep(self.poll_interval)
+
+    def _update_vwap(self, symbols):
+        """
+        Feed newly closed bars to the VWAP book and persist it, or, when another
+        process owns the state (read-only store), reload it.
+        """
+        if not self.vwap.writable:
+            for symbol in symbols:
+                self.vwap.refresh(symbol)
+            return
+        now_ns = self.clock()
+        for symbol in symbols:
+            self.vwap.sync(symbol, self.bar_cache.get_bars(symbol, self.vwap.timeframe), now_ns)
+        self.vwap.persist()
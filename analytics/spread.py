@@ -1,13 +1,13 @@
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
 
 class Spread:
     @staticmethod
     def calculate_spread(series_a: pd.Series, series_b: pd.Series, hedge_ratio: float = None):
         """
         Calculate spread = A - hedge_ratio * B
-        If hedge_ratio is None, use OLS to find it.
+        If hedge_ratio is None, use OLS to find it (closed-form slope with intercept,
+        so statsmodels is not needed on the render path).
         Returns: (spread, hedge_ratio)
         """
         if series_a.empty or series_b.empty:
@@ -18,14 +18,11 @@ class Spread:
             return pd.Series(), None
             
         if hedge_ratio is None:
-            X = df.iloc[:, 1]
-            Y = df.iloc[:, 0]
-            X = sm.add_constant(X)
-            try:
-                model = sm.OLS(Y, X).fit()
-                hedge_ratio = model.params.iloc[1]
-            except:
-                hedge_ratio = 1.0
+            x = df.iloc[:, 1].to_numpy(dtype=np.float64)
+            y = df.iloc[:, 0].to_numpy(dtype=np.float64)
+            xc = x - x.mean()
+            var = np.dot(xc, xc)
+            hedge_ratio = float(np.dot(xc, y - y.mean()) / var) if var > 0 else 1.0
                 
         spread = df.iloc[:, 0] - hedge_ratio * df.iloc[:, 1]
         return spread, hedge_ratio
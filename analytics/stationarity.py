@@ -1,4 +1,3 @@
-from statsmodels.tsa.stattools import adfuller
 import pandas as pd
 
 class Stationarity:
@@ -16,6 +15,8 @@ class Stationarity:
              return {"p_value": None, "is_stationary": False, "error": "Not enough data"}
              
         try:
+            # Imported on first use: statsmodels takes over a second to load
+            from statsmodels.tsa.stattools import adfuller
             result = adfuller(clean_series)
             p_value = result[1]
             is_stationary = p_value < 0.05
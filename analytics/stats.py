@@ -1,21 +1,19 @@
 import pandas as pd
 import numpy as np
 
+from analytics.vwap import Vwap
+
 class Stats:
     @staticmethod
-    def calculate_vwap(ohlcv: pd.DataFrame) -> pd.Series:
+    def calculate_vwap(ohlcv: pd.DataFrame, session: str = '1D') -> pd.Series:
         """
-        Calculate VWAP on OHLCV data.
-        Approximate VWAP using (Close * Volume).
-        For a true session VWAP we need a cumulative sum reset at start of day.
-        For this simplified dashboard, we might do a rolling VWAP or just Typical Price * Vol.
+        Session VWAP of the typical price, reset at each UTC session start.
+        Only sessions that begin inside the frame are complete; see analytics.vwap.VwapBook
+        for VWAP anchored on persisted running sums.
         """
         if ohlcv.empty:
             return pd.Series()
-            
-        typical_price = (ohlcv['high'] + ohlcv['low'] + ohlcv['close']) / 3
-        vwap = (typical_price * ohlcv['volume']).cumsum() / ohlcv['volume'].cumsum()
-        return vwap
+        return Vwap.compute(ohlcv, session=session, bands=())['vwap']
 
     @staticmethod
     def calculate_zscore(series: pd.Series, window: int = 20) -> pd.Series:
@@ -0,0 +1,143 @@
+import math
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from analytics.rolling import Rolling
+
+ESTIMATORS = ('close', 'parkinson', 'garman_klass', 'rogers_satchell', 'yang_zhang')
+
+PARKINSON_K = 1.0 / (4.0 * math.log(2.0))
+GARMAN_KLASS_K = 2.0 * math.log(2.0) - 1.0
+
+
+def yang_zhang_k(window: int) -> float:
+    return 0.34 / (1.34 + (window + 1) / (window - 1))
+
+
+class Volatility:
+    """
+    Range-based volatility estimators over OHLC bars.
+
+    Per-bar terms are computed once, turned into cumulative sums once, and every
+    window is a difference of two cumulative sums, so any number of windows
+    costs one O(n) pass each with no pandas rolling. Results are per-bar
+    volatility (standard deviation of log returns), annualized when
+    bars_per_year is given.
+
+    close            close-to-close sample std
+    parkinson        high/low range
+    garman_klass     high/low range and open/close
+    rogers_satchell  drift-independent high/low/open/close
+    yang_zhang       overnight (previous close -> open) + open/close + Rogers-Satchell
+    """
+
+    @staticmethod
+    def bar_terms(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Per-bar log terms shared by the estimators. `gap` and `ret` are 0 on the
+        first bar, which has no previous close; windows that include it are masked.
+        """
+        o = np.log(np.asarray(open_, dtype=np.float64))
+        h = np.log(np.asarray(high, dtype=np.float64))
+        l = np.log(np.asarray(low, dtype=np.float64))
+        c = np.log(np.asarray(close, dtype=np.float64))
+        hl = h - l
+        co = c - o
+        prev_c = np.concatenate([c[:1], c[:-1]])
+        return {
+            'parkinson': PARKINSON_K * hl * hl,
+            'garman_klass': 0.5 * hl * hl - GARMAN_KLASS_K * co * co,
+            'rogers_satchell': (h - c) * (h - o) + (l - c) * (l - o),
+            'co': co,
+            'gap': o - prev_c,
+            'ret': c - prev_c,
+        }
+
+    @staticmethod
+    def _mean(csum: np.ndarray, window: int) -> np.ndarray:
+        return Rolling.window_sum(csum, window) / window
+
+    @staticmethod
+    def _var(csum: np.ndarray, csum2: np.ndarray, window: int) -> np.ndarray:
+        s = Rolling.window_sum(csum, window)
+        s2 = Rolling.window_sum(csum2, window)
+        return np.maximum(s2 - s * s / window, 0.0) / (window - 1)
+
+    @staticmethod
+    def estimate(ohlc: pd.DataFrame, windows: Iterable[int] = (20,), estimators: Iterable[str] = ESTIMATORS,
+                 bars_per_year: float = None) -> pd.DataFrame:
+        """
+        One column per estimator and window, named f"{estimator}_{window}".
+        """
+        windows = [int(w) for w in windows]
+        estimators = list(estimators)
+        if ohlc.empty:
+            return pd.DataFrame(columns=[f"{e}_{w}" for e in estimators for w in windows])
+        terms = Volatility.bar_terms(ohlc['open'].to_numpy(), ohlc['high'].to_numpy(),
+                                     ohlc['low'].to_numpy(), ohlc['close'].to_numpy())
+        n = len(ohlc)
+
+        # One cumulative sum per term, reused by every window
+        csums = {name: Rolling.cumsum0(terms[name]) for name in ('parkinson', 'garman_klass', 'rogers_satchell')}
+        for name in ('co', 'gap', 'ret'):
+            # Shift by the first value for conditioning; variance is unchanged
+            d = terms[name] - terms[name][min(1, n - 1)]
+            csums[name] = Rolling.cumsum0(d)
+            csums[name + '2'] = Rolling.cumsum0(d * d)
+
+        scale = math.sqrt(bars_per_year) if bars_per_year else 1.0
+        out = {}
+        for w in windows:
+            for est in estimators:
+                if est in ('parkinson', 'garman_klass', 'rogers_satchell'):
+                    var = Volatility._mean(csums[est], w)
+                elif est == 'close':
+                    var = Volatility._var(csums['ret'], csums['ret2'], w)
+                    var[:w] = np.nan
+                elif est == 'yang_zhang':
+                    k = yang_zhang_k(w)
+                    var = (Volatility._var(csums['gap'], csums['gap2'], w)
+                           + k * Volatility._var(csums['co'], csums['co2'], w)
+                           + (1 - k) * Volatility._mean(csums['rogers_satchell'], w))
+                    var[:w] = np.nan
+                else:
+                    raise ValueError(f"Unknown estimator {est}")
+                out[f"{est}_{w}"] = np.sqrt(np.maximum(var, 0.0)) * scale
+        return pd.DataFrame(out, index=ohlc.index)
+
+    @staticmethod
+    def realized(ticks: pd.DataFrame, timeframe: str, windows: Iterable[int] = (20,), sample: str = None,
+                 bars_per_year: float = None) -> pd.DataFrame:
+        """
+        Realized volatility from tick log returns: per-bar sum of squared returns,
+        averaged over each window of bars. `sample` (e.g. '1s') takes the last price
+        per interval first to damp microstructure noise.
+        """
+        windows = [int(w) for w in windows]
+        if ticks.empty:
+            return pd.DataFrame(columns=[f"realized_{w}" for w in windows])
+        price = ticks['price'].sort_index()
+        if sample:
+            price = price.resample(sample).last().dropna()
+        log_p = np.log(price.to_numpy(dtype=np.float64))
+        r2 = np.zeros(len(log_p))
+        r2[1:] = np.diff(log_p) ** 2
+        per_bar = pd.Series(r2, index=price.index).resample(timeframe).sum()
+        csum = Rolling.cumsum0(per_bar.to_numpy())
+        scale = math.sqrt(bars_per_year) if bars_per_year else 1.0
+        out = {f"realized_{w}": np.sqrt(Volatility._mean(csum, w)) * scale for w in windows}
+        return pd.DataFrame(out, index=per_bar.index)
+
+    @staticmethod
+    def latest(ohlc: pd.DataFrame, windows: Iterable[int] = (20, 50, 100), bars_per_year: float = None) -> pd.DataFrame:
+        """
+        Last value of every estimator as an (estimator x window) table.
+        """
+        windows = list(windows)
+        est = Volatility.estimate(ohlc, windows, bars_per_year=bars_per_year)
+        last = est.iloc[-1] if len(est) else pd.Series(np.nan, index=est.columns)
+        return pd.DataFrame({f"{w} bars": [last[f"{e}_{w}"] for e in ESTIMATORS] for w in windows},
+                            index=list(ESTIMATORS))
+
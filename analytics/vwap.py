@@ -0,0 +1,361 @@
+import logging
+import threading
+from dataclasses import astuple, dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+DAY_NS = 86_400 * 10 ** 9
+WEEK_NS = 7 * DAY_NS
+# 1970-01-01 was a Thursday; weekly sessions start on Monday 00:00
+MONDAY_OFFSET_NS = 4 * DAY_NS
+NO_SESSION = np.iinfo(np.int64).min
+
+
+def session_starts(ts_ns, session: str = '1D', anchor_ns: int = None) -> np.ndarray:
+    """
+    Session start (int64 ns) of each timestamp. With an anchor there is a single
+    session from the anchor onwards; earlier timestamps get NO_SESSION.
+    """
+    ts = np.asarray(ts_ns, dtype=np.int64)
+    if anchor_ns is not None:
+        return np.where(ts >= anchor_ns, np.int64(anchor_ns), NO_SESSION)
+    if session == '1W':
+        return ts - (ts - MONDAY_OFFSET_NS) % WEEK_NS
+    step = pd.Timedelta(session).value
+    return ts - ts % step
+
+
+def session_key(session: str = '1D', anchor_ns: int = None) -> str:
+    if anchor_ns is not None:
+        return f"anchor@{pd.Timestamp(anchor_ns).isoformat()}"
+    return session
+
+
+@dataclass
+class VwapState:
+    """
+    Running sums of one symbol's current session. Typical prices are stored as
+    offsets from the session's first typical price (`ref`) to keep the variance
+    well conditioned.
+    """
+    symbol: str
+    key: str
+    session_start_ns: int
+    last_bar_ns: int
+    ref: float = 0.0
+    sum_v: float = 0.0
+    sum_dv: float = 0.0
+    sum_ddv: float = 0.0
+
+    @property
+    def vwap(self) -> float:
+        return self.ref + self.sum_dv / self.sum_v if self.sum_v > 0 else np.nan
+
+    @property
+    def std(self) -> float:
+        if self.sum_v <= 0:
+            return np.nan
+        mean = self.sum_dv / self.sum_v
+        return float(np.sqrt(max(self.sum_ddv / self.sum_v - mean * mean, 0.0)))
+
+
+class VwapTracker:
+    """
+    Session- or anchor-reset VWAP of one symbol, one O(1) update per closed bar.
+    Bars at or before the last applied bar are ignored, so replaying bars after
+    a restart does not double count.
+    """
+    def __init__(self, symbol: str, session: str = '1D', anchor_ns: int = None, state: VwapState = None):
+        self.symbol = symbol
+        self.session = session
+        self.anchor_ns = anchor_ns
+        self.state = state or VwapState(symbol, session_key(session, anchor_ns), NO_SESSION, NO_SESSION)
+
+    def update(self, start_ns: int, high: float, low: float, close: float, volume: float) -> bool:
+        s = self.state
+        if start_ns <= s.last_bar_ns:
+            return False
+        session = int(session_starts(start_ns, self.session, self.anchor_ns))
+        if session == NO_SESSION:
+            return False
+        tp = (high + low + close) / 3.0
+        if session != s.session_start_ns:
+            s.session_start_ns = session
+            s.ref = tp
+            s.sum_v = s.sum_dv = s.sum_ddv = 0.0
+        d = tp - s.ref
+        s.sum_v += volume
+        s.sum_dv += d * volume
+        s.sum_ddv += d * d * volume
+        s.last_bar_ns = start_ns
+        return True
+
+
+class Vwap:
+    """
+    VWAP of the typical price (high + low + close) / 3 with volume-weighted
+    standard-deviation bands, reset at each session (UTC day, week, any fixed
+    span) or from an anchor time.
+    """
+
+    @staticmethod
+    def _frame(index, vwap: np.ndarray, std: np.ndarray, bands: Iterable[float]) -> pd.DataFrame:
+        out = {'vwap': vwap, 'std': std}
+        for k in bands:
+            out[f'upper_{k:g}'] = vwap + k * std
+            out[f'lower_{k:g}'] = vwap - k * std
+        return pd.DataFrame(out, index=index)
+
+    @staticmethod
+    def compute(ohlcv: pd.DataFrame, session: str = '1D', anchor_ns: int = None,
+                bands: Iterable[float] = (1, 2)) -> pd.DataFrame:
+        """
+        Batch VWAP over a bar frame: cumulative sums grouped by session.
+        Only sessions that start inside the frame are complete.
+        """
+        if ohlcv.empty:
+            return Vwap._frame(ohlcv.index, np.empty(0), np.empty(0), bands)
+        ts = ohlcv.index.values.astype('datetime64[ns]').astype(np.int64)
+        sess = session_starts(ts, session, anchor_ns)
+        tp = ((ohlcv['high'] + ohlcv['low'] + ohlcv['close']) / 3.0).to_numpy(dtype=np.float64)
+        v = ohlcv['volume'].to_numpy(dtype=np.float64)
+
+        frame = pd.DataFrame({'sess': sess, 'tp': tp, 'v': v})
+        ref = frame.groupby('sess')['tp'].transform('first').to_numpy()
+        d = tp - ref
+        sums = pd.DataFrame({'sess': sess, 'v': v, 'dv': d * v, 'ddv': d * d * v}).groupby('sess').cumsum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = sums['dv'].to_numpy() / sums['v'].to_numpy()
+            var = sums['ddv'].to_numpy() / sums['v'].to_numpy() - mean * mean
+        vwap = ref + mean
+        std = np.sqrt(np.maximum(var, 0.0))
+        outside = sess == NO_SESSION
+        vwap[outside] = np.nan
+        std[outside] = np.nan
+        return Vwap._frame(ohlcv.index, vwap, std, bands)
+
+    @staticmethod
+    def from_state(state: VwapState, bars: pd.DataFrame, session: str = '1D', anchor_ns: int = None,
+                   bands: Iterable[float] = (1, 2)) -> pd.DataFrame:
+        """
+        Per-bar VWAP over a recent window of bars, anchored on persisted session sums
+        rather than on whatever the window happens to contain. Bars of the state's
+        session are offset so the sums at state.last_bar_ns equal the state; later
+        sessions start fresh; earlier ones are NaN.
+        """
+        out = Vwap.compute(bars, session, anchor_ns, bands)
+        if bars.empty or state.sum_v <= 0:
+            return out
+        ts = bars.index.values.astype('datetime64[ns]').astype(np.int64)
+        sess = session_starts(ts, session, anchor_ns)
+        mask = sess == state.session_start_ns
+        if mask.any():
+            tp = ((bars['high'] + bars['low'] + bars['close']) / 3.0).to_numpy(dtype=np.float64)[mask]
+            v = bars['volume'].to_numpy(dtype=np.float64)[mask]
+            d = tp - state.ref
+            cv = np.cumsum(v)
+            cdv = np.cumsum(d * v)
+            cddv = np.cumsum(d * d * v)
+            # Index of the last window bar already included in the state
+            last = np.searchsorted(ts[mask], state.last_bar_ns, side='right') - 1
+            base = (cv[last], cdv[last], cddv[last]) if last >= 0 else (0.0, 0.0, 0.0)
+            sv = state.sum_v + cv - base[0]
+            sdv = state.sum_dv + cdv - base[1]
+            sddv = state.sum_ddv + cddv - base[2]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = sdv / sv
+                std = np.sqrt(np.maximum(sddv / sv - mean * mean, 0.0))
+            vwap = state.ref + mean
+            out.loc[mask, 'vwap'] = vwap
+            out.loc[mask, 'std'] = std
+            for k in bands:
+                out.loc[mask, f'upper_{k:g}'] = vwap + k * std
+                out.loc[mask, f'lower_{k:g}'] = vwap - k * std
+        out.loc[sess < state.session_start_ns] = np.nan
+        return out
+
+
+class VwapBook:
+    """
+    VWAP trackers for many symbols on one bar timeframe, persisted in the
+    vwap_state table so sums survive reruns and restarts.
+
+    Writers (the ingestion daemon, or the analytics service on a writable
+    store) feed closed bars and call persist(). Read-only consumers call
+    refresh() to pick up the writer's latest state. A symbol without persisted
+    state is seeded once from stored bars or ticks since its session start.
+
+    tick_lookback_minutes caps the tick read used when no bars are stored, so a
+    seed on a polling thread never pulls a whole session of ticks; the sums
+    then start at the cap instead of the session start. None reads the session.
+    """
+    def __init__(self, storage, session: str = '1D', anchor_ns: int = None, timeframe: str = '1s',
+                 writable: bool = True, tick_lookback_minutes: Optional[int] = None):
+        self.storage = storage
+        self.session = session
+        self.anchor_ns = anchor_ns
+        self.timeframe = timeframe
+        self.step_ns = pd.Timedelta(timeframe).value
+        self.writable = writable
+        self.tick_lookback_minutes = tick_lookback_minutes
+        self.key = session_key(session, anchor_ns)
+        self.trackers: Dict[str, VwapTracker] = {}
+        self._dirty = set()
+        # Writers run on the service/daemon thread while sessions read series
+        self._lock = threading.RLock()
+
+    def _load(self, symbol: str) -> Optional[VwapState]:
+        row = self.storage.load_vwap_state(symbol, self.key)
+        return VwapState(*row) if row is not None else None
+
+    def tracker(self, symbol: str) -> VwapTracker:
+        with self._lock:
+            tracker = self.trackers.get(symbol)
+            if tracker is None:
+                tracker = VwapTracker(symbol, self.session, self.anchor_ns, self._load(symbol))
+                self.trackers[symbol] = tracker
+                if self.writable and tracker.state.sum_v <= 0:
+                    self._seed(tracker)
+            return tracker
+
+    def _seed(self, tracker: VwapTracker):
+        now_ns = int(np.datetime64(datetime.utcnow(), 'ns').astype(np.int64))
+        start_ns = int(session_starts(now_ns, self.session, self.anchor_ns))
+        if start_ns == NO_SESSION:
+            return
+        n = self._backfill(tracker, start_ns, now_ns)
+        logger.info(f"Seeded {tracker.symbol} VWAP from {n} bars since {pd.Timestamp(start_ns)}")
+
+    def _backfill(self, tracker: VwapTracker, start_ns: int, now_ns: int) -> int:
+        """
+        Apply the stored bars (or, without any, the resampled ticks) from `start_ns`.
+        Returns the number of bars read.
+        """
+        start = pd.Timestamp(start_ns)
+        bars = self.storage.get_bars('live', tracker.symbol, self.timeframe, start=start.isoformat())
+        if bars.empty:
+            minutes = int((now_ns - start_ns) / 60e9) + 1
+            if self.tick_lookback_minutes is not None:
+                minutes = min(minutes, self.tick_lookback_minutes)
+            bars = self._tick_bars(*self.storage.get_tick_arrays(tracker.symbol, lookback_minutes=minutes))
+            bars = bars[bars.index >= start]
+        # The bar still forming is left for later updates
+        self.sync(tracker.symbol, bars, now_ns, backfill=False)
+        return len(bars)
+
+    def _tick_bars(self, ts: np.ndarray, price: np.ndarray, size: np.ndarray) -> pd.DataFrame:
+        """
+        High/low/close/volume of the bars that have ticks, from the tick arrays.
+        Empty bars carry no volume, so leaving them out does not change the sums.
+        """
+        valid = price > 0.0001
+        ts, price, size = ts[valid], price[valid], size[valid]
+        if not len(ts):
+            return pd.DataFrame(columns=['high', 'low', 'close', 'volume'], index=pd.DatetimeIndex([]))
+        order = np.argsort(ts, kind='stable')
+        ts, price, size = ts[order], price[order], size[order]
+        starts = ts - ts % self.step_ns
+        first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+        last = np.r_[first[1:], len(ts)] - 1
+        return pd.DataFrame({
+            'high': np.maximum.reduceat(price, first),
+            'low': np.minimum.reduceat(price, first),
+            'close': price[last],
+            'volume': np.add.reduceat(size, first),
+        }, index=pd.DatetimeIndex(starts[first].astype('datetime64[ns]')))
+
+    def update_bar(self, bar) -> bool:
+        """
+        Apply one closed bar (ingestion.bar_builder.Bar) of this book's timeframe.
+        """
+        if bar.timeframe != self.timeframe:
+            return False
+        with self._lock:
+            applied = self.tracker(bar.symbol).update(bar.start_ns, bar.high, bar.low, bar.close, bar.volume)
+            if applied:
+                self._dirty.add(bar.symbol)
+        return applied
+
+    def sync(self, symbol: str, bars: pd.DataFrame, now_ns: int, backfill: bool = True):
+        """
+        Apply every closed bar of a frame that the tracker has not seen yet. If the
+        frame starts after a gap (the symbol went unwatched longer than the frame,
+        or the state was saved before a restart), the gap is first filled from storage.
+        """
+        if bars.empty:
+            return
+        with self._lock:
+            tracker = self.tracker(symbol)
+            ts = bars.index.values.astype('datetime64[ns]').astype(np.int64)
+            last_ns = tracker.state.last_bar_ns
+            if backfill and last_ns != NO_SESSION and ts[0] > last_ns + self.step_ns:
+                start_ns = max(last_ns + self.step_ns, int(session_starts(now_ns, self.session, self.anchor_ns)))
+                n = self._backfill(tracker, start_ns, now_ns)
+                logger.info(f"Backfilled {symbol} VWAP from {n} bars since {pd.Timestamp(start_ns)}")
+            closed = (ts > tracker.state.last_bar_ns) & (ts + self.step_ns <= now_ns)
+            if not closed.any():
+                return
+            rows = zip(ts[closed].tolist(), bars['high'].to_numpy()[closed].tolist(),
+                       bars['low'].to_numpy()[closed].tolist(), bars['close'].to_numpy()[closed].tolist(),
+                       bars['volume'].to_numpy()[closed].tolist())
+            for start_ns, high, low, close, volume in rows:
+                tracker.update(start_ns, high, low, close, volume)
+            self._dirty.add(symbol)
+
+    def persist(self):
+        with self._lock:
+            if not self.writable or not self._dirty:
+                return
+            states = [astuple(self.trackers[s].state) for s in self._dirty]
+            self._dirty.clear()
+        self.storage.save_vwap_states(states)
+
+    def restore(self, states: Iterable[VwapState]) -> int:
+        """
+        Adopt saved states (e.g. from a checkpoint) of this book's session that are
+        newer than the persisted ones. Returns how many were adopted.
+        """
+        adopted = 0
+        with self._lock:
+            for state in states:
+                if state.key != self.key:
+                    continue
+                current = self._load(state.symbol)
+                if current is not None and current.last_bar_ns >= state.last_bar_ns:
+                    continue
+                self.trackers[state.symbol] = VwapTracker(state.symbol, self.session, self.anchor_ns,
+                                                          VwapState(*astuple(state)))
+                self._dirty.add(state.symbol)
+                adopted += 1
+        return adopted
+
+    def refresh(self, symbol: str):
+        """
+        Reload a symbol's state written by another process.
+        """
+        state = self._load(symbol)
+        if state is not None:
+            with self._lock:
+                self.trackers[symbol] = VwapTracker(symbol, self.session, self.anchor_ns, state)
+
+    def clear(self):
+        """
+        Forget in-memory trackers, e.g. after the database was reset.
+        """
+        with self._lock:
+            self.trackers.clear()
+            self._dirty.clear()
+
+    def series(self, symbol: str, bars: pd.DataFrame, bands: Iterable[float] = (1, 2)) -> pd.DataFrame:
+        """
+        VWAP and bands for each bar of a recent window (bars of this book's timeframe).
+        """
+        with self._lock:
+            state = VwapState(*astuple(self.tracker(symbol).state))
+        return Vwap.from_state(state, bars, self.session, self.anchor_ns, bands)
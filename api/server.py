@@ -0,0 +1,308 @@
+"""
+Async JSON/HTTP analytics API.
+
+Serves the same snapshots the dashboard shows (spread, z-score, hedge ratio,
+correlation), stored bars and alerts, plus a server-sent event stream of
+snapshot updates. Snapshot and bar responses are encoded once per bar close
+and carry an ETag, so clients polling with If-None-Match get a bodiless 304
+until the next bar.
+
+    python -m api.server --db market_data.db --port 8080
+    python -m api.server --db market_data.db --shm qa      # recent ticks from the daemon's rings
+
+    GET /api/health
+    GET /api/snapshot?a=BTCUSDT&b=ETHUSDT&timeframe=1s&window=50&points=0&price=trade   (or mid, micro)
+    GET /api/bars?symbol=BTCUSDT&timeframe=1min&start=...&end=...&source=live
+    GET /api/alerts?limit=50
+    GET /api/stream?a=BTCUSDT&b=ETHUSDT&timeframe=1s&window=50    (text/event-stream)
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+
+import pandas as pd
+from aiohttp import web
+
+from analytics.snapshot_service import AnalyticsService, Snapshot, SnapshotKey
+from storage.datastore import DataStore
+from storage.shm_ring import SharedMarketData
+from storage.tick_buffer import PRICE_SOURCES
+
+logger = logging.getLogger(__name__)
+
+# All API clients share one lease per key, renewed by every request
+API_SESSION = "api"
+TIMEFRAMES = ("1s", "5s", "10s", "30s", "1min")
+ALERTS_TTL = 1.0
+STREAM_POLL = 0.25
+STREAM_HEARTBEAT = 15.0
+
+
+def _clean(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _series(series: pd.Series, points: int) -> dict:
+    tail = series.tail(points)
+    return {
+        'ts': [t.isoformat() for t in tail.index],
+        'values': [_clean(float(v)) for v in tail.to_numpy()],
+    }
+
+
+def snapshot_payload(snapshot: Snapshot, points: int = 0) -> dict:
+    key = snapshot.key
+    payload = {
+        'symbol_a': key.symbol_a,
+        'symbol_b': key.symbol_b,
+        'timeframe': key.timeframe,
+        'window': key.window,
+        'price_source': key.price_source,
+        'bar_time': snapshot.bar_time.isoformat() if snapshot.bar_time is not None else None,
+        'computed_at': snapshot.computed_at,
+        'has_data': snapshot.has_data,
+        'hedge_ratio': _clean(snapshot.hedge_ratio),
+        'zscore': _clean(snapshot.curr_z),
+        'spread': _clean(snapshot.curr_spread),
+        'correlation': _clean(snapshot.curr_corr),
+    }
+    if points:
+        payload['series'] = {
+            'spread': _series(snapshot.spread, points),
+            'zscore': _series(snapshot.zscore, points),
+            'correlation': _series(snapshot.corr, points),
+        }
+    return payload
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+class ResponseCache:
+    """
+    Small LRU of encoded bodies: key -> (version, etag, body).
+    A cached entry is reused while its version (e.g. the bar id) is unchanged.
+    """
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, version, etag: str, body: bytes):
+        entry = (version, etag, body)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+
+class AnalyticsAPI:
+    """
+    aiohttp handlers over an AnalyticsService and a (read-only) DataStore.
+    Blocking storage reads run in the default executor so the event loop stays free.
+    """
+    def __init__(self, storage: DataStore, service: AnalyticsService, bar_source: str = 'live'):
+        self.storage = storage
+        self.service = service
+        self.bar_source = bar_source
+        self.cache = ResponseCache()
+        self.not_modified = 0
+
+    # Helpers
+
+    @staticmethod
+    def _int(request: web.Request, name: str, default: int, lo: int, hi: int) -> int:
+        try:
+            value = int(request.query.get(name, default))
+        except ValueError:
+            raise web.HTTPBadRequest(text=f"{name} must be an integer")
+        return min(max(value, lo), hi)
+
+    def _respond(self, request: web.Request, etag: str, body: bytes) -> web.Response:
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in request.headers.get('If-None-Match', ''):
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type='application/json', headers=headers)
+
+    @staticmethod
+    def _key(request: web.Request) -> SnapshotKey:
+        q = request.query
+        try:
+            a = q['a'].upper()
+            b = q['b'].upper()
+            timeframe = q.get('timeframe', '1s')
+            window = int(q.get('window', 50))
+            price_source = q.get('price', 'trade')
+        except (KeyError, ValueError):
+            raise web.HTTPBadRequest(text="expected a, b and optional timeframe, window (int), price")
+        if timeframe not in TIMEFRAMES or not 2 <= window <= 1000 or price_source not in PRICE_SOURCES:
+            raise web.HTTPBadRequest(text=f"timeframe must be one of {TIMEFRAMES}, window in [2, 1000], "
+                                          f"price one of {PRICE_SOURCES}")
+        return SnapshotKey(a, b, timeframe, window, price_source)
+
+    async def _snapshot(self, key: SnapshotKey) -> Snapshot:
+        snapshot = self.service.latest(key)
+        if snapshot is None:
+            # First request for the key computes it; keep that off the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.service.subscribe, key, API_SESSION)
+        # Renew the lease so the service keeps refreshing the key
+        self.service.subscribe(key, API_SESSION)
+        return snapshot
+
+    def _encode_snapshot(self, snapshot: Snapshot, points: int):
+        cache_key = ('snapshot', snapshot.key, points)
+        # Snapshots are immutable and replaced once per bar close, so the computed_at stamp versions them
+        entry = self.cache.get(cache_key, snapshot.computed_at)
+        if entry is None:
+            body = json.dumps(snapshot_payload(snapshot, points)).encode()
+            entry = self.cache.put(cache_key, snapshot.computed_at,
+                                   make_etag(snapshot.key, snapshot.computed_at, points), body)
+        return entry
+
+    # Handlers
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({'status': 'ok', 'time': time.time(),
+                                  'cache_hits': self.cache.hits, 'cache_misses': self.cache.misses,
+                                  'not_modified': self.not_modified})
+
+    async def snapshot(self, request: web.Request) -> web.Response:
+        key = self._key(request)
+        points = self._int(request, 'points', 0, 0, 5000)
+        _, etag, body = self._encode_snapshot(await self._snapshot(key), points)
+        return self._respond(request, etag, body)
+
+    async def bars(self, request: web.Request) -> web.Response:
+        q = request.query
+        symbol = q.get('symbol', '').upper()
+        timeframe = q.get('timeframe', '1min')
+        if not symbol or timeframe not in TIMEFRAMES:
+            raise web.HTTPBadRequest(text=f"expected symbol and timeframe in {TIMEFRAMES}")
+        start, end = q.get('start'), q.get('end')
+        source = q.get('source', self.bar_source)
+
+        # Stored bars only change when a bar closes
+        version = AnalyticsService._bar_id(timeframe, time.time())
+        cache_key = ('bars', source, symbol, timeframe, start, end)
+        entry = self.cache.get(cache_key, version)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            df = await loop.run_in_executor(None, self.storage.get_bars, source, symbol, timeframe, start, end)
+            payload = {
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'source': source,
+                'ts': [t.isoformat() for t in df.index],
+                **{col: df[col].tolist() for col in ('open', 'high', 'low', 'close', 'volume') if col in df},
+            }
+            body = json.dumps(payload).encode()
+            last = df.index[-1].isoformat() if len(df) else None
+            entry = self.cache.put(cache_key, version, make_etag(cache_key, len(df), last), body)
+        return self._respond(request, entry[1], entry[2])
+
+    async def alerts(self, request: web.Request) -> web.Response:
+        limit = self._int(request, 'limit', 50, 1, 1000)
+        version = int(time.time() / ALERTS_TTL)
+        cache_key = ('alerts', limit)
+        entry = self.cache.get(cache_key, version)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            df = await loop.run_in_executor(None, self.storage.get_latest_alerts, limit)
+            records = df.to_dict('records')
+            body = json.dumps({'alerts': records}, default=str).encode()
+            newest = records[0]['id'] if records else None
+            entry = self.cache.put(cache_key, version, make_etag(cache_key, newest, len(records)), body)
+        return self._respond(request, entry[1], entry[2])
+
+    async def stream(self, request: web.Request) -> web.StreamResponse:
+        """
+        Server-sent events: one `snapshot` event per new snapshot of the key,
+        with a comment line as heartbeat so proxies keep the connection open.
+        """
+        key = self._key(request)
+        points = self._int(request, 'points', 0, 0, 5000)
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream',
+                                               'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+
+        last_version = None
+        last_write = time.monotonic()
+        try:
+            while True:
+                snapshot = await self._snapshot(key)
+                if snapshot.computed_at != last_version:
+                    last_version = snapshot.computed_at
+                    _, etag, body = self._encode_snapshot(snapshot, points)
+                    await response.write(b"event: snapshot\nid: " + etag.strip('"').encode() +
+                                         b"\ndata: " + body + b"\n\n")
+                    last_write = time.monotonic()
+                elif time.monotonic() - last_write > STREAM_HEARTBEAT:
+                    await response.write(b": heartbeat\n\n")
+                    last_write = time.monotonic()
+                await asyncio.sleep(STREAM_POLL)
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        return response
+
+
+def create_app(storage: DataStore, service: AnalyticsService, bar_source: str = 'live') -> web.Application:
+    api = AnalyticsAPI(storage, service, bar_source)
+    app = web.Application()
+    app['api'] = api
+    app.router.add_get('/api/health', api.health)
+    app.router.add_get('/api/snapshot', api.snapshot)
+    app.router.add_get('/api/bars', api.bars)
+    app.router.add_get('/api/alerts', api.alerts)
+    app.router.add_get('/api/stream', api.stream)
+
+    async def start_service(app):
+        service.start()
+
+    async def stop_service(app):
+        service.stop()
+
+    app.on_startup.append(start_service)
+    app.on_cleanup.append(stop_service)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="market_data.db")
+    parser.add_argument("--shm", default=None, metavar="PREFIX", help="read recent ticks from the daemon's rings")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--lookback-minutes", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    storage = DataStore(db_path=args.db, read_only=True)
+    source = SharedMarketData(args.shm) if args.shm else storage
+    service = AnalyticsService(source, lookback_minutes=args.lookback_minutes)
+    web.run_app(create_app(storage, service), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
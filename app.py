@@ -1,34 +1,91 @@
 import streamlit as st
-import time
 import pandas as pd
-import asyncio
-from datetime import datetime
+import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
-import threading
+import os
+import time
+import uuid
+from concurrent.futures import Future
 
 from ingestion.websocket_client import MarketDataClient
+from ingestion.ohlc_loader import OHLCLoader
 from storage.datastore import DataStore
-from analytics.resampler import Resampler
-from analytics.stats import Stats
-from analytics.spread import Spread
-from analytics.correlation import Correlation
+from storage.shm_ring import SharedMarketData
 from analytics.stationarity import Stationarity
+from analytics.alignment import AsOfAligner
+from analytics.backtest import Backtest
+from analytics.volatility import Volatility
+from analytics.mean_reversion import MeanReversion
+from analytics.vwap import Vwap, VwapBook
+from analytics.optimizer import ParameterSweep
+from analytics.snapshot_service import AnalyticsService, SnapshotKey, build_snapshot
 from alerts.alert_engine import AlertEngine
-from ai_assistant.market_assistant import MarketAssistant
+from diagnostics.memory import MemoryTracker, sizeof
 from ui.dashboard import Dashboard
 
 st.set_page_config(page_title="Quant Analytics Dashboard", layout="wide", initial_sidebar_state="expanded")
 
+@st.cache_resource
+def get_memory_tracker():
+    # One tracker per process; above MEMORY_BUDGET_MB of RSS the registered caches are evicted
+    budget_mb = os.getenv("MEMORY_BUDGET_MB")
+    return MemoryTracker(budget_bytes=int(float(budget_mb) * 1e6) if budget_mb else None)
+
+@st.cache_resource
+def get_analytics_service(db_path: str = "market_data.db", read_only: bool = False, shm_prefix: str = None):
+    # With a shared-memory prefix, recent ticks come from the daemon's rings instead of SQLite
+    db = DataStore(db_path=db_path, read_only=read_only)
+    source = SharedMarketData(shm_prefix) if shm_prefix else db
+    # VWAP sums persist in the database; a read-only app follows the daemon's state.
+    # Seeding runs on the service's poll thread, so its tick read is capped at the lookback
+    lookback_minutes = 10
+    vwap = VwapBook(db, writable=not read_only, tick_lookback_minutes=lookback_minutes)
+    service = AnalyticsService(source, lookback_minutes=lookback_minutes, vwap=vwap)
+    service.start()
+    get_memory_tracker().register(f"analytics:{shm_prefix or db_path}", service.memory_usage, service.trim, priority=50)
+    return service
+
+@st.cache_resource
+def get_alert_engine(db_path: str = "market_data.db"):
+    # One engine per process, so a breach watched by several sessions logs one alert per cooldown
+    return AlertEngine(DataStore(db_path=db_path))
+
+@st.cache_resource
+def get_daemon_storage(db_path: str):
+    # Read-only view of the database written by `python -m ingestion.daemon`
+    return DataStore(db_path=db_path, read_only=True)
+
+@st.cache_resource
+def get_ai_broker():
+    # One assistant per process: the response cache and rate limit are shared by all sessions.
+    # Built on the first AI request, so the provider SDK never loads for sessions that skip the AI tab.
+    from ai_assistant.market_assistant import MarketAssistant
+    from ai_assistant.request_broker import AssistantBroker
+    broker = AssistantBroker(MarketAssistant())
+    get_memory_tracker().register("ai_cache", lambda: sizeof(broker.cache.values()), broker.cache.clear, priority=10)
+    return broker
+
+@st.cache_resource
+def get_profiler():
+    # One sampler per process: it sees the reruns of every session, the feed and the analytics thread
+    from diagnostics.sampling_profiler import SamplingProfiler
+    return SamplingProfiler(out_dir="profiles")
+
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 if 'storage' not in st.session_state:
     st.session_state.storage = DataStore(db_path="market_data.db")
     
-if 'alert_engine' not in st.session_state:
-    st.session_state.alert_engine = AlertEngine(st.session_state.storage)
-    
-if 'assistant' not in st.session_state:
-    st.session_state.assistant = MarketAssistant()
+alert_engine = get_alert_engine()
+
+if 'ai_commentary' not in st.session_state:
+    st.session_state.ai_commentary = ""
+
+if 'ai_chat' not in st.session_state:
+    st.session_state.ai_chat = []
 
 if 'md_client' not in st.session_state:
     st.session_state.md_client = None
@@ -36,175 +93,437 @@ if 'md_client' not in st.session_state:
 st.sidebar.title("Configuration")
 
 st.sidebar.markdown("### Data Source")
-data_source = st.sidebar.radio("Select Data Source", ["Live Feed", "Upload OHLC Data"])
+data_source = st.sidebar.radio("Select Data Source", ["Live Feed", "Ingestion Daemon", "Upload OHLC Data"])
+# Live sources: the in-app feed, or a separate ingestion daemon process writing the database
+live_source = data_source in ("Live Feed", "Ingestion Daemon")
 
+if data_source == "Ingestion Daemon":
+    daemon_db = st.sidebar.text_input("Daemon database", value="market_data.db")
+    shm_prefix = st.sidebar.text_input("Shared memory prefix", value="", help="Prefix passed to the daemon's --shm; leave empty to read recent ticks from the database")
+    try:
+        storage = get_daemon_storage(daemon_db)
+    except FileNotFoundError as e:
+        st.error(str(e))
+        st.code("python -m ingestion.daemon --symbols BTCUSDT ETHUSDT --db " + daemon_db)
+        st.stop()
+    analytics_service = get_analytics_service(daemon_db, read_only=True, shm_prefix=shm_prefix or None)
+else:
+    storage = st.session_state.storage
+    analytics_service = get_analytics_service()
+
+uploaded_file = None
 if data_source == "Upload OHLC Data":
     uploaded_file = st.sidebar.file_uploader("Upload CSV/JSON OHLC Data", type=["csv", "json"])
+    persist_upload = st.sidebar.checkbox("Store upload in DB", value=True, help="Keep parsed bars in the database so the file is not re-parsed on every rerun")
     if uploaded_file:
         st.sidebar.success("File uploaded successfully!")
         
+view_mode = st.sidebar.radio("View", ["Single Pair", "Multi-Pair Monitor"], horizontal=True)
 symbol_a = st.sidebar.text_input("Symbol A", value="BTCUSDT")
 symbol_b = st.sidebar.text_input("Symbol B", value="ETHUSDT")
+monitor_pairs = [(symbol_a, symbol_b)]
+if view_mode == "Multi-Pair Monitor":
+    pairs_text = st.sidebar.text_area("Pairs (one A/B per line)", value="BTCUSDT/ETHUSDT\nBTCUSDT/SOLUSDT\nETHUSDT/SOLUSDT")
+    monitor_pairs = [tuple(s.strip() for s in p.upper().split('/', 1)) for p in pairs_text.splitlines() if '/' in p]
+    monitor_pairs = [(a, b) for a, b in monitor_pairs if a and b]
+feed_symbols = sorted({s for pair in monitor_pairs for s in pair} | {symbol_a, symbol_b})
 timeframe = st.sidebar.selectbox("Timeframe", ["1s", "5s", "10s", "30s", "1min"], index=0)
 window = st.sidebar.slider("Rolling Window", 10, 200, 50)
 z_thresh = st.sidebar.slider("Z-Score Threshold", 1.0, 3.0, 2.0, 0.1)
+PRICE_SOURCES = {"Trade": "trade", "Mid": "mid", "Microprice": "micro"}
+price_source = 'trade'
+if live_source:
+    price_source = PRICE_SOURCES[st.sidebar.selectbox(
+        "Price source", list(PRICE_SOURCES),
+        help="Bars from trade prices, or from the top-of-book mid / microprice, which do not bounce "
+             "between bid and ask. Quote prices need bookTicker quotes (Live Feed option or daemon "
+             "--streams bookTicker); shared-memory rings carry trades only.")]
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Data Feed")
 
 if data_source == "Live Feed":
+    feed_streams = ["aggTrade" if st.sidebar.checkbox("Aggregate trades (aggTrade)", value=False, help="One message per taker order instead of per fill") else "trade"]
+    if st.sidebar.checkbox("Top-of-book quotes (bookTicker)", value=price_source != 'trade'):
+        feed_streams.append("bookTicker")
     if st.sidebar.button("Start / Restart Feed"):
         if st.session_state.md_client:
             st.session_state.md_client.stop()
-        st.session_state.md_client = MarketDataClient(st.session_state.storage, [symbol_a, symbol_b])
+        st.session_state.md_client = MarketDataClient(st.session_state.storage, feed_symbols, streams=feed_streams)
         st.session_state.md_client.start()
 
     if st.sidebar.button("Reset Data (Clear DB)"):
         if st.session_state.md_client:
             st.session_state.md_client.stop()
         st.session_state.storage.clear_db()
+        analytics_service.clear()
         st.cache_data.clear()
         st.rerun()
+elif data_source == "Ingestion Daemon":
+    st.sidebar.info("Feed, bars and alerts run in the ingestion daemon; the dashboard is read-only.")
 else:
     st.sidebar.info("Using uploaded data - live feed disabled")
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Chart Updates")
 
-live_update = st.sidebar.checkbox("Live Update", value=True, help="Enable real-time chart updates (refreshes entire page)")
-auto_refresh = st.sidebar.checkbox("Auto-Refresh Charts", value=True, help="Automatically refresh charts every 3 seconds (only when Live Update is ON)")
+live_update = st.sidebar.checkbox("Live Update", value=True, help="Enable real-time updates of the live panels")
+auto_refresh = st.sidebar.checkbox("Auto-Refresh Charts", value=True, help="Refresh each live panel on its own schedule (only when Live Update is ON)")
+
+# Per-panel refresh intervals in seconds; None disables the timer so the panel only reruns on interaction.
+refresh_enabled = live_update and auto_refresh and live_source
+SIGNAL_REFRESH = 1 if refresh_enabled else None
+CHART_REFRESH = 3 if refresh_enabled else None
+STATS_REFRESH = 5 if refresh_enabled else None
+ALERTS_REFRESH = 10 if refresh_enabled else None
+ALERT_PAGE_SIZE = 50
+
+if os.getenv("ADMIN_TOOLS", "0").lower() in ("1", "true", "yes"):
+    st.sidebar.markdown("---")
+    with st.sidebar.expander("Admin: Profiler"):
+        profiler = get_profiler()
+        profile_seconds = st.number_input("Capture seconds", 1, 300, 10, key="profile_seconds")
+        if st.button("Profile all threads", disabled=profiler.running):
+            profiler.start(profile_seconds)
+        if profiler.running:
+            st.info(f"Sampling... {max(profiler.ends_at - time.monotonic(), 0):.0f}s left")
+        elif profiler.result is not None:
+            Dashboard.render_profile(profiler.result, profiler.paths)
+    with st.sidebar.expander("Admin: Memory"):
+        memory = get_memory_tracker()
+        Dashboard.render_memory(memory.report(), memory.budget_bytes)
+        st.button("Evict caches now", on_click=memory.enforce, kwargs={'force': True})
+        tracing = st.checkbox("Trace allocations (tracemalloc)", value=memory.tracing(), help="Slows every allocation while on")
+        if tracing != memory.tracing():
+            memory.start_tracing() if tracing else memory.stop_tracing()
+        if tracing:
+            st.button("Take snapshot", on_click=lambda: memory.take_snapshot(time.strftime("%H:%M:%S")))
+            labels = list(memory.snapshots)
+            if len(labels) >= 2:
+                st.caption(f"Growth from {labels[0]} to {labels[-1]}")
+                st.dataframe(memory.diff(labels[0], labels[-1]), use_container_width=True)
+
 Dashboard.inject_css()
 
-st.title(f"Quant Dashboard: {symbol_a} / {symbol_b}")
+if view_mode == "Multi-Pair Monitor":
+    st.title(f"Quant Dashboard: {len(monitor_pairs)} Pairs")
+else:
+    st.title(f"Quant Dashboard: {symbol_a} / {symbol_b}")
 
-signal_bar_placeholder = st.empty()
+snapshot_key = SnapshotKey(symbol_a, symbol_b, timeframe, window, price_source)
+session_keys = {SnapshotKey(a, b, timeframe, window, price_source) for a, b in monitor_pairs} | {snapshot_key}
+# Release keys this session no longer displays so the service can evict them
+for old_key in st.session_state.get('snapshot_keys', set()) - session_keys:
+    analytics_service.unsubscribe(old_key, st.session_state.session_id)
+st.session_state.snapshot_keys = session_keys
 
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Prices", "Stats", "Spread & Z-Score", "Correlation", "Alerts", "AI Chat"])
+if data_source == "Upload OHLC Data" and uploaded_file is not None:
+    df_a = pd.DataFrame()
+    df_b = pd.DataFrame()
+    try:
+        source = OHLCLoader.fingerprint(uploaded_file, uploaded_file.name)
+        cache_key = (source, symbol_a, symbol_b, persist_upload)
+        cached = st.session_state.get('upload_frames')
+        if cached is not None and cached[0] == cache_key:
+            frames = cached[1]
+        elif persist_upload and storage.get_bar_symbols(source):
+            frames = OHLCLoader.load_stored(storage, source, [symbol_a, symbol_b])
+        else:
+            with st.spinner("Parsing upload..."):
+                frames = OHLCLoader.load(uploaded_file, uploaded_file.name, [symbol_a, symbol_b],
+                                         storage=storage if persist_upload else None,
+                                         source=source)
+        st.session_state.upload_frames = (cache_key, frames)
+        df_a, df_b = frames[symbol_a], frames[symbol_b]
+        
+        if df_a.empty or df_b.empty:
+            st.warning(f"No rows for {symbol_a if df_a.empty else symbol_b} in the uploaded file.")
+            
+    except Exception as e:
+        st.error(f"Error processing uploaded file: {e}")
+    st.session_state.upload_snapshot = build_snapshot(snapshot_key, df_a, df_b)
+else:
+    st.session_state.upload_snapshot = None
+    # Parsed uploads are only kept while the upload source is selected
+    st.session_state.pop('upload_frames', None)
 
-curr_z = 0.0
-curr_spread = 0.0
-curr_corr = 0.0
-hedge_ratio = 1.0
-spread = pd.Series()
-zscore = pd.Series()
-corr = pd.Series()
-df_a = pd.DataFrame()
-df_b = pd.DataFrame()
+memory = get_memory_tracker()
+# An eviction elsewhere in the process also drops what this session can recompute
+if st.session_state.get('memory_generation', memory.generation) != memory.generation:
+    for key in ('sweep_results', 'adf_result', 'upload_frames'):
+        st.session_state.pop(key, None)
+st.session_state.memory_generation = memory.generation
+memory.report_usage(f"session:{st.session_state.session_id[:8]}", sizeof(dict(st.session_state)))
+memory.maybe_enforce()
 
-if 'last_slow_update' not in st.session_state:
-    st.session_state.last_slow_update = 0
 
-placeholder = st.empty()
+def current_snapshot():
+    """
+    Latest snapshot for this session: the uploaded data, or the shared live one.
+    Fragments call this on every run, which also renews the session's lease.
+    """
+    if st.session_state.upload_snapshot is not None:
+        return st.session_state.upload_snapshot
+    return analytics_service.subscribe(snapshot_key, st.session_state.session_id)
 
-if live_update:
-    if data_source == "Upload OHLC Data" and 'uploaded_file' in locals() and uploaded_file is not None:
-        try:
-            if uploaded_file.name.endswith('.csv'):
-                upload_df = pd.read_csv(uploaded_file)
-            else:
-                upload_df = pd.read_json(uploaded_file)
-            
-            upload_df['timestamp'] = pd.to_datetime(upload_df['timestamp'])
-            upload_df = upload_df.set_index('timestamp')
-            
-            df_a = upload_df[upload_df.index.to_series().apply(lambda x: symbol_a.replace('USDT', '') in str(x))] if 'symbol' in upload_df.columns else upload_df
-            df_b = upload_df[upload_df.index.to_series().apply(lambda x: symbol_b.replace('USDT', '') in str(x))] if 'symbol' in upload_df.columns else upload_df
-            
-            if df_a.empty or df_b.empty:
-                df_a = upload_df.copy()
-                df_b = upload_df.copy()
-                
-        except Exception as e:
-            st.error(f"Error processing uploaded file: {e}")
-            df_a = pd.DataFrame()
-            df_b = pd.DataFrame()
-    else:
-        # Fetch raw ticks
-        df_a_ticks = st.session_state.storage.get_ticks(symbol_a, lookback_minutes=10)
-        df_b_ticks = st.session_state.storage.get_ticks(symbol_b, lookback_minutes=10)
-        
-        # Resample to OHLCV
-        df_a = Resampler.resample(df_a_ticks, timeframe)
-        df_b = Resampler.resample(df_b_ticks, timeframe)
-    
-    
-    if df_a.empty or df_b.empty:
-        spread = pd.Series()
-        zscore = pd.Series()
-        corr = pd.Series()
-        curr_z = 0.0
-        curr_spread = 0.0
-        curr_corr = 0.0
-        if st.session_state.md_client is None:
-             st.warning("Feed not started. Click 'Start / Restart Feed'.")
-    elif 'close' not in df_a.columns or 'close' not in df_b.columns:
+
+@st.fragment(run_every=SIGNAL_REFRESH)
+def signal_panel():
+    snapshot = current_snapshot()
+    if not snapshot.has_data:
+        if st.session_state.md_client is None and data_source == "Live Feed":
+            st.warning("Feed not started. Click 'Start / Restart Feed'.")
+    elif 'close' not in snapshot.df_a.columns or 'close' not in snapshot.df_b.columns:
         st.warning("Data error: 'close' column missing.")
-        spread = pd.Series(); zscore = pd.Series(); corr = pd.Series()
-        curr_z = 0.0; curr_spread = 0.0; curr_corr = 0.0; hedge_ratio = 1.0
-    else:
-        spread, hedge_ratio = Spread.calculate_spread(df_a['close'], df_b['close'])
-        if hedge_ratio is None:
-            hedge_ratio = 1.0
-        zscore = Stats.calculate_zscore(spread, window=window)
-        corr = Correlation.rolling_correlation(df_a['close'], df_b['close'], window=window)
+
+    if data_source != "Ingestion Daemon":
+        # The daemon evaluates alerts itself on every closed bar
+        alert_engine.check_alerts(symbol_a, symbol_b, snapshot.curr_z, z_thresh)
+    Dashboard.render_compact_signal(snapshot.curr_z, z_thresh)
+
+
+@st.fragment(run_every=CHART_REFRESH)
+def prices_panel():
+    snapshot = current_snapshot()
+    Dashboard.render_prices(snapshot.df_a, snapshot.df_b, symbol_a, symbol_b)
+
+    if st.checkbox("Show session VWAP", key="vwap_on"):
+        vwap_symbol = st.radio("VWAP symbol", [symbol_a, symbol_b], horizontal=True, key="vwap_symbol")
+        df = snapshot.df_a if vwap_symbol == symbol_a else snapshot.df_b
+        if st.session_state.upload_snapshot is not None:
+            vwap = Vwap.compute(df)
+        else:
+            # Session sums come from the persisted state, not just the lookback window
+            book = analytics_service.vwap
+            base = analytics_service.bar_cache.get_bars(vwap_symbol, book.timeframe)
+            vwap = book.series(vwap_symbol, base)
+            if timeframe != book.timeframe and not vwap.empty:
+                vwap = vwap.resample(timeframe).last()
+        Dashboard.render_vwap(df, vwap, vwap_symbol)
+
+
+@st.fragment(run_every=STATS_REFRESH)
+def stats_panel():
+    snapshot = current_snapshot()
+    spread = snapshot.spread
+    if not spread.empty:
+        stats = {
+            "Symbol A Current": snapshot.df_a['close'].iloc[-1] if not snapshot.df_a.empty else 0,
+            "Symbol B Current": snapshot.df_b['close'].iloc[-1] if not snapshot.df_b.empty else 0,
+            "Hedge Ratio": snapshot.hedge_ratio,
+            "Spread Mean": spread.mean(),
+            "Spread Std": spread.std(),
+            "Correlation Mean": snapshot.corr.mean(),
+            "Data Points": len(spread)
+        }
+        Dashboard.render_stats_grid(stats)
+
+        st.markdown("---")
+        st.subheader("Volatility (annualized)")
+        bars_per_year = Backtest.bars_per_year(snapshot.df_a.index)
+        Dashboard.render_volatility({
+            symbol_a: Volatility.latest(snapshot.df_a, bars_per_year=bars_per_year),
+            symbol_b: Volatility.latest(snapshot.df_b, bars_per_year=bars_per_year),
+        })
         
-        curr_z = zscore.iloc[-1] if not zscore.empty and not pd.isna(zscore.iloc[-1]) else 0.0
-        curr_spread = spread.iloc[-1] if not spread.empty and not pd.isna(spread.iloc[-1]) else 0.0
-        curr_corr = corr.iloc[-1] if not corr.empty and not pd.isna(corr.iloc[-1]) else 0.0
-    
-    st.session_state.alert_engine.check_alerts(symbol_a, symbol_b, curr_z, z_thresh)
-    
-    with signal_bar_placeholder.container():
-        Dashboard.render_compact_signal(curr_z, z_thresh)
-    
-    
+        st.markdown("---")
+        st.subheader("Mean Reversion")
+        values = spread.dropna().to_numpy()
+        Dashboard.render_mean_reversion(MeanReversion.half_life(values), MeanReversion.hurst(values),
+                                        *MeanReversion.variance_ratio(values))
+
+        st.markdown("---")
+        st.subheader("Stationarity Test")
+        if st.button("Run ADF Test", key="adf_test_btn"):
+            st.session_state.adf_result = Stationarity.adf_test(spread)
+        if 'adf_result' in st.session_state:
+            st.json(st.session_state.adf_result)
+    else:
+        st.info("Insufficient data for stats.")
+
+
+@st.fragment(run_every=CHART_REFRESH)
+def spread_panel():
+    snapshot = current_snapshot()
+    Dashboard.render_spread_and_zscore(snapshot.spread, snapshot.zscore, z_thresh)
+
+    if live_source and st.checkbox("Show tick-level (as-of) spread", key="tick_spread_on"):
+        tolerance = st.slider("Staleness tolerance (s)", 0.1, 10.0, 2.0, 0.1, key="tick_spread_tol")
+        ts_a, px_a, _ = analytics_service.bar_cache.tick_arrays(symbol_a, price_source)
+        ts_b, px_b, _ = analytics_service.bar_cache.tick_arrays(symbol_b, price_source)
+        tick_spread, tick_z, tick_hedge, stale = AsOfAligner.tick_spread(
+            ts_a, px_a, ts_b, px_b, tolerance_ns=int(tolerance * 1e9), window=window)
+        st.caption(f"{len(tick_spread)} aligned events, hedge ratio {tick_hedge:.4f}, {stale:.1%} dropped as stale")
+        Dashboard.render_spread_and_zscore(tick_spread, tick_z, z_thresh, key="tick_spread_chart")
+
+
+@st.fragment(run_every=CHART_REFRESH)
+def correlation_panel():
+    Dashboard.render_correlation(current_snapshot().corr)
+
+    if live_source and st.checkbox("Show universe correlation matrix", key="corr_matrix_on"):
+        # Every symbol the daemon has bars for, or this session's feed symbols
+        default = storage.get_bar_symbols('live') if data_source == "Ingestion Daemon" else feed_symbols
+        universe = st.text_input("Universe", value=" ".join(default or feed_symbols), key="corr_universe")
+        halflife = st.slider("EWM half-life (bars)", 10, 600, 60, 10, key="corr_halflife")
+        symbols = sorted({s.upper() for s in universe.split()})
+        matrix = analytics_service.correlation_matrix(symbols, timeframe, halflife, price_source)
+        Dashboard.render_correlation_matrix(matrix.corr_frame(), matrix.eigen_stats(), matrix.count)
+
+
+@st.fragment(run_every=ALERTS_REFRESH)
+def alerts_panel():
+    # Every query below reads a bounded index range or the hourly rollup, whatever the history size
+    Dashboard.render_alert_summary(storage.get_alert_summary(hours=24))
+
+    st.markdown("---")
+    st.subheader("Episodes")
+    Dashboard.render_alert_episodes(storage.get_alert_episodes(limit=20))
+
+    st.subheader("Alert Log")
+    # Keyset cursors of the pages above the current one
+    cursors = st.session_state.setdefault('alert_cursors', [])
+    page = storage.get_alerts_page(ALERT_PAGE_SIZE, before=cursors[-1] if cursors else None)
+    Dashboard.render_alerts(page)
+    c1, c2, _ = st.columns([1, 1, 4])
+    # Callbacks run before the next render, so the page matches the buttons
+    c1.button("Newer", key="alerts_newer", disabled=not cursors, on_click=cursors.pop)
+    if len(page) == ALERT_PAGE_SIZE:
+        cursor = (page['timestamp'].iloc[-1], int(page['id'].iloc[-1]))
+        c2.button("Older", key="alerts_older", on_click=cursors.append, args=(cursor,))
+
+
+@st.fragment(run_every=SIGNAL_REFRESH)
+def multi_pair_panel():
+    rows = []
+    for a, b in monitor_pairs:
+        snapshot = analytics_service.subscribe(SnapshotKey(a, b, timeframe, window, price_source), st.session_state.session_id)
+        if data_source != "Ingestion Daemon":
+            alert_engine.check_alerts(a, b, snapshot.curr_z, z_thresh)
+        rows.append({
+            'pair': f"{a} / {b}",
+            'z_score': snapshot.curr_z,
+            'correlation': snapshot.curr_corr,
+            'hedge_ratio': snapshot.hedge_ratio,
+        })
+    Dashboard.render_pair_grid(rows, z_thresh)
+
+    st.markdown("---")
+    st.subheader("Mean Reversion Screen")
+    # All pairs at once from the cached bars of every monitored symbol
+    symbols = sorted({s for pair in monitor_pairs for s in pair})
+    closes = {s: analytics_service.bar_cache.get_bars(s, timeframe, price_source).get('close') for s in symbols}
+    prices = pd.DataFrame({s: c for s, c in closes.items() if c is not None})
+    Dashboard.render_mean_reversion_screen(MeanReversion.screen(prices, monitor_pairs))
+
+    st.markdown("---")
+    st.subheader("Shared Bar Cache")
+    Dashboard.render_cache_stats(analytics_service.bar_cache.stats())
+
+
+@st.fragment
+def optimizer_panel():
+    # No timer: a sweep only runs when requested.
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        win_range = st.slider("Window range", 10, 200, (20, 120), key="opt_windows")
+        win_step = st.number_input("Window step", 1, 50, 10, key="opt_win_step")
+    with c2:
+        z_range = st.slider("Threshold range", 1.0, 3.0, (1.0, 3.0), 0.1, key="opt_z")
+        z_step = st.number_input("Threshold step", 0.05, 1.0, 0.25, 0.05, key="opt_z_step")
+    with c3:
+        opt_timeframes = st.multiselect("Timeframes", ["1s", "5s", "10s", "30s", "1min"], default=[timeframe], key="opt_tfs")
+        opt_methods = st.multiselect("Hedge ratio", ["static", "rolling"], default=["static"], key="opt_methods")
+        cost_bps = st.number_input("Cost (bps)", 0.0, 50.0, 0.0, 0.5, key="opt_cost")
+
+    metric = st.selectbox("Heatmap metric", ["sharpe", "net_pnl", "max_drawdown", "win_rate", "num_trades"], key="opt_metric")
+
+    if st.button("Run Sweep", key="opt_run"):
+        windows = range(win_range[0], win_range[1] + 1, int(win_step))
+        thresholds = np.round(np.arange(z_range[0], z_range[1] + 1e-9, z_step), 2)
+        params = ParameterSweep.grid(windows, thresholds, opt_timeframes, opt_methods)
+        with st.spinner(f"Backtesting {len(params)} combinations..."):
+            sweep = ParameterSweep.from_storage(storage, symbol_a, symbol_b, opt_timeframes, lookback_minutes=60 * 24)
+            st.session_state.sweep_results = sweep.run(params, cost_bps=cost_bps)
+
+    results = st.session_state.get('sweep_results', pd.DataFrame())
+    Dashboard.render_sweep_heatmap(results, metric)
+    if not results.empty:
+        st.dataframe(results.sort_values(metric, ascending=False).head(20))
+
+
+def ai_pending() -> bool:
+    commentary = st.session_state.ai_commentary
+    futures = [commentary] if isinstance(commentary, Future) else []
+    futures += [f for _, f in st.session_state.ai_chat]
+    return any(not f.done() for f in futures)
+
+
+@st.fragment
+def chat_controls():
+    # No timer: only reruns when the button is pressed. The full rerun after a
+    # request registers ai_results_panel with its polling timer.
+    if st.button("Analyze Market", key="analyze_btn"):
+        snapshot = current_snapshot()
+        st.session_state.ai_commentary = get_ai_broker().submit_commentary(snapshot.curr_z, snapshot.curr_corr)
+        st.rerun()
+
+
+def ai_results_panel():
+    # Polls the broker's futures every second while a request is pending, so
+    # replies appear without blocking the page; idle sessions do not poll.
+    commentary = st.session_state.ai_commentary
+    pending = isinstance(commentary, Future) and not commentary.done()
+    if isinstance(commentary, Future) and not pending:
+        commentary = commentary.result()
+    Dashboard.render_ai_commentary(commentary, pending=pending)
+
+    history = [(q, f.result() if f.done() else None) for q, f in st.session_state.ai_chat]
+    Dashboard.render_ai_history(history)
+    if st.session_state.ai_polling and not ai_pending():
+        # Last reply in: one full rerun registers the panel again without the timer
+        st.rerun()
+
+
+@st.fragment
+def chat_input_panel():
+    user_input = st.chat_input("Ask about the market...")
+    if user_input:
+        snapshot = current_snapshot()
+        context = {
+            'z_score': snapshot.curr_z,
+            'spread': snapshot.curr_spread,
+            'correlation': snapshot.curr_corr,
+        }
+        st.session_state.ai_chat.append((user_input, get_ai_broker().submit_question(user_input, context)))
+        st.session_state.ai_chat = st.session_state.ai_chat[-20:]
+        st.rerun()
+
+
+if live_update and view_mode == "Multi-Pair Monitor":
+    multi_pair_panel()
+
+elif live_update:
+    signal_panel()
+
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Prices", "Stats", "Spread & Z-Score", "Correlation", "Alerts", "AI Chat", "Optimizer"])
+
     with tab1:
-        Dashboard.render_prices(df_a, df_b, symbol_a, symbol_b)
+        prices_panel()
         
     with tab2:
-        if not spread.empty:
-            stats = {
-                "Symbol A Current": df_a['close'].iloc[-1] if not df_a.empty else 0,
-                "Symbol B Current": df_b['close'].iloc[-1] if not df_b.empty else 0,
-                "Hedge Ratio": hedge_ratio,
-                "Spread Mean": spread.mean(),
-                "Spread Std": spread.std(),
-                "Correlation Mean": corr.mean(),
-                "Data Points": len(spread)
-            }
-            Dashboard.render_stats_grid(stats)
-            
-            st.markdown("---")
-            st.subheader("Stationarity Test")
-            if st.button("Run ADF Test", key="adf_test_btn"):
-                res = Stationarity.adf_test(spread)
-                st.json(res)
-        else:
-            st.info("Insufficient data for stats.")
+        stats_panel()
         
     with tab3:
-        Dashboard.render_spread_and_zscore(spread, zscore, z_thresh)
+        spread_panel()
         
     with tab4:
-        Dashboard.render_correlation(corr)
+        correlation_panel()
             
     with tab5:
-        alerts = st.session_state.storage.get_latest_alerts()
-        Dashboard.render_alerts(alerts)
+        alerts_panel()
         
     with tab6:
-        st.info("💡 Tip: Turn off 'Live Update' in the sidebar for a smoother chat experience without page refreshes.")
-        
-        context = {
-            'z_score': curr_z,
-            'spread': curr_spread,
-            'correlation': curr_corr,
-        }
-        
-        
-        if 'ai_commentary' not in st.session_state:
-            st.session_state.ai_commentary = ""
-
         st.markdown("""
         <style>
         .stButton > button {
@@ -225,23 +544,14 @@ if live_update:
         }
         </style>
         """, unsafe_allow_html=True)
-        
-        if st.button("Analyze Market", key="analyze_btn"):
-             with st.spinner("Analyzing..."):
-                st.session_state.ai_commentary = st.session_state.assistant.generate_commentary(curr_z, curr_corr, {})
-                st.rerun()
 
-        user_input = Dashboard.render_ai_chat(st.session_state.ai_commentary, st.session_state.assistant)
-        
-        if user_input:
-            with st.spinner("Thinking..."):
-                answer = st.session_state.assistant.answer_question(user_input, context)
-            st.markdown(f"**You:** {user_input}")
-            st.markdown(f"**Analyst:** {answer}")
-
-    if st.session_state.md_client is not None and st.session_state.md_client.running and auto_refresh:
-        time.sleep(3)
-        st.rerun()
+        chat_controls()
+        st.session_state.ai_polling = ai_pending()
+        st.fragment(ai_results_panel, run_every=1 if st.session_state.ai_polling else None)()
+        chat_input_panel()
+
+    with tab7:
+        optimizer_panel()
 
 else:
     st.info("Live update paused. Check 'Live Update' in sidebar to resume.")
@@ -0,0 +1,138 @@
+"""
+Load test for the analytics API.
+
+Starts `python -m api.server` on a synthetic database (or targets --url) and
+runs many concurrent polling clients against /api/snapshot, once sending
+If-None-Match with the last ETag and once without, then reports requests/sec,
+status mix and latency percentiles.
+
+    python -m benchmarks.api_load_test --clients 200 --seconds 10
+    python -m benchmarks.api_load_test --clients 200 --points 600    # larger bodies
+    python -m benchmarks.api_load_test --url http://localhost:8080 --clients 500
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+import numpy as np
+
+from storage.datastore import DataStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERY = "/api/snapshot?a=BTCUSDT&b=ETHUSDT&timeframe=1s&window=50&points={points}"
+
+
+def synthetic_db(minutes: int = 10, rate: int = 20, seed: int = 0) -> str:
+    """
+    Recent BTC/ETH ticks (UTC timestamps, like the storage lookback) at `rate` per second each.
+    """
+    path = os.path.join(tempfile.mkdtemp(), "api_load.db")
+    store = DataStore(db_path=path)
+    rng = np.random.default_rng(seed)
+    n = minutes * 60 * rate
+    start = datetime.utcnow() - timedelta(minutes=minutes)
+    stamps = [(start + timedelta(seconds=i / rate)).isoformat() for i in range(n)]
+    btc = 97000 + np.cumsum(rng.normal(0, 2, n))
+    eth = 0.035 * btc + rng.normal(0, 1, n)
+    ticks = [{'symbol': s, 'ts': t, 'price': float(p), 'size': 0.01}
+             for s, series in (("BTCUSDT", btc), ("ETHUSDT", eth)) for t, p in zip(stamps, series)]
+    store.store_ticks(ticks)
+    return path
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url + "/api/health") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not become ready")
+
+
+async def client(session: aiohttp.ClientSession, url: str, deadline: float, use_etag: bool, stats: dict):
+    url = url + QUERY.format(points=stats['points'])
+    etag = None
+    while time.monotonic() < deadline:
+        headers = {'If-None-Match': etag} if use_etag and etag else {}
+        start = time.perf_counter()
+        async with session.get(url, headers=headers) as resp:
+            body = await resp.read()
+            stats['latency'].append(time.perf_counter() - start)
+            stats[resp.status] = stats.get(resp.status, 0) + 1
+            stats['bytes'] += len(body)
+            etag = resp.headers.get('ETag', etag)
+
+
+async def run(url: str, clients: int, seconds: float, use_etag: bool, points: int) -> dict:
+    stats = {'latency': [], 'bytes': 0, 'points': points}
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Warm the server's snapshot for the key before timing
+        async with session.get(url + QUERY.format(points=points)) as resp:
+            await resp.read()
+        deadline = time.monotonic() + seconds
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session, url, deadline, use_etag, stats) for _ in range(clients)))
+        stats['elapsed'] = time.perf_counter() - started
+    return stats
+
+
+def report(label: str, stats: dict):
+    lat = np.array(stats['latency']) * 1000
+    total = len(lat)
+    print(f"\n== {label} ==")
+    print(f"requests      {total:>10}  ({total / stats['elapsed']:.0f} req/s)")
+    print(f"200 / 304     {stats.get(200, 0):>10} / {stats.get(304, 0)}")
+    print(f"bytes/request {stats['bytes'] / max(total, 1):>10.0f}")
+    if total:
+        print(f"latency ms    p50 {np.percentile(lat, 50):.2f}  p99 {np.percentile(lat, 99):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="existing server; by default one is started")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--points", type=int, default=0, help="series points per response")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        db = synthetic_db()
+        server = subprocess.Popen([sys.executable, "-m", "api.server", "--db", db, "--port", str(port),
+                                   "--host", "127.0.0.1"], cwd=ROOT,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_ready(url))
+        print(f"{args.clients} clients x {args.seconds:.0f}s against {url}{QUERY.format(points=args.points)}")
+        for label, use_etag in (("without If-None-Match", False), ("with If-None-Match", True)):
+            report(label, asyncio.run(run(url, args.clients, args.seconds, use_etag, args.points)))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
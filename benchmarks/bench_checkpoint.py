@@ -0,0 +1,117 @@
+"""
+Warm vs cold restart of the ingestion daemon.
+
+Synthetic trades (the soak test's generator) are fed through IngestionDaemon.process:
+  - reference: one daemon sees every tick without interruption
+  - crashed:   a daemon checkpoints after --before seconds, stores --unsaved more
+               seconds of ticks and dies without shutting down
+  - cold/warm: two restarts on copies of the crashed database, without and with
+               the checkpoint, then get the remaining --after seconds of ticks
+
+Reported: checkpoint size and write time, restore + catch-up time, seconds of
+live ticks until each pair's first valid z-score, and how far the restarted
+z-scores are from the reference's on the same bars.
+
+    python -m benchmarks.bench_checkpoint
+    python -m benchmarks.bench_checkpoint --before 1800 --unsaved 60 --pairs 3
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.soak_memory import SYMBOLS, TradeGenerator
+from ingestion.daemon import IngestionDaemon
+from storage.datastore import DataStore
+
+
+def feed(daemon: IngestionDaemon, batches: list) -> dict:
+    """
+    Process batches and collect pair -> {bar start: z-score} of every valid z-score.
+    """
+    zscores = {f"{sig.symbol_a}/{sig.symbol_b}": {} for sig in daemon.signals}
+    for batch in batches:
+        daemon.process(batch)
+        for sig in daemon.signals:
+            if sig.last_start_ns is not None and not np.isnan(sig.zscore):
+                zscores[f"{sig.symbol_a}/{sig.symbol_b}"][sig.last_start_ns] = sig.zscore
+    return zscores
+
+
+def max_diff(z: dict, ref: dict) -> float:
+    diffs = [abs(v - ref[pair][start]) for pair, values in z.items() for start, v in values.items()
+             if start in ref[pair]]
+    return max(diffs) if diffs else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--before", type=float, default=900.0, help="seconds of ticks before the checkpoint")
+    parser.add_argument("--unsaved", type=float, default=20.0, help="seconds stored after it, before the crash")
+    parser.add_argument("--after", type=float, default=300.0, help="seconds of ticks after the restart")
+    parser.add_argument("--pairs", type=int, default=3, help="pairs of the first symbol with the next ones")
+    parser.add_argument("--tick-rate", type=float, default=5.0, help="trades per symbol per second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    symbols = list(SYMBOLS[:args.pairs + 1])
+    trades = TradeGenerator(symbols, args.tick_rate, args.seed)
+    start_ns = time.time_ns() - int((args.before + args.unsaved + args.after) * 1e9)
+
+    def batches(offset: float, seconds: float) -> list:
+        return [trades.ticks(start_ns + int((offset + i) * 1e9), 1.0) for i in range(int(seconds))]
+
+    before = batches(0, args.before)
+    unsaved = batches(args.before, args.unsaved)
+    after = batches(args.before + args.unsaved, args.after)
+    print(f"{len(symbols)} symbols, {args.pairs} pairs, {sum(map(len, before + unsaved + after)):,} ticks: "
+          f"{args.before:g}s before the checkpoint, {args.unsaved:g}s unsaved, {args.after:g}s after the restart\n")
+
+    workdir = tempfile.mkdtemp()
+    checkpoint = os.path.join(workdir, "daemon.ckpt")
+
+    def daemon(name: str, **kwargs) -> IngestionDaemon:
+        return IngestionDaemon(DataStore(db_path=os.path.join(workdir, f"{name}.db")), symbols,
+                               status_interval=float("inf"), **kwargs)
+
+    try:
+        reference = feed(daemon("reference"), before + unsaved + after)
+
+        crashed = daemon("crashed", checkpoint=checkpoint)
+        feed(crashed, before)
+        t0 = time.perf_counter()
+        size = crashed.checkpoint()
+        write_s = time.perf_counter() - t0
+        feed(crashed, unsaved)
+        del crashed
+        for name in ("cold", "warm"):
+            shutil.copy(os.path.join(workdir, "crashed.db"), os.path.join(workdir, f"{name}.db"))
+
+        cold = daemon("cold")
+        cold_z = feed(cold, after)
+
+        warm = daemon("warm", checkpoint=checkpoint)
+        t0 = time.perf_counter()
+        restored = warm.restore()
+        restore_s = time.perf_counter() - t0
+        warm_z = feed(warm, after)
+
+        print(f"checkpoint: {size / 1e3:.1f} kB, written in {write_s * 1e3:.1f} ms; "
+              f"restore + catch-up: {restore_s * 1e3:.1f} ms ({'ok' if restored else 'FAILED'})\n")
+        print(f"{'pair':18s} {'cold first z s':>14s} {'warm first z s':>14s}")
+        for pair in reference:
+            print(f"{pair:18s} {cold.first_signal.get(pair, float('nan')):14.1f} "
+                  f"{warm.first_signal.get(pair, float('nan')):14.1f}")
+        print(f"\nmax |z - reference| on the same bars: cold {max_diff(cold_z, reference):.3g}, "
+              f"warm {max_diff(warm_z, reference):.3g}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
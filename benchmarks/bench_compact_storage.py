@@ -0,0 +1,95 @@
+"""
+Compare the default tick storage with the compact representation.
+
+Writes one synthetic day of BTCUSDT/ETHUSDT trades into two fresh databases
+and reports file size, per-table/index size, and the load time and in-memory
+footprint of the ticks as frames (get_ticks) and as the NumPy arrays the
+dashboard's tick buffers read (get_tick_arrays).
+
+    python -m benchmarks.bench_compact_storage --trades 1000000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from storage.datastore import DataStore
+
+
+def synthetic_day(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    start = datetime.utcnow() - timedelta(hours=23, minutes=59)
+    ticks = []
+    for symbol, px, tick, lot in [("BTCUSDT", 97000.0, 0.1, 0.001), ("ETHUSDT", 3400.0, 0.01, 0.001)]:
+        offsets = np.sort(rng.uniform(0, 86_000, n))
+        prices = np.round((px + np.cumsum(rng.normal(0, tick * 5, n))) / tick) * tick
+        sizes = np.maximum(1, rng.geometric(0.05, n)) * lot
+        stamps = [(start + timedelta(seconds=float(o))).isoformat() for o in offsets]
+        ticks.extend({"symbol": symbol, "ts": t, "price": float(p), "size": float(q)}
+                     for t, p, q in zip(stamps, prices, sizes))
+    return ticks
+
+
+def object_sizes(db_path: str) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+        return dict(rows)
+    except sqlite3.OperationalError:
+        # SQLite built without the dbstat virtual table
+        return {}
+    finally:
+        conn.close()
+
+
+def measure(label: str, ticks: list, compact: bool, batch: int = 50_000):
+    path = os.path.join(tempfile.mkdtemp(), f"{label}.db")
+    store = DataStore(db_path=path, compact=compact)
+    start = time.perf_counter()
+    for i in range(0, len(ticks), batch):
+        store.store_ticks(ticks[i:i + batch])
+    write_s = time.perf_counter() - start
+
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    conn.close()
+
+    start = time.perf_counter()
+    frames = [store.get_ticks(s, lookback_minutes=24 * 60) for s in ("BTCUSDT", "ETHUSDT")]
+    load_s = time.perf_counter() - start
+    mem = sum(f.memory_usage(deep=True).sum() for f in frames)
+
+    start = time.perf_counter()
+    arrays = [store.get_tick_arrays(s, lookback_minutes=24 * 60) for s in ("BTCUSDT", "ETHUSDT")]
+    arrays_s = time.perf_counter() - start
+    mem_arrays = sum(a.nbytes for parts in arrays for a in parts)
+
+    print(f"\n== {label} ==")
+    print(f"file size        {os.path.getsize(path) / 1e6:10.1f} MB")
+    for name, size in sorted(object_sizes(path).items(), key=lambda kv: -kv[1]):
+        if size > 8192:
+            print(f"  {name:<26}{size / 1e6:10.1f} MB")
+    print(f"write            {write_s:10.2f} s")
+    print(f"load (2 symbols) {load_s:10.2f} s")
+    print(f"frame memory     {mem / 1e6:10.1f} MB")
+    print(f"load arrays      {arrays_s:10.2f} s")
+    print(f"array memory     {mem_arrays / 1e6:10.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=1_000_000, help="trades per symbol")
+    args = parser.parse_args()
+
+    ticks = synthetic_day(args.trades)
+    print(f"{len(ticks)} trades")
+    measure("default", ticks, compact=False)
+    measure("compact", ticks, compact=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Write throughput of the raw frame journal against the SQLite tick path.
+
+Generates synthetic Binance combined-stream trade frames and times:
+  - FrameJournal.append for every frame, including close() (final block, fsync)
+  - the SQLite path the daemon uses: json parse + DataStore.store_ticks in
+    batches of --batch, and optionally per-tick store_tick on a subset
+  - reading the journal back at full speed
+
+    python -m benchmarks.bench_journal --frames 500000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from ingestion.frame_journal import FrameJournal, JournalReader
+from storage.datastore import DataStore
+
+SYMBOLS = ("BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT")
+
+
+def synthetic_frames(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    start_ms = int(time.time() * 1000) - n
+    prices = {"BTCUSDT": 65000.0, "ETHUSDT": 3500.0, "SOLUSDT": 150.0, "BNBUSDT": 600.0}
+    frames = []
+    for i, k in enumerate(rng.integers(0, len(SYMBOLS), n)):
+        symbol = SYMBOLS[k]
+        prices[symbol] *= 1.0 + rng.normal(0, 1e-5)
+        ts = start_ms + i
+        frames.append(json.dumps({
+            "stream": f"{symbol.lower()}@trade",
+            "data": {"e": "trade", "E": ts + 1, "s": symbol, "t": 1000000 + i,
+                     "p": f"{prices[symbol]:.2f}", "q": f"{rng.exponential(0.05):.3f}",
+                     "T": ts, "m": bool(rng.integers(0, 2)), "M": True},
+        }, separators=(",", ":")))
+    return frames
+
+
+def parse(frame: str) -> dict:
+    trade = json.loads(frame)["data"]
+    return {
+        "symbol": trade["s"],
+        "ts": datetime.utcfromtimestamp(trade["T"] / 1000.0).isoformat(),
+        "price": float(trade["p"]),
+        "size": float(trade["q"]),
+    }
+
+
+def report(name: str, frames: int, raw_bytes: int, seconds: float):
+    print(f"{name:34s} {frames / seconds:12,.0f} frames/s   {raw_bytes / seconds / 1e6:8.1f} MB/s   "
+          f"{seconds:7.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=500000)
+    parser.add_argument("--batch", type=int, default=500, help="store_ticks batch size")
+    parser.add_argument("--per-tick", type=int, default=5000, help="frames for the per-tick store_tick baseline (0 to skip)")
+    parser.add_argument("--level", type=int, default=1, help="zlib level")
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.frames)
+    raw_bytes = sum(len(f) for f in frames)
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{args.frames:,} frames, {raw_bytes / 1e6:.1f} MB raw\n")
+
+        journal_dir = os.path.join(workdir, "journal")
+        start = time.perf_counter()
+        # Room for the whole burst, so no frame is dropped while the writer catches up
+        journal = FrameJournal(journal_dir, level=args.level, max_queued=len(frames) + 1)
+        for frame in frames:
+            journal.append(frame)
+        enqueued = time.perf_counter() - start
+        journal.close()
+        elapsed = time.perf_counter() - start
+        report("journal append (caller side)", args.frames, raw_bytes, enqueued)
+        report("journal append + close/fsync", args.frames, raw_bytes, elapsed)
+        print(f"{'':34s} {journal.written_bytes / 1e6:.1f} MB on disk, "
+              f"ratio {raw_bytes / max(journal.written_bytes, 1):.1f}x, {journal.blocks} blocks")
+
+        store = DataStore(db_path=os.path.join(workdir, "ticks.db"))
+        start = time.perf_counter()
+        for i in range(0, len(frames), args.batch):
+            store.store_ticks([parse(f) for f in frames[i:i + args.batch]])
+        report(f"parse + store_ticks (batch {args.batch})", args.frames, raw_bytes, time.perf_counter() - start)
+
+        if args.per_tick:
+            subset = frames[:args.per_tick]
+            start = time.perf_counter()
+            for frame in subset:
+                store.store_tick(parse(frame))
+            report("parse + store_tick (per tick)", len(subset), sum(len(f) for f in subset),
+                   time.perf_counter() - start)
+        db_bytes = os.path.getsize(os.path.join(workdir, "ticks.db"))
+        print(f"{'':34s} SQLite file {db_bytes / 1e6:.1f} MB\n")
+
+        reader = JournalReader(journal_dir)
+        start = time.perf_counter()
+        count = sum(1 for _ in reader.frames())
+        report("journal read back", count, raw_bytes, time.perf_counter() - start)
+        assert count == args.frames and reader.torn_blocks == 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Parameter-sweep scaling benchmark.
+
+Runs the same ~10k-combination grid on synthetic 1s bars with 1..N workers and
+prints combinations/sec and speed-up over a single process.
+
+    python -m benchmarks.bench_sweep --bars 200000 --max-workers 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics.optimizer import ParameterSweep
+
+
+def synthetic_pair(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=n, freq="s")
+    b = 3000 + np.cumsum(rng.normal(0, 0.5, n))
+    a = 15 * b + np.cumsum(rng.normal(0, 0.2, n)) + rng.normal(0, 20, n)
+    return pd.Series(a, index=idx), pd.Series(b, index=idx)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=100_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    a, b = synthetic_pair(args.bars)
+    closes = {tf: (a.resample(tf).last(), b.resample(tf).last()) for tf in ["1s", "5s", "10s", "30s", "1min"]}
+    sweep = ParameterSweep(closes)
+    # 5 timeframes x 2 methods x 50 windows x 20 thresholds = 10,000 combinations
+    params = ParameterSweep.grid(range(10, 210, 4), np.round(np.linspace(1.0, 3.0, 20), 2),
+                                 list(closes), ["static", "rolling"])
+    print(f"{len(params)} combinations, {args.bars} base bars")
+
+    base = None
+    workers = 1
+    while workers <= args.max_workers:
+        start = time.perf_counter()
+        sweep.run(params, workers=workers)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+        print(f"workers={workers:<3} {elapsed:8.2f}s  {len(params) / elapsed:9.0f} combos/s  speed-up {base / elapsed:5.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Compare the trade, aggTrade and bookTicker streams for the same market.
+
+For each stream it reports message rate and raw bytes per hour, rows and SQLite
+bytes stored per hour (quotes with and without the change-only filter), and the
+quality of the price series each one yields: lag-1 autocorrelation of price
+changes (bid-ask bounce makes it strongly negative), the 1s-bar variance ratio
+VR(10) (< 1 when bars carry bounce noise), the correlation of the two symbols'
+1s returns (noise biases it towards 0) and, for synthetic data, the RMSE of 1s
+closes against the true efficient price.
+
+Input is one of:
+    python -m benchmarks.compare_streams                                # synthetic book, 10 minutes
+    python -m benchmarks.compare_streams --capture 600 --symbols BTCUSDT ETHUSDT --keep journal/
+    python -m benchmarks.compare_streams --journal journal/             # a saved capture
+
+A capture subscribes to all three streams at once and journals the raw frames
+(ingestion/frame_journal.py), so every stream sees the same market.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics.mean_reversion import MeanReversion
+from analytics.resampler import Resampler
+from ingestion.frame_journal import FrameJournal, JournalReader
+from ingestion.quotes import QuoteFilter, normalize_book_ticker
+from storage.datastore import DataStore
+from storage.tick_buffer import quote_price
+
+STREAM_URL = "wss://fstream.binance.com/stream?streams="
+
+
+def synthetic_frames(minutes: float = 10.0, symbols=("AAAUSDT", "BBBUSDT"), rho: float = 0.8,
+                     vol_1s_bps: float = 1.5, tick_bps: float = 2.0, orders_per_s: float = 15.0,
+                     book_updates_per_s: float = 50.0, seed: int = 0):
+    """
+    (recv ns, frame) pairs of all three streams for correlated symbols on a 10 ms
+    grid, plus the true efficient prices (DataFrame, one column per symbol).
+
+    Quotes straddle the efficient price one tick wide, with an imbalance that
+    tracks where it sits inside the spread; taker orders of 1+ fills hit the bid
+    or ask, so trade prices bounce while the microprice follows the true price.
+    """
+    rng = np.random.default_rng(seed)
+    step_ms = 10
+    steps = int(minutes * 60_000 / step_ms)
+    sigma = vol_1s_bps * 1e-4 / math.sqrt(1000 / step_ms)
+    cov = sigma ** 2 * np.array([[1.0, rho], [rho, 1.0]])
+    log_price = np.log([3.0, 1.5])[None, :] + np.cumsum(rng.multivariate_normal([0, 0], cov, steps), axis=0)
+    true = np.exp(log_price)
+    start_ms = int(time.time() * 1000) - steps * step_ms
+    times_ms = start_ms + np.arange(steps) * step_ms
+
+    frames = []
+    trade_id = agg_id = update_id = 0
+    for k, symbol in enumerate(symbols):
+        tick = float(f"{true[0, k] * tick_bps * 1e-4:.1g}")
+        decimals = max(0, -int(math.floor(math.log10(tick))))
+        bid_idx = np.floor(true[:, k] / tick)
+        position = true[:, k] / tick - bid_idx
+        book = rng.random(steps) < book_updates_per_s * step_ms / 1000
+        book |= np.r_[True, np.diff(bid_idx) != 0]
+        orders = rng.poisson(orders_per_s * step_ms / 1000, steps)
+        stream = symbol.lower()
+        for i in np.flatnonzero(book | (orders > 0)):
+            ts = int(times_ms[i])
+            bid, ask = bid_idx[i] * tick, (bid_idx[i] + 1) * tick
+            if book[i]:
+                imbalance = min(max(position[i] + rng.normal(0, 0.1), 0.02), 0.98)
+                depth = rng.exponential(20.0) + 1.0
+                update_id += 1
+                frames.append((ts * 1_000_000, json.dumps({"stream": f"{stream}@bookTicker", "data": {
+                    "e": "bookTicker", "u": update_id, "s": symbol, "b": f"{bid:.{decimals}f}",
+                    "B": f"{depth * imbalance:.1f}", "a": f"{ask:.{decimals}f}", "A": f"{depth * (1 - imbalance):.1f}",
+                    "T": ts, "E": ts + 1}}, separators=(",", ":"))))
+            for _ in range(orders[i]):
+                buy = rng.random() < 0.5
+                price = f"{ask if buy else bid:.{decimals}f}"
+                fills = rng.geometric(0.5)
+                qtys = rng.exponential(2.0, fills) + 0.1
+                first = trade_id + 1
+                for q in qtys:
+                    trade_id += 1
+                    frames.append((ts * 1_000_000, json.dumps({"stream": f"{stream}@trade", "data": {
+                        "e": "trade", "E": ts + 1, "T": ts, "s": symbol, "t": trade_id, "p": price,
+                        "q": f"{q:.1f}", "X": "MARKET", "m": not buy}}, separators=(",", ":"))))
+                agg_id += 1
+                frames.append((ts * 1_000_000, json.dumps({"stream": f"{stream}@aggTrade", "data": {
+                    "e": "aggTrade", "E": ts + 1, "a": agg_id, "s": symbol, "p": price,
+                    "q": f"{qtys.sum():.1f}", "f": first, "l": trade_id, "T": ts, "m": not buy}},
+                    separators=(",", ":"))))
+    frames.sort(key=lambda f: f[0])
+    truth = pd.DataFrame(true, columns=list(symbols), index=pd.DatetimeIndex(times_ms.astype('datetime64[ms]')))
+    return frames, truth
+
+
+async def _capture(journal: FrameJournal, symbols, seconds: float):
+    import websockets
+    streams = "/".join(f"{s.lower()}@{kind}" for s in symbols for kind in ("trade", "aggTrade", "bookTicker"))
+    deadline = time.monotonic() + seconds
+    async with websockets.connect(STREAM_URL + streams) as ws:
+        while time.monotonic() < deadline:
+            try:
+                msg = await asyncio.wait_for(ws.recv(), timeout=max(deadline - time.monotonic(), 0.01))
+            except asyncio.TimeoutError:
+                break
+            journal.append(msg, time.time_ns())
+
+
+def split_streams(frames):
+    """
+    Per stream: message count, raw bytes and parsed payloads, plus the time span in hours.
+    """
+    out = {kind: {'messages': 0, 'bytes': 0, 'rows': []} for kind in ("trade", "aggTrade", "bookTicker")}
+    first = last = None
+    for recv_ns, frame in frames:
+        msg = json.loads(frame)
+        data = msg.get('data', msg)
+        kind = data.get('e', 'bookTicker' if 'b' in data else None)
+        if kind not in out:
+            continue
+        entry = out[kind]
+        entry['messages'] += 1
+        entry['bytes'] += len(frame)
+        entry['rows'].append(normalize_book_ticker(data, recv_ns) if kind == 'bookTicker' else data)
+        first = recv_ns if first is None else first
+        last = recv_ns
+    hours = max((last - first) / 3.6e12, 1e-9) if first is not None else 1e-9
+    return out, hours
+
+
+def trade_frame(rows: list, symbol: str) -> pd.DataFrame:
+    rows = [r for r in rows if r['s'] == symbol]
+    if not rows:
+        return pd.DataFrame(columns=['price', 'size'])
+    ts = np.array([r['T'] for r in rows], dtype='datetime64[ms]').astype('datetime64[ns]')
+    return pd.DataFrame({'price': [float(r['p']) for r in rows], 'size': [float(r['q']) for r in rows]},
+                        index=pd.DatetimeIndex(ts, name='ts'))
+
+
+def quote_frame(quotes: list, symbol: str, source: str) -> pd.DataFrame:
+    quotes = [q for q in quotes if q['symbol'] == symbol]
+    if not quotes:
+        return pd.DataFrame(columns=['price', 'size'])
+    arr = {k: np.array([q[k] for q in quotes], dtype=np.float64) for k in ('bid', 'bid_qty', 'ask', 'ask_qty')}
+    price = quote_price(source, arr['bid'], arr['bid_qty'], arr['ask'], arr['ask_qty'])
+    ts = np.array([q['ts_ns'] for q in quotes], dtype='datetime64[ns]')
+    return pd.DataFrame({'price': price, 'size': 0.0}, index=pd.DatetimeIndex(ts, name='ts'))
+
+
+def stored_bytes(workdir: str, name: str, trades: list = None, quotes: list = None) -> int:
+    """
+    SQLite bytes taken by the rows, over an empty database with the same schema.
+    """
+    path = os.path.join(workdir, f"{name}.db")
+    store = DataStore(db_path=path, compact=True)
+    empty = os.path.getsize(path)
+    if trades:
+        for i in range(0, len(trades), 5000):
+            store.store_ticks([{'symbol': r['s'], 'ts': np.datetime64(int(r['T']), 'ms').astype('datetime64[ns]'),
+                                'price': float(r['p']), 'size': float(r['q'])} for r in trades[i:i + 5000]])
+    if quotes:
+        for i in range(0, len(quotes), 5000):
+            store.store_quotes(quotes[i:i + 5000])
+    return os.path.getsize(path) - empty
+
+
+def quality(series: dict, truth: pd.DataFrame = None) -> dict:
+    """
+    Quality metrics of one price source given {symbol: tick frame}.
+    """
+    symbols = list(series)
+    autocorr, vr, rmse = [], [], []
+    closes = {}
+    for symbol, ticks in series.items():
+        if len(ticks) < 3:
+            continue
+        changes = np.diff(ticks['price'].to_numpy(dtype=np.float64))
+        changes = changes[changes != 0]
+        if len(changes) > 2:
+            autocorr.append(np.corrcoef(changes[:-1], changes[1:])[0, 1])
+        bars = Resampler.resample(ticks, '1s')
+        closes[symbol] = bars['close']
+        vr.append(MeanReversion.variance_ratio(np.log(bars['close'].to_numpy()), 10)[0])
+        if truth is not None and symbol in truth:
+            # True price at each bar's end
+            reference = truth[symbol].asof(bars.index + pd.Timedelta('1s') - pd.Timedelta('1ms'))
+            err = np.log(bars['close'].to_numpy()) - np.log(reference.to_numpy())
+            rmse.append(float(np.sqrt(np.nanmean(err ** 2))) * 1e4)
+    corr = np.nan
+    if len(closes) >= 2:
+        returns = np.log(pd.DataFrame(closes)).diff().dropna()
+        corr = returns[symbols[0]].corr(returns[symbols[1]])
+    return {
+        'lag1_autocorr': np.nanmean(autocorr) if autocorr else np.nan,
+        'vr_10': np.nanmean(vr) if vr else np.nan,
+        'ret_corr_1s': corr,
+        'rmse_bps': np.mean(rmse) if rmse else np.nan,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--journal", default=None, help="analyze a journal captured with all three streams")
+    parser.add_argument("--capture", type=float, default=None, metavar="SECONDS", help="capture live from Binance first")
+    parser.add_argument("--keep", default=None, metavar="DIR", help="journal directory for --capture (default: temporary)")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT", "ETHUSDT"])
+    parser.add_argument("--minutes", type=float, default=10.0, help="synthetic data length")
+    parser.add_argument("--quote-imbalance", type=float, default=0.05, help="QuoteFilter threshold to compare with 0")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    truth = None
+    try:
+        if args.capture:
+            journal_dir = args.keep or os.path.join(workdir, "journal")
+            journal = FrameJournal(journal_dir)
+            print(f"Capturing {args.capture:g}s of {args.symbols} ...")
+            asyncio.run(_capture(journal, args.symbols, args.capture))
+            journal.close()
+            frames = JournalReader(journal_dir).frames()
+        elif args.journal:
+            frames = JournalReader(args.journal).frames()
+        else:
+            frames, truth = synthetic_frames(args.minutes)
+            args.symbols = list(truth.columns)
+            print(f"Synthetic book: {args.minutes:g} minutes of {args.symbols}, true prices known")
+
+        streams, hours = split_streams(frames)
+        all_quotes = streams['bookTicker']['rows']
+        filtered = {}
+        for threshold in (0.0, args.quote_imbalance):
+            qf = QuoteFilter(threshold)
+            filtered[threshold] = [q for q in all_quotes if qf.accept(q)]
+
+        volume = []
+        for kind in ("trade", "aggTrade"):
+            s = streams[kind]
+            volume.append({'stream': kind, 'msgs_per_s': s['messages'] / (hours * 3600),
+                           'raw_MB_per_h': s['bytes'] / hours / 1e6, 'rows_per_h': len(s['rows']) / hours,
+                           'stored_MB_per_h': stored_bytes(workdir, kind, trades=s['rows']) / hours / 1e6})
+        for threshold, quotes in filtered.items():
+            s = streams['bookTicker']
+            volume.append({'stream': f"bookTicker (imbalance >= {threshold:g})", 'msgs_per_s': s['messages'] / (hours * 3600),
+                           'raw_MB_per_h': s['bytes'] / hours / 1e6, 'rows_per_h': len(quotes) / hours,
+                           'stored_MB_per_h': stored_bytes(workdir, f"quotes_{threshold}", quotes=quotes) / hours / 1e6})
+        print("\nVolume")
+        print(pd.DataFrame(volume).set_index('stream').round(2).to_string())
+
+        sources = {
+            'trade': {s: trade_frame(streams['trade']['rows'], s) for s in args.symbols},
+            'aggTrade': {s: trade_frame(streams['aggTrade']['rows'], s) for s in args.symbols},
+        }
+        for threshold, quotes in filtered.items():
+            for source in ('mid', 'micro'):
+                sources[f"{source} (imbalance >= {threshold:g})"] = {s: quote_frame(quotes, s, source) for s in args.symbols}
+        print("\nAnalytics quality (1s bars)")
+        table = pd.DataFrame({name: quality(series, truth) for name, series in sources.items()}).T
+        print(table.round(3).to_string())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
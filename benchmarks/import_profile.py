@@ -0,0 +1,111 @@
+"""
+Import-time report for the dashboard's cold start.
+
+Collects the top-level imports of app.py, imports them in a fresh interpreter
+under `python -X importtime` and prints per-module timings. Use --budget-ms to
+fail when the total regresses, and --save/--baseline to compare two runs.
+
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --top 15 --budget-ms 1500
+    python -m benchmarks.import_profile --save before.json
+    python -m benchmarks.import_profile --baseline before.json
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def top_level_imports(path: str) -> list:
+    """
+    Import statements at module level of a script, as source lines.
+    Imports inside functions are deliberately lazy and are left out.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(ast.unparse(node))
+    return lines
+
+
+def profile(statements: list) -> list:
+    """
+    Run the imports in a fresh interpreter and parse its -X importtime output.
+    Returns rows of (module, self_us, cumulative_us, depth) in import order.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "\n".join(statements)],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+
+def summarize(rows: list) -> dict:
+    # Cumulative times of the outermost imports add up to the total
+    roots = [r for r in rows if r[3] == 0]
+    return {
+        "total_ms": sum(r[2] for r in roots) / 1000,
+        "modules": len(rows),
+        "roots": {r[0]: r[2] / 1000 for r in roots},
+        "self": {r[0]: r[1] / 1000 for r in rows},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--top", type=int, default=20, help="rows in each table")
+    parser.add_argument("--budget-ms", type=float, default=None, help="exit 1 if the total exceeds this")
+    parser.add_argument("--save", default=None, help="write the summary to a JSON file")
+    parser.add_argument("--baseline", default=None, help="compare against a saved summary")
+    args = parser.parse_args()
+
+    statements = top_level_imports(args.script)
+    summary = summarize(profile(statements))
+
+    print(f"{len(statements)} import statements, {summary['modules']} modules, "
+          f"total {summary['total_ms']:.0f} ms\n")
+
+    print(f"{'top-level import':<48}{'cumulative ms':>14}")
+    for name, ms in sorted(summary["roots"].items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:<48}{ms:>14.1f}")
+
+    print(f"\n{'module (self time)':<48}{'self ms':>14}")
+    for name, ms in sorted(summary["self"].items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:<48}{ms:>14.1f}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        delta = summary["total_ms"] - base["total_ms"]
+        print(f"\nbaseline total {base['total_ms']:.0f} ms -> {summary['total_ms']:.0f} ms ({delta:+.0f} ms)")
+        added = set(summary["self"]) - set(base["self"])
+        heavy = sorted(added, key=lambda m: -summary["self"][m])[:10]
+        if heavy:
+            print("new modules: " + ", ".join(f"{m} ({summary['self'][m]:.1f} ms)" for m in heavy))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.budget_ms is not None and summary["total_ms"] > args.budget_ms:
+        print(f"\nFAIL: {summary['total_ms']:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
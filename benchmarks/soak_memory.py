@@ -0,0 +1,242 @@
+"""
+Soak test: process memory over a simulated day of ingestion and dashboard use.
+
+A simulated clock advances --step seconds per cycle; each cycle runs
+  - the daemon pipeline (IngestionDaemon.process: ticks, bars, pair signals,
+    VWAP, alerts) on synthetic trades for every symbol
+  - one AnalyticsService poll at the simulated time (bar cache, tick buffers,
+    snapshots) and a correlation matrix over part of the symbols
+  - dashboard sessions that come and go, watch random pairs, keep chat
+    history and sweep results, and report their state to a MemoryTracker
+
+RSS and the tracker's per-component bytes are printed every --sample-minutes
+of simulated time. The run passes when RSS grows less than --max-growth-mb
+after the first sample (the warm-up). With --tracemalloc, the allocation sites
+that grew between the warm-up and the end of the run are listed; tracing slows
+the run several times over, so use it on short runs with frequent samples.
+Most of the wall time goes to the daemon's SQLite commits; --db on a tmpfs
+(e.g. /dev/shm/soak.db) speeds it up.
+
+    python -m benchmarks.soak_memory --hours 24
+    python -m benchmarks.soak_memory --hours 1 --sample-minutes 10 --tracemalloc
+    python -m benchmarks.soak_memory --hours 4 --budget-mb 250
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ai_assistant.request_broker import TTLCache
+from analytics.snapshot_service import AnalyticsService, SnapshotKey
+from analytics.vwap import VwapBook
+from diagnostics.memory import MemoryTracker, release_free_memory, sizeof
+from ingestion.daemon import IngestionDaemon
+from storage.datastore import DataStore
+
+SYMBOLS = ("BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "LTCUSDT")
+PRICES = (65000.0, 3500.0, 150.0, 600.0, 0.6, 0.45, 0.12, 80.0)
+# Universe of the correlation matrix; pairs outside it keep tick buffers only while sessions show them
+UNIVERSE = SYMBOLS[:4]
+TIMEFRAMES = ("1s", "5s", "1min")
+WINDOWS = (20, 50, 100)
+
+
+class SimClock:
+    """
+    Nanoseconds since the epoch, advanced by the soak loop.
+    """
+    def __init__(self, start_ns: int):
+        self.now_ns = start_ns
+
+    def __call__(self) -> int:
+        return self.now_ns
+
+    def advance(self, seconds: float):
+        self.now_ns += int(seconds * 1e9)
+
+
+class TradeGenerator:
+    """
+    Correlated random-walk trades: one common factor plus noise per symbol.
+    """
+    def __init__(self, symbols, rate: float, seed: int = 0):
+        self.symbols = np.array(symbols)
+        self.rate = rate
+        self.rng = np.random.default_rng(seed)
+        self.log_price = np.log(np.array(PRICES[:len(symbols)]))
+
+    def ticks(self, start_ns: int, seconds: float) -> list:
+        n = self.rng.poisson(self.rate * len(self.symbols) * seconds)
+        if not n:
+            return []
+        ts = np.sort(start_ns + self.rng.integers(0, int(seconds * 1e9), n))
+        which = self.rng.integers(0, len(self.symbols), n)
+        common = self.rng.normal(0, 2e-5, n)
+        for i, k in enumerate(which):
+            self.log_price[k] += common[i] + self.rng.normal(0, 1e-5)
+        prices = np.exp(self.log_price[which] + self.rng.normal(0, 2e-5, n))
+        sizes = self.rng.exponential(0.05, n)
+        stamps = np.datetime_as_string(ts.astype('datetime64[ns]'), unit='us')
+        return [{'symbol': str(self.symbols[k]), 'ts': str(stamp), 'price': float(price), 'size': float(size)}
+                for k, stamp, price, size in zip(which, stamps, prices, sizes)]
+
+
+class SimSession:
+    """
+    What one dashboard tab holds: leases on the pairs it watches and its session_state.
+    """
+    def __init__(self, session_id: str, service: AnalyticsService, ends_ns: int, rng):
+        self.session_id = session_id
+        self.service = service
+        self.ends_ns = ends_ns
+        self.rng = rng
+        self.keys = set()
+        self.state = {'ai_chat': [], 'memory_generation': 0}
+        self.pick_pairs()
+
+    def pick_pairs(self):
+        for key in self.keys:
+            self.service.unsubscribe(key, self.session_id)
+        timeframe = TIMEFRAMES[self.rng.integers(len(TIMEFRAMES))]
+        window = int(WINDOWS[self.rng.integers(len(WINDOWS))])
+        pairs = self.rng.choice(len(SYMBOLS), size=(int(self.rng.integers(1, 4)), 2))
+        self.keys = {SnapshotKey(SYMBOLS[a], SYMBOLS[b], timeframe, window) for a, b in pairs if a != b}
+
+    def step(self, tracker: MemoryTracker, ai_cache: TTLCache):
+        if self.rng.random() < 0.01:
+            self.pick_pairs()
+        for key in self.keys:
+            self.service.subscribe(key, self.session_id)
+        if self.rng.random() < 0.05:
+            question = f"question {self.rng.integers(1000)}"
+            answer = ai_cache.get(question)
+            if answer is None:
+                answer = "x" * int(self.rng.integers(500, 4000))
+                ai_cache.put(question, answer)
+            self.state['ai_chat'] = (self.state['ai_chat'] + [(question, answer)])[-20:]
+        if self.rng.random() < 0.005:
+            self.state['sweep_results'] = pd.DataFrame(self.rng.normal(size=(2000, 8)))
+        # Same rule as app.py: an eviction drops what the session can recompute
+        if self.state['memory_generation'] != tracker.generation:
+            self.state.pop('sweep_results', None)
+        self.state['memory_generation'] = tracker.generation
+        tracker.report_usage(f"session:{self.session_id}", sizeof(self.state))
+
+    def close(self, tracker: MemoryTracker, abandoned: bool):
+        # A closed tab stops renewing its leases; a page change releases them
+        if not abandoned:
+            for key in self.keys:
+                self.service.unsubscribe(key, self.session_id)
+        tracker.unregister(f"session:{self.session_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=24.0, help="simulated hours")
+    parser.add_argument("--step", type=float, default=5.0, help="simulated seconds per cycle")
+    parser.add_argument("--tick-rate", type=float, default=2.0, help="trades per symbol per simulated second")
+    parser.add_argument("--sessions", type=float, default=5.0, help="mean concurrent dashboard sessions")
+    parser.add_argument("--session-minutes", type=float, default=45.0, help="mean session length")
+    parser.add_argument("--budget-mb", type=float, default=None, help="MemoryTracker budget (evicts above it)")
+    parser.add_argument("--sample-minutes", type=float, default=60.0, help="simulated minutes between samples")
+    parser.add_argument("--max-growth-mb", type=float, default=40.0, help="allowed RSS growth after the first sample")
+    parser.add_argument("--tracemalloc", action="store_true", help="diff allocations from the first sample to the end")
+    parser.add_argument("--db", help="database path (default: a temporary directory)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    workdir = tempfile.mkdtemp()
+    db_path = args.db or os.path.join(workdir, "soak.db")
+    rng = np.random.default_rng(args.seed)
+    # The simulated day ends at the wall-clock present, so stored timestamps are never in the future
+    clock = SimClock(time.time_ns() - int(args.hours * 3600e9))
+    storage = DataStore(db_path=db_path)
+    daemon = IngestionDaemon(storage, list(SYMBOLS), status_interval=float("inf"))
+    service = AnalyticsService(storage, lookback_minutes=10, vwap=VwapBook(storage, writable=False), clock=clock)
+    trades = TradeGenerator(SYMBOLS, args.tick_rate, args.seed)
+    ai_cache = TTLCache(256, ttl=300.0)
+
+    tracker = MemoryTracker(budget_bytes=int(args.budget_mb * 1e6) if args.budget_mb else None)
+    tracker.register("daemon", daemon.memory_usage)
+    tracker.register("analytics", service.memory_usage, service.trim, priority=50)
+    tracker.register("ai_cache", lambda: sizeof(ai_cache.values()), ai_cache.clear, priority=10)
+    if args.tracemalloc:
+        tracker.start_tracing()
+
+    sessions = {}
+    next_id = 0
+    arrival_rate = args.sessions / (args.session_minutes * 60)
+    cycles = int(args.hours * 3600 / args.step)
+    cycles_per_sample = max(int(args.sample_minutes * 60 / args.step), 1)
+    enforce_every = max(int(600 / args.step), 1)
+    samples = []
+    started = time.perf_counter()
+    print(f"{args.hours:g} simulated hours, {cycles:,} cycles of {args.step:g}s, {len(SYMBOLS)} symbols, "
+          f"~{args.sessions:g} sessions, budget {args.budget_mb or 'none'}\n")
+    print(f"{'hour':>6s} {'RSS MB':>8s} {'tracked MB':>10s} {'buffers':>7s} {'keys':>5s} {'sessions':>8s} "
+          f"{'ticks':>10s} {'wall s':>7s}")
+    try:
+        for cycle in range(1, cycles + 1):
+            daemon.process(trades.ticks(clock(), args.step))
+            clock.advance(args.step)
+            service.poll()
+            service.correlation_matrix(UNIVERSE, "1min")
+
+            for _ in range(rng.poisson(arrival_rate * args.step)):
+                ends_ns = clock() + int(rng.exponential(args.session_minutes * 60) * 1e9)
+                sessions[next_id] = SimSession(f"{next_id:06d}", service, ends_ns, rng)
+                next_id += 1
+            for sid in [sid for sid, s in sessions.items() if s.ends_ns <= clock()]:
+                sessions.pop(sid).close(tracker, abandoned=rng.random() < 0.3)
+            for session in sessions.values():
+                session.step(tracker, ai_cache)
+
+            if cycle % enforce_every == 0:
+                tracker.enforce()
+            if cycle % cycles_per_sample == 0:
+                hour = cycle * args.step / 3600
+                release_free_memory()
+                report = tracker.report()
+                stats = service.bar_cache.stats()
+                samples.append((hour, report.loc['rss', 'bytes'] / 1e6))
+                print(f"{hour:6.2f} {samples[-1][1]:8.1f} {report.loc['accounted', 'bytes'] / 1e6:10.2f} "
+                      f"{stats['buffers']:7d} {len(service._leases):5d} {len(sessions):8d} "
+                      f"{daemon.ticks_written:10,d} {time.perf_counter() - started:7.1f}")
+                if len(samples) == 1 and args.tracemalloc:
+                    tracker.take_snapshot("warm")
+                sys.stdout.flush()
+    finally:
+        if not args.db:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print(tracker.report().assign(MB=lambda df: df['bytes'] / 1e6)[['MB']].round(2).to_string())
+    print(f"\nbar cache: {service.bar_cache.stats()['buffers_dropped']} idle tick buffers dropped, "
+          f"evictions: {dict(tracker.evictions) or 'none'}")
+    if len(samples) < 2:
+        print("\nTake at least 2 samples (--hours, --sample-minutes) to judge growth.")
+        return
+    hours, rss = np.array(samples).T
+    growth = rss[-1] - rss[0]
+    slope = np.polyfit(hours, rss, 1)[0]
+    print(f"RSS after the warm-up: {samples[0][1]:.1f} MB, at the end: {samples[-1][1]:.1f} MB "
+          f"(growth {growth:+.1f} MB, trend {slope:+.2f} MB/hour)")
+    if args.tracemalloc:
+        tracker.take_snapshot("end")
+        print("\nLargest growth since the warm-up (tracemalloc):")
+        print(tracker.diff("warm", "end", top=15).to_string())
+    if growth > args.max_growth_mb:
+        print(f"FAIL: grew more than {args.max_growth_mb:g} MB")
+        sys.exit(1)
+    print("PASS: memory flat")
+
+
+if __name__ == "__main__":
+    main()
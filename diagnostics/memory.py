@@ -0,0 +1,254 @@
+"""
+Memory accounting and budget enforcement for long-running processes.
+
+MemoryTracker is a process-wide registry of what holds memory:
+  - components register a measure callable (bytes, or {part: bytes}) and an
+    optional evict callable, e.g. the analytics service's tick buffers and
+    matrices or the AI response cache
+  - sessions report their own usage with report_usage(); a session that
+    stops reporting (closed tab) drops out after `stale_after` seconds
+
+report() lists bytes per component next to the process RSS. With a budget,
+enforce() runs the evictors in priority order (lowest first) until RSS is
+back under it. If that is not enough it bumps `generation`, which tells
+sessions to drop their own recomputable state on their next rerun, and backs
+off so a budget below what the process needs does not evict on every check.
+tracemalloc snapshots can be taken on demand and diffed to find what grew
+between two points in time.
+"""
+import ctypes
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def rss_bytes() -> int:
+    """
+    Resident set size of this process (current on Linux, peak elsewhere).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def release_free_memory():
+    """
+    Collect garbage and, on glibc, return freed heap pages to the OS so RSS
+    reflects what was evicted.
+    """
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def sizeof(obj, max_depth: int = 6) -> int:
+    """
+    Deep size estimate in bytes: NumPy arrays and pandas objects by their
+    buffers, containers recursively (each object counted once).
+    """
+    seen = set()
+
+    def walk(o, depth: int) -> int:
+        if id(o) in seen:
+            return 0
+        seen.add(id(o))
+        if isinstance(o, np.ndarray):
+            # A view's memory belongs to its base
+            return sys.getsizeof(o) if o.base is not None else o.nbytes + sys.getsizeof(o)
+        if isinstance(o, (pd.DataFrame, pd.Series)):
+            usage = o.memory_usage(deep=True, index=True)
+            return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+        if isinstance(o, pd.Index):
+            return int(o.memory_usage(deep=True))
+        size = sys.getsizeof(o, 0)
+        if depth >= max_depth:
+            return size
+        if isinstance(o, dict):
+            size += sum(walk(k, depth + 1) + walk(v, depth + 1) for k, v in list(o.items()))
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            size += sum(walk(v, depth + 1) for v in list(o))
+        elif hasattr(o, "__dict__") and not isinstance(o, type):
+            size += walk(vars(o), depth + 1)
+        return size
+
+    return walk(obj, 0)
+
+
+class MemoryTracker:
+    """
+    Bytes held per component, and eviction when the process exceeds a budget.
+    """
+    def __init__(self, budget_bytes: Optional[int] = None, stale_after: float = 600.0,
+                 min_interval: float = 30.0):
+        self.budget_bytes = budget_bytes
+        self.stale_after = stale_after
+        self.min_interval = min_interval
+        self._components: Dict[str, tuple] = {}
+        self._reported: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._interval = min_interval
+        self.evictions = Counter()
+        self.generation = 0
+        self.snapshots: Dict[str, tracemalloc.Snapshot] = {}
+
+    def register(self, name: str, measure: Optional[Callable[[], object]], evict: Optional[Callable[[], None]] = None,
+                 priority: int = 100):
+        """
+        measure returns bytes or {part: bytes} (None when it cannot be measured);
+        components with an evict callable are evicted in ascending priority.
+        """
+        with self._lock:
+            self._components[name] = (measure, evict, priority)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._components.pop(name, None)
+            self._reported.pop(name, None)
+
+    def report_usage(self, name: str, nbytes: int):
+        """
+        Usage pushed by its owner, e.g. a session's state measured on each rerun.
+        """
+        with self._lock:
+            self._reported[name] = (nbytes, time.monotonic())
+
+    def report(self) -> pd.DataFrame:
+        """
+        One row per component (parts as 'component.part'), plus total, RSS and the unaccounted rest.
+        """
+        rows = []
+        cutoff = time.monotonic() - self.stale_after
+        with self._lock:
+            for name in [n for n, (_, seen) in self._reported.items() if seen < cutoff]:
+                del self._reported[name]
+            components = list(self._components.items())
+            reported = list(self._reported.items())
+        for name, (measure, evict, priority) in components:
+            try:
+                usage = measure() if measure is not None else None
+            except Exception as e:
+                logger.warning(f"Measuring {name} failed: {e}")
+                usage = None
+            parts = usage.items() if isinstance(usage, dict) else [(None, usage)]
+            for part, nbytes in parts:
+                rows.append({'component': name if part is None else f"{name}.{part}",
+                             'bytes': np.nan if nbytes is None else float(nbytes),
+                             'evictable': evict is not None})
+        for name, (nbytes, _) in reported:
+            rows.append({'component': name, 'bytes': float(nbytes), 'evictable': False})
+        df = pd.DataFrame(rows, columns=['component', 'bytes', 'evictable'])
+        accounted = df['bytes'].sum()
+        rss = rss_bytes()
+        totals = pd.DataFrame([
+            {'component': 'accounted', 'bytes': accounted, 'evictable': False},
+            {'component': 'rss', 'bytes': float(rss), 'evictable': False},
+            {'component': 'unaccounted', 'bytes': max(rss - accounted, 0.0), 'evictable': False},
+        ])
+        df = df.sort_values('bytes', ascending=False) if len(df) else df
+        return pd.concat([df, totals], ignore_index=True).set_index('component')
+
+    def over_budget(self) -> bool:
+        return self.budget_bytes is not None and rss_bytes() > self.budget_bytes
+
+    def enforce(self, force: bool = False) -> list:
+        """
+        Evict components in priority order until RSS is under the budget (all of
+        them when force=True); if RSS is still over it, or when forced, sessions
+        are told to drop their state too. Returns the names evicted.
+        """
+        if not force and not self.over_budget():
+            return []
+        with self._lock:
+            evictable = sorted((priority, name, evict) for name, (_, evict, priority) in self._components.items()
+                               if evict is not None)
+        evicted = []
+        before = rss_bytes()
+        for _, name, evict in evictable:
+            try:
+                evict()
+            except Exception as e:
+                logger.warning(f"Evicting {name} failed: {e}")
+                continue
+            evicted.append(name)
+            self.evictions[name] += 1
+            release_free_memory()
+            if not force and not self.over_budget():
+                break
+        after = rss_bytes()
+        still_over = self.over_budget()
+        if force or still_over:
+            self.generation += 1
+        logger.info(f"Memory: evicted {evicted}, RSS {before / 1e6:.0f} -> {after / 1e6:.0f} MB"
+                    + (f" (budget {self.budget_bytes / 1e6:.0f} MB)" if self.budget_bytes else ""))
+        if still_over:
+            # Fragmentation or a budget below the baseline: evicting again soon would free as little
+            self._interval = min(self._interval * 2, 64 * self.min_interval)
+            logger.warning(f"Memory: still over budget after evicting (freed {(before - after) / 1e6:.0f} MB); "
+                           f"next check in {self._interval:.0f}s")
+        else:
+            self._interval = self.min_interval
+        return evicted
+
+    def maybe_enforce(self) -> list:
+        """
+        enforce() at most once per `min_interval` seconds (longer while evictions
+        fail to get under the budget), for calling on every rerun.
+        """
+        now = time.monotonic()
+        if now - self._last_check < self._interval:
+            return []
+        self._last_check = now
+        return self.enforce()
+
+    # tracemalloc
+
+    @staticmethod
+    def tracing() -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self, frames: int = 1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop_tracing(self):
+        self.snapshots.clear()
+        tracemalloc.stop()
+
+    def take_snapshot(self, label: str) -> tracemalloc.Snapshot:
+        """
+        Snapshot of traced allocations (tracing must be on), kept under `label`.
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        self.snapshots[label] = snapshot
+        return snapshot
+
+    def diff(self, old: str, new: str, top: int = 20, key_type: str = "lineno") -> pd.DataFrame:
+        """
+        Allocation sites that grew the most between two snapshots.
+        """
+        stats = self.snapshots[new].compare_to(self.snapshots[old], key_type)
+        rows = [{'site': str(s.traceback[0]) if s.traceback else '?', 'size_diff': s.size_diff, 'size': s.size,
+                 'count_diff': s.count_diff} for s in stats[:top]]
+        return pd.DataFrame(rows, columns=['site', 'size_diff', 'size', 'count_diff']).set_index('site')
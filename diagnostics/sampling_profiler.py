@@ -0,0 +1,171 @@
+"""
+On-demand sampling profiler for every thread of the process.
+
+While a capture runs, a background thread wakes every `interval` seconds, reads
+each other thread's current stack with sys._current_frames() and counts it.
+Nothing is installed in the interpreter (no sys.setprofile / settrace hooks),
+so the profiled code runs unmodified and there is no cost at all when no
+capture is running.
+
+A capture produces
+  - a collapsed-stack file, one "thread;outer;...;inner count" line per
+    distinct stack, which flamegraph.pl, speedscope and inferno render directly
+  - a top-N table of functions by own (self) and inclusive (total) samples
+
+    profiler = SamplingProfiler(out_dir="profiles")
+    profiler.start(seconds=10)          # returns at once; see profiler.result
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class Profile:
+    """
+    Aggregated samples of one capture: stack (thread name first, then frames
+    outermost to innermost) -> sample count.
+    """
+    def __init__(self, stacks: Counter, samples: int, seconds: float, interval: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.seconds = seconds
+        self.interval = interval
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, n: int = 20, thread: str = None) -> pd.DataFrame:
+        """
+        Functions by self samples (innermost frame) and total samples (anywhere on
+        the stack, counted once per stack), as counts and shares of the sampled stacks.
+        """
+        own, total = Counter(), Counter()
+        stacks = 0
+        for stack, count in self.stacks.items():
+            if thread is not None and stack[0] != thread:
+                continue
+            stacks += count
+            if len(stack) > 1:
+                own[stack[-1]] += count
+            for frame in set(stack[1:]):
+                total[frame] += count
+        if not total:
+            return pd.DataFrame(columns=['self', 'self_pct', 'total', 'total_pct'])
+        df = pd.DataFrame({'self': pd.Series(own, dtype='int64'), 'total': pd.Series(total, dtype='int64')})
+        df = df.fillna(0).astype('int64')
+        df['self_pct'] = 100.0 * df['self'] / stacks
+        df['total_pct'] = 100.0 * df['total'] / stacks
+        df.index.name = 'function'
+        return df.sort_values(['self', 'total'], ascending=False)[['self', 'self_pct', 'total', 'total_pct']].head(n)
+
+    def threads(self) -> pd.Series:
+        counts = Counter()
+        for stack, count in self.stacks.items():
+            counts[stack[0]] += count
+        return pd.Series(counts, dtype='int64').sort_values(ascending=False)
+
+    def save(self, directory: str, top_n: int = 30) -> Tuple[str, str]:
+        """
+        Write <stamp>.collapsed and <stamp>.top.txt; returns their paths.
+        """
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"profile-{datetime.now():%Y%m%d-%H%M%S}")
+        with open(f"{stem}.collapsed", "w") as f:
+            f.write(self.collapsed())
+        with open(f"{stem}.top.txt", "w") as f:
+            f.write(f"{self.samples} samples over {self.seconds:.1f}s every {self.interval * 1e3:.0f} ms\n\n")
+            f.write(self.threads().to_string() + "\n\n")
+            f.write(self.top(top_n).round(1).to_string() + "\n")
+        return f"{stem}.collapsed", f"{stem}.top.txt"
+
+
+class SamplingProfiler:
+    """
+    One capture at a time; start() returns immediately and the result is
+    published as `result` (and saved to `out_dir`, when set) when it ends.
+    """
+    def __init__(self, interval: float = 0.01, max_depth: int = 128, out_dir: Optional[str] = None):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.out_dir = out_dir
+        self.result: Optional[Profile] = None
+        self.paths: Optional[Tuple[str, str]] = None
+        self.ends_at = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+        self._labels: Dict[object, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = 10.0) -> bool:
+        """
+        Begin a capture of `seconds`; False if one is already running.
+        """
+        if self.running:
+            return False
+        self._stop.clear()
+        self.ends_at = time.monotonic() + seconds
+        self._thread = threading.Thread(target=self._run, args=(seconds,), name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling all threads every {self.interval * 1e3:.0f} ms for {seconds:g}s")
+        return True
+
+    def stop(self):
+        """
+        End a running capture early; its samples are still published.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def capture(self, seconds: float = 10.0) -> Profile:
+        """
+        Blocking capture, e.g. from a script.
+        """
+        self.start(seconds)
+        self._thread.join()
+        return self.result
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _run(self, seconds: float):
+        own = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + seconds
+        while not self._stop.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stacks[tuple(reversed(stack))] += 1
+            samples += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._stop.wait(min(self.interval, remaining))
+        self.result = Profile(stacks, samples, time.monotonic() - started, self.interval)
+        if self.out_dir:
+            self.paths = self.result.save(self.out_dir)
+            logger.info(f"Profile written to {self.paths[0]} and {self.paths[1]}")
@@ -0,0 +1,84 @@
+from typing import Dict, List, NamedTuple
+
+import pandas as pd
+
+
+class Bar(NamedTuple):
+    symbol: str
+    timeframe: str
+    start_ns: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+class BarBuilder:
+    """
+    Incremental OHLCV bars from a tick stream, one open bar per (symbol, timeframe).
+
+    A bar closes when the first tick of a later bar arrives. Intervals without
+    ticks are emitted as flat bars at the previous close with zero volume, as
+    Resampler does, so bar times line up across symbols. Ticks older than the
+    open bar are counted and dropped.
+    """
+    def __init__(self, timeframes: List[str], max_gap_bars: int = 3600):
+        self.timeframes = list(timeframes)
+        self.step_ns = {tf: pd.Timedelta(tf).value for tf in self.timeframes}
+        self.max_gap_bars = max_gap_bars
+        # (symbol, timeframe) -> [start_ns, open, high, low, close, volume]
+        self.open_bars: Dict[tuple, list] = {}
+        self.late_ticks = 0
+
+    def update(self, symbol: str, ts_ns: int, price: float, size: float) -> List[Bar]:
+        """
+        Add one tick and return the bars it closed, oldest first.
+        """
+        closed = []
+        for tf in self.timeframes:
+            step = self.step_ns[tf]
+            start = ts_ns - ts_ns % step
+            key = (symbol, tf)
+            bar = self.open_bars.get(key)
+            if bar is None:
+                self.open_bars[key] = [start, price, price, price, price, size]
+            elif start == bar[0]:
+                if price > bar[2]:
+                    bar[2] = price
+                if price < bar[3]:
+                    bar[3] = price
+                bar[4] = price
+                bar[5] += size
+            elif start > bar[0]:
+                closed.append(Bar(symbol, tf, *bar))
+                close = bar[4]
+                gap = min((start - bar[0]) // step - 1, self.max_gap_bars)
+                for i in range(1, gap + 1):
+                    closed.append(Bar(symbol, tf, bar[0] + i * step, close, close, close, close, 0.0))
+                self.open_bars[key] = [start, price, price, price, price, size]
+            else:
+                self.late_ticks += 1
+        return closed
+
+    def partial_bars(self) -> List[Bar]:
+        """
+        Current open bars, e.g. to persist on shutdown. They stay open.
+        """
+        return [Bar(symbol, tf, *bar) for (symbol, tf), bar in self.open_bars.items()]
+
+    @staticmethod
+    def to_frames(bars: List[Bar]) -> Dict[tuple, pd.DataFrame]:
+        """
+        Group bars into one OHLCV frame per (symbol, timeframe), in the layout of DataStore.store_bars.
+        """
+        groups = {}
+        for bar in bars:
+            groups.setdefault((bar.symbol, bar.timeframe), []).append(bar)
+        frames = {}
+        for key, rows in groups.items():
+            df = pd.DataFrame(rows, columns=Bar._fields).drop(columns=['symbol', 'timeframe'])
+            df.index = pd.DatetimeIndex(df.pop('start_ns').to_numpy().astype('datetime64[ns]'), name='ts')
+            # A later update of the same bar (e.g. a partial bar completed after restart) wins
+            frames[key] = df[~df.index.duplicated(keep='last')]
+        return frames
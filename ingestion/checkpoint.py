@@ -0,0 +1,263 @@
+"""
+Checkpoints of the daemon's analytics state for warm restarts.
+
+A checkpoint holds what the daemon would otherwise rebuild from raw ticks
+after a restart, during which z-scores are NaN and alerts are silent:
+
+    open bars           BarBuilder.open_bars
+    pair signals        PairSignal rolling sums, spread history, hedge ratio
+    VWAP sums           VwapBook trackers (session start and anchor included)
+    alert cooldowns     AlertEngine.active
+
+plus the tick cursor: the rowid of the last stored tick the state includes,
+so a restart replays only the ticks stored after it. Layout, little-endian:
+
+    header  HEADER      magic, version, created ns, cursor, last tick ns,
+                        payload length, CRC32 of the payload
+    payload zlib(section*)   section = tag (4 bytes), body length, body
+
+Writes go to a temporary file that is fsynced and renamed over the previous
+checkpoint, so a crash leaves the old checkpoint or the new one, never a mix.
+"""
+import logging
+import math
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from analytics.pair_signal import PairSignal
+from analytics.vwap import VwapState
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"QACP"
+VERSION = 2
+HEADER = struct.Struct("<4sHqqqII")   # magic, version, created ns, tick cursor, last tick ns, payload len, crc32
+SECTION = struct.Struct("<4sI")       # tag, body length
+NONE_NS = -(2 ** 63)
+
+
+class Checkpoint(NamedTuple):
+    created_ns: int
+    cursor: int
+    last_tick_ns: int
+    open_bars: Dict[tuple, list]
+    signals: Dict[tuple, PairSignal]
+    vwap: List[VwapState]
+    alerts: Dict[tuple, list]
+
+    @staticmethod
+    def signal_key(sig: PairSignal) -> tuple:
+        return sig.symbol_a, sig.symbol_b, sig.timeframe, sig.window, sig.hedge_window
+
+
+class _Writer:
+    def __init__(self):
+        self.buf = bytearray()
+
+    def pack(self, fmt: str, *values):
+        self.buf += struct.pack("<" + fmt, *values)
+
+    def text(self, value: str):
+        data = value.encode()
+        self.pack("H", len(data))
+        self.buf += data
+
+    def floats(self, values):
+        self.buf += np.asarray(values, dtype="<f8").tobytes()
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def unpack(self, fmt: str):
+        fmt = "<" + fmt
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def text(self) -> str:
+        n, = self.unpack("H")
+        value = bytes(self.data[self.pos:self.pos + n]).decode()
+        self.pos += n
+        return value
+
+    def floats(self, n: int) -> np.ndarray:
+        values = np.frombuffer(self.data, dtype="<f8", count=n, offset=self.pos)
+        self.pos += 8 * n
+        return values
+
+
+def _encode_bars(w: _Writer, open_bars: Dict[tuple, list]):
+    w.pack("I", len(open_bars))
+    for (symbol, timeframe), (start, o, h, l, c, v) in open_bars.items():
+        w.text(symbol)
+        w.text(timeframe)
+        w.pack("q5d", start, o, h, l, c, v)
+
+
+def _decode_bars(r: _Reader) -> Dict[tuple, list]:
+    bars = {}
+    for _ in range(r.unpack("I")[0]):
+        symbol, timeframe = r.text(), r.text()
+        bars[(symbol, timeframe)] = list(r.unpack("q5d"))
+    return bars
+
+
+def _encode_signals(w: _Writer, signals: List[PairSignal]):
+    w.pack("I", len(signals))
+    for sig in signals:
+        for value in (sig.symbol_a, sig.symbol_b, sig.timeframe):
+            w.text(value)
+        ref = sig.ref or (math.nan, math.nan)
+        w.pack("II2d", sig.window, sig.hedge_window, *ref)
+        w.pack("q5d", *sig.hedge_sums)
+        w.pack("q5d", *sig.z_sums)
+        w.pack("3dqq", sig.hedge_ratio, sig.zscore, sig.spread,
+               NONE_NS if sig.last_start_ns is None else sig.last_start_ns, sig.steps)
+        w.pack("I", len(sig.history))
+        w.floats(np.array(sig.history, dtype=np.float64).reshape(-1))
+        w.pack("I", len(sig.pending))
+        for start, closes in sig.pending.items():
+            w.pack("qI", start, len(closes))
+            for symbol, close in closes.items():
+                w.text(symbol)
+                w.pack("d", close)
+
+
+def _decode_signals(r: _Reader) -> Dict[tuple, PairSignal]:
+    signals = {}
+    for _ in range(r.unpack("I")[0]):
+        symbol_a, symbol_b, timeframe = r.text(), r.text(), r.text()
+        window, hedge_window, ref_a, ref_b = r.unpack("II2d")
+        sig = PairSignal(symbol_a, symbol_b, timeframe, window, hedge_window)
+        sig.ref = None if math.isnan(ref_a) else (ref_a, ref_b)
+        sig.hedge_sums = list(r.unpack("q5d"))
+        sig.z_sums = list(r.unpack("q5d"))
+        sig.hedge_ratio, sig.zscore, sig.spread, last_start, sig.steps = r.unpack("3dqq")
+        sig.last_start_ns = None if last_start == NONE_NS else last_start
+        n, = r.unpack("I")
+        sig.history = deque(map(tuple, r.floats(2 * n).reshape(n, 2).tolist()))
+        for _ in range(r.unpack("I")[0]):
+            start, count = r.unpack("qI")
+            sig.pending[start] = {r.text(): r.unpack("d")[0] for _ in range(count)}
+        signals[Checkpoint.signal_key(sig)] = sig
+    return signals
+
+
+def _encode_vwap(w: _Writer, states: List[VwapState]):
+    w.pack("I", len(states))
+    for s in states:
+        w.text(s.symbol)
+        w.text(s.key)
+        w.pack("qq4d", s.session_start_ns, s.last_bar_ns, s.ref, s.sum_v, s.sum_dv, s.sum_ddv)
+
+
+def _decode_vwap(r: _Reader) -> List[VwapState]:
+    states = []
+    for _ in range(r.unpack("I")[0]):
+        symbol, key = r.text(), r.text()
+        states.append(VwapState(symbol, key, *r.unpack("qq4d")))
+    return states
+
+
+def _encode_alerts(w: _Writer, active: Dict[tuple, list]):
+    w.pack("I", len(active))
+    for (pair, alert_type), (logged_at, last_breach, peak) in active.items():
+        w.text(pair)
+        w.text(alert_type)
+        w.pack("d", logged_at)
+        w.text(last_breach or "")
+        w.pack("d", peak)
+
+
+def _decode_alerts(r: _Reader) -> Dict[tuple, list]:
+    active = {}
+    for _ in range(r.unpack("I")[0]):
+        pair, alert_type = r.text(), r.text()
+        logged_at, = r.unpack("d")
+        last_breach = r.text() or None
+        active[(pair, alert_type)] = [logged_at, last_breach, r.unpack("d")[0]]
+    return active
+
+
+def encode_checkpoint(cursor: int, last_tick_ns: int, open_bars: Dict[tuple, list], signals: List[PairSignal],
+                      vwap: List[VwapState], alerts: Dict[tuple, list], level: int = 6) -> bytes:
+    payload = bytearray()
+    for tag, encoder, value in ((b"BARS", _encode_bars, open_bars), (b"PAIR", _encode_signals, signals),
+                                (b"VWAP", _encode_vwap, vwap), (b"ALRT", _encode_alerts, alerts)):
+        w = _Writer()
+        encoder(w, value)
+        payload += SECTION.pack(tag, len(w.buf)) + w.buf
+    body = zlib.compress(bytes(payload), level)
+    header = HEADER.pack(MAGIC, VERSION, time.time_ns(), cursor, last_tick_ns, len(body), zlib.crc32(body))
+    return header + body
+
+
+def decode_checkpoint(data: bytes) -> Checkpoint:
+    """
+    Parse a checkpoint; raises ValueError if it is truncated, corrupt or of another version.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, created_ns, cursor, last_tick_ns, length, crc = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} checkpoint")
+    body = data[HEADER.size:HEADER.size + length]
+    if len(body) != length or zlib.crc32(body) != crc:
+        raise ValueError("payload length or CRC mismatch")
+    payload = zlib.decompress(body)
+    decoders = {b"BARS": _decode_bars, b"PAIR": _decode_signals, b"VWAP": _decode_vwap, b"ALRT": _decode_alerts}
+    sections = {}
+    pos = 0
+    while pos < len(payload):
+        tag, n = SECTION.unpack_from(payload, pos)
+        pos += SECTION.size
+        # Unknown sections are skipped, so newer writers stay readable
+        if tag in decoders:
+            sections[tag] = decoders[tag](_Reader(payload[pos:pos + n]))
+        pos += n
+    return Checkpoint(created_ns, cursor, last_tick_ns, sections.get(b"BARS", {}), sections.get(b"PAIR", {}),
+                      sections.get(b"VWAP", []), sections.get(b"ALRT", {}))
+
+
+def write_atomic(path: str, data: bytes):
+    """
+    Replace `path` with `data`: write a temporary file, fsync it, rename it over the
+    old one and fsync the directory so the rename itself survives a crash.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def load_checkpoint(path: str) -> Optional[Checkpoint]:
+    """
+    The checkpoint at `path`, or None if there is none or it cannot be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            return decode_checkpoint(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error, zlib.error) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
@@ -0,0 +1,464 @@
+"""
+Headless ingestion daemon.
+
+Runs the market data feed (LIVE or REPLAY) as its own process, independent of
+any browser session: ticks are written in batches, closed bars go to the bars
+table under source 'live', pair z-score alerts are evaluated on every closed
+bar, and each symbol's session VWAP is updated per signal-timeframe bar and
+persisted so the dashboard and later runs continue from the same sums. The
+dashboard attaches to the same database read-only via the "Ingestion Daemon"
+data source. With --shm, recent ticks and bars are also published to
+shared-memory rings so the dashboard can read them without SQL. With
+--journal, every raw LIVE frame is also appended to a compressed frame
+journal, which REPLAY mode reads back at full speed or, with --replay-speed,
+at its original pacing.
+
+--streams picks the Binance streams: aggTrade instead of trade for fewer
+messages, plus bookTicker to store top-of-book changes in the quotes table.
+With --checkpoint, the analytics state (open bars, pair signal windows, VWAP
+sums, alert cooldowns) is saved every --checkpoint-interval seconds and on
+shutdown; a restart restores it and replays only the ticks stored after it, so
+z-scores are valid again on the first closed bar instead of after a full
+window.
+
+    python -m ingestion.daemon --symbols BTCUSDT ETHUSDT
+    python -m ingestion.daemon --mode REPLAY --replay-file trades.ndjson --db replay.db
+    python -m ingestion.daemon --symbols BTCUSDT ETHUSDT --shm qa
+    python -m ingestion.daemon --vwap-session 1W            # or --vwap-anchor 2024-06-01T13:30
+    python -m ingestion.daemon --journal journal/           # keep every raw frame
+    python -m ingestion.daemon --streams aggTrade bookTicker --quote-imbalance 0.05
+    python -m ingestion.daemon --mode REPLAY --replay-file journal/ --replay-speed 1
+    python -m ingestion.daemon --checkpoint state/daemon.ckpt --checkpoint-interval 30
+
+SIGINT/SIGTERM stop the feed, flush pending ticks and persist the open bars.
+SIGUSR1 samples every thread for --profile-seconds and writes a collapsed-stack
+profile and a hot-function table to --profile-dir (nothing runs until then):
+
+    kill -USR1 $(pgrep -f ingestion.daemon)
+"""
+import argparse
+import logging
+import math
+import queue
+import signal
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from alerts.alert_engine import AlertEngine
+from analytics.pair_signal import PairSignal
+from analytics.vwap import VwapBook
+from diagnostics.memory import rss_bytes, sizeof
+from diagnostics.sampling_profiler import SamplingProfiler
+from ingestion.bar_builder import BarBuilder
+from ingestion.checkpoint import Checkpoint, encode_checkpoint, load_checkpoint, write_atomic
+from ingestion.frame_journal import FrameJournal
+from ingestion.quotes import STREAMS, QuoteFilter
+from ingestion.websocket_client import MarketDataClient
+from storage.datastore import DataStore
+from storage.shm_ring import SharedMarketData
+
+logger = logging.getLogger(__name__)
+
+BAR_SOURCE = 'live'
+TIMEFRAMES = ["1s", "5s", "10s", "30s", "1min"]
+
+
+def tick_times_ns(ticks: list) -> np.ndarray:
+    stamps = [t['ts'] for t in ticks]
+    try:
+        return np.array(stamps, dtype='datetime64[ns]').astype(np.int64)
+    except ValueError:
+        # Offsets or mixed formats; slower but tolerant
+        return pd.to_datetime(stamps, format='mixed').values.astype('datetime64[ns]').astype(np.int64)
+
+
+class IngestionDaemon:
+    """
+    Feed -> queue -> batched writes, bar building and alert evaluation.
+
+    The feed thread only enqueues ticks. The main loop drains the queue every
+    `flush_interval` seconds (or `batch_size` ticks), so SQLite sees one
+    transaction per batch. The queue is bounded, which throttles a replay to
+    the speed the writer sustains.
+    """
+    def __init__(self, storage: DataStore, symbols: List[str], pairs: List[Tuple[str, str]] = None,
+                 mode: str = 'LIVE', replay_file: Optional[str] = None, timeframes: List[str] = None,
+                 signal_timeframe: str = '1s', window: int = 50, z_thresh: float = 2.0,
+                 lookback_minutes: int = 10, batch_size: int = 500, flush_interval: float = 0.5,
+                 queue_size: int = 20_000, status_interval: float = 30.0,
+                 shm: Optional[SharedMarketData] = None, vwap_session: str = '1D',
+                 vwap_anchor_ns: int = None, journal: Optional[FrameJournal] = None,
+                 replay_speed: Optional[float] = None, streams: List[str] = ('trade',),
+                 quote_imbalance: float = 0.05, profile_dir: str = "profiles", profile_seconds: float = 10.0,
+                 checkpoint: Optional[str] = None, checkpoint_interval: float = 30.0,
+                 checkpoint_max_age: float = 900.0):
+        self.storage = storage
+        self.shm = shm
+        self.symbols = [s.upper() for s in symbols]
+        if pairs is None:
+            pairs = [(self.symbols[0], s) for s in self.symbols[1:]]
+        self.pairs = pairs
+        self.timeframes = list(timeframes or TIMEFRAMES)
+        if signal_timeframe not in self.timeframes:
+            self.timeframes.append(signal_timeframe)
+        self.z_thresh = z_thresh
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.status_interval = status_interval
+
+        self.bars = BarBuilder(self.timeframes)
+        hedge_window = int(lookback_minutes * 60 / pd.Timedelta(signal_timeframe).total_seconds())
+        self.signals = [PairSignal(a, b, signal_timeframe, window, hedge_window) for a, b in self.pairs]
+        self.alert_engine = AlertEngine(storage)
+        self.vwap = VwapBook(storage, vwap_session, vwap_anchor_ns, timeframe=signal_timeframe)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.quotes = queue.Queue(maxsize=queue_size)
+        self.journal = journal
+        self.client = MarketDataClient(storage, self.symbols, mode=mode, replay_file=replay_file,
+                                       on_tick=self.queue.put, journal=journal, replay_speed=replay_speed,
+                                       streams=streams, on_quote=self.quotes.put,
+                                       quote_filter=QuoteFilter(quote_imbalance))
+        self._stop = threading.Event()
+        self.profiler = SamplingProfiler(out_dir=profile_dir)
+        self.profile_seconds = profile_seconds
+        self.ticks_written = 0
+        self.quotes_written = 0
+        self.bars_written = 0
+        self.alerts_checked = 0
+
+        self.checkpoint_path = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_max_age = checkpoint_max_age
+        self.checkpoints_written = 0
+        self.restored = False
+        self.last_tick_ns = 0
+        self.started = time.monotonic()
+        # First live tick, and pair -> seconds of live ticks until its first valid z-score
+        self.first_live_ns = None
+        self.first_signal = {}
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def profile(self, *_):
+        if not self.profiler.start(self.profile_seconds):
+            logger.info("A profile capture is already running.")
+
+    def _drain(self, timeout: float) -> list:
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def process(self, batch: list):
+        """
+        Persist a batch of ticks, update bars and evaluate alerts on the bars it closed.
+        """
+        if not batch:
+            return
+        self.storage.store_ticks(batch)
+        self.ticks_written += len(batch)
+
+        ts_ns = tick_times_ns(batch)
+        if self.shm is not None:
+            self._publish_ticks(batch, ts_ns)
+        if self.first_live_ns is None:
+            self.first_live_ns = int(ts_ns[0])
+        self.last_tick_ns = max(self.last_tick_ns, int(ts_ns.max()))
+        self._update((t['symbol'], ts, float(t['price']), float(t['size'])) for t, ts in zip(batch, ts_ns.tolist()))
+
+    def _update(self, ticks, live: bool = True):
+        """
+        Bars, pair signals and VWAP from (symbol, ts_ns, price, size) ticks. Alerts
+        are only evaluated on live ticks, not on ticks replayed after a restart.
+        """
+        closed = []
+        for symbol, ts, price, size in ticks:
+            closed.extend(self.bars.update(symbol, ts, price, size))
+        if not closed:
+            return
+
+        for (symbol, timeframe), df in BarBuilder.to_frames(closed).items():
+            self.storage.store_bars(BAR_SOURCE, symbol, timeframe, df)
+            if self.shm is not None:
+                self.shm.publish_bars(symbol, timeframe, df)
+        self.bars_written += len(closed)
+
+        for bar in closed:
+            self.vwap.update_bar(bar)
+            for sig in self.signals:
+                z = sig.on_bar(bar)
+                if z is not None and not math.isnan(z) and live:
+                    self.alert_engine.check_alerts(sig.symbol_a, sig.symbol_b, z, self.z_thresh)
+                    self.alerts_checked += 1
+                    if f"{sig.symbol_a}/{sig.symbol_b}" not in self.first_signal:
+                        self._first_signal(sig)
+        self.vwap.persist()
+
+    def _first_signal(self, sig: PairSignal):
+        pair = f"{sig.symbol_a}/{sig.symbol_b}"
+        self.first_signal[pair] = (self.last_tick_ns - self.first_live_ns) / 1e9
+        logger.info(f"First valid {pair} z-score after {self.first_signal[pair]:.1f}s of live ticks, "
+                    f"{time.monotonic() - self.started:.1f}s after start ({'warm' if self.restored else 'cold'} start)")
+
+    def checkpoint(self) -> int:
+        """
+        Write the analytics state and the tick cursor it includes to the checkpoint
+        file, atomically. Returns its size in bytes (0 if there is no checkpoint path
+        or writing failed).
+        """
+        if not self.checkpoint_path:
+            return 0
+        data = encode_checkpoint(self.storage.tick_cursor(), self.last_tick_ns, self.bars.open_bars, self.signals,
+                                 [t.state for t in self.vwap.trackers.values()], self.alert_engine.active)
+        try:
+            write_atomic(self.checkpoint_path, data)
+        except OSError as e:
+            logger.error(f"Error writing checkpoint {self.checkpoint_path}: {e}")
+            return 0
+        self.checkpoints_written += 1
+        return len(data)
+
+    def restore(self) -> bool:
+        """
+        Load the checkpoint and replay the ticks stored after its cursor. Returns
+        False (a cold start) if there is none, it is older than `checkpoint_max_age`
+        or the database no longer holds the ticks it refers to.
+        """
+        if not self.checkpoint_path:
+            return False
+        started = time.perf_counter()
+        cp = load_checkpoint(self.checkpoint_path)
+        if cp is None:
+            return False
+        age = (time.time_ns() - cp.created_ns) / 1e9
+        if age > self.checkpoint_max_age:
+            logger.info(f"Checkpoint is {age:.0f}s old (max {self.checkpoint_max_age:.0f}s); cold start.")
+            return False
+        if cp.cursor > self.storage.tick_cursor():
+            logger.warning("Checkpoint is ahead of the database (was it reset?); cold start.")
+            return False
+
+        symbols = set(self.symbols)
+        bars = {key: bar for key, bar in cp.open_bars.items() if key[0] in symbols and key[1] in self.bars.step_ns}
+        self.bars.open_bars.update(bars)
+        restored = 0
+        for i, sig in enumerate(self.signals):
+            saved = cp.signals.get(Checkpoint.signal_key(sig))
+            if saved is not None:
+                self.signals[i] = saved
+                restored += 1
+        vwap = self.vwap.restore(s for s in cp.vwap if s.symbol in symbols)
+        pairs = {f"{a}-{b}" for a, b in self.pairs}
+        self.alert_engine.active.update({key: v for key, v in cp.alerts.items() if key[0] in pairs})
+        self.last_tick_ns = cp.last_tick_ns
+
+        replayed = self._catch_up(cp.cursor)
+        self.restored = True
+        logger.info(f"Restored checkpoint from {age:.0f}s ago: {len(bars)} open bars, "
+                    f"{restored}/{len(self.signals)} pair signals, {vwap} VWAP states; "
+                    f"replayed {replayed} ticks in {time.perf_counter() - started:.2f}s")
+        return True
+
+    def _catch_up(self, cursor: int, chunk: int = 50_000) -> int:
+        """
+        Feed the ticks stored after `cursor` through _update; returns how many.
+        """
+        symbols = set(self.symbols)
+        replayed = 0
+        while True:
+            rows = self.storage.ticks_after(cursor, chunk)
+            if not rows:
+                break
+            cursor = rows[-1][0]
+            ticks = [row[1:] for row in rows if row[1] in symbols]
+            if ticks:
+                self._update(ticks, live=False)
+                self.last_tick_ns = max(self.last_tick_ns, max(t[1] for t in ticks))
+                replayed += len(ticks)
+            if len(rows) < chunk:
+                break
+        return replayed
+
+    def process_quotes(self):
+        """
+        Store the quotes queued since the last call in one transaction.
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(self.quotes.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.storage.store_quotes(batch)
+            self.quotes_written += len(batch)
+
+    def memory_usage(self) -> dict:
+        """
+        Bytes held by the in-process state: open bars, pair signal windows, VWAP sums,
+        alert cooldowns and the queued ticks and quotes.
+        """
+        return {
+            'bar_builder': sizeof(self.bars),
+            'signals': sizeof(self.signals),
+            'vwap': sizeof(self.vwap.trackers),
+            'alerts': sizeof(self.alert_engine.active),
+            'queues': sizeof(list(self.queue.queue)) + sizeof(list(self.quotes.queue)),
+        }
+
+    def _publish_ticks(self, batch: list, ts_ns: np.ndarray):
+        symbols = np.array([t['symbol'] for t in batch])
+        price = np.array([t['price'] for t in batch], dtype=np.float64)
+        size = np.array([t['size'] for t in batch], dtype=np.float64)
+        for symbol in np.unique(symbols):
+            mask = symbols == symbol
+            self.shm.publish_ticks(str(symbol), ts_ns[mask], price[mask], size[mask])
+
+    def _log_status(self, started: float):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        logger.info(f"{self.ticks_written} ticks ({self.ticks_written / elapsed:.0f}/s), "
+                    f"{self.bars_written} bars, queue {self.queue.qsize()}, "
+                    f"late ticks {self.bars.late_ticks}, RSS {rss_bytes() / 1e6:.0f} MB")
+        quote_filter = self.client.quote_filter
+        if quote_filter.seen:
+            logger.info(f"{self.quotes_written} quotes stored of {quote_filter.seen} book updates "
+                        f"({quote_filter.kept / quote_filter.seen:.0%} kept)")
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+            if hasattr(signal, 'SIGUSR1'):
+                signal.signal(signal.SIGUSR1, self.profile)
+
+        self.started = time.monotonic()
+        self.restore()
+        started = time.monotonic()
+        next_status = started + self.status_interval
+        next_checkpoint = started + self.checkpoint_interval
+        self.client.start()
+        logger.info(f"Ingestion daemon running: {self.symbols}, pairs {self.pairs}, db {self.storage.db_path}")
+
+        try:
+            while not self._stop.is_set():
+                batch = self._drain(self.flush_interval)
+                self.process(batch)
+                self.process_quotes()
+                if not batch and not self.client.thread.is_alive():
+                    logger.info("Feed finished.")
+                    break
+                if time.monotonic() >= next_status:
+                    self._log_status(started)
+                    next_status += self.status_interval
+                if self.checkpoint_path and time.monotonic() >= next_checkpoint:
+                    self.checkpoint()
+                    next_checkpoint += self.checkpoint_interval
+        finally:
+            self.shutdown()
+            self._log_status(started)
+
+    def shutdown(self):
+        """
+        Stop the feed and flush everything it already delivered.
+        """
+        self.client.running = False
+        # A replay thread may be blocked on a full queue; keep draining until it exits
+        while self.client.thread.is_alive() or not self.queue.empty():
+            self.process(self._drain(0.1))
+            self.process_quotes()
+            if self.queue.empty():
+                self.client.thread.join(timeout=0.1)
+                if self.client.thread.is_alive() and self.client.mode == 'LIVE':
+                    # The websocket loop notices the flag on its next message
+                    break
+        self.client.stop()
+        self.process_quotes()
+        if self.journal is not None:
+            self.journal.close()
+
+        # Persist partial bars; INSERT OR REPLACE lets the completed bar overwrite them later
+        for (symbol, timeframe), df in BarBuilder.to_frames(self.bars.partial_bars()).items():
+            self.storage.store_bars(BAR_SOURCE, symbol, timeframe, df)
+        if self.checkpoint():
+            logger.info(f"Checkpoint written to {self.checkpoint_path}")
+        if self.shm is not None:
+            self.shm.close()
+        if self.profiler.running:
+            # Keep the samples taken so far
+            self.profiler.stop()
+        logger.info("Ingestion daemon stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT", "ETHUSDT"])
+    parser.add_argument("--pairs", nargs="*", default=None, help="A/B pairs to alert on (default: first symbol vs each other)")
+    parser.add_argument("--mode", choices=["LIVE", "REPLAY"], default="LIVE", type=str.upper)
+    parser.add_argument("--replay-file", default=None, help="NDJSON trades or a --journal directory for REPLAY mode")
+    parser.add_argument("--replay-speed", type=float, default=None,
+                        help="journal replay pacing, 1 = original timing (default: full speed)")
+    parser.add_argument("--journal", default=None, metavar="DIR", help="append raw LIVE frames to a journal")
+    parser.add_argument("--streams", nargs="+", choices=STREAMS, default=["trade"],
+                        help="Binance streams per symbol (trade or aggTrade, optionally bookTicker)")
+    parser.add_argument("--profile-dir", default="profiles", help="where SIGUSR1 profiles are written")
+    parser.add_argument("--profile-seconds", type=float, default=10.0, help="length of a SIGUSR1 profile capture")
+    parser.add_argument("--quote-imbalance", type=float, default=0.05,
+                        help="store a quote with unchanged prices once the book imbalance moved this much")
+    parser.add_argument("--db", default="market_data.db")
+    parser.add_argument("--timeframes", nargs="+", default=TIMEFRAMES)
+    parser.add_argument("--signal-timeframe", default="1s")
+    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument("--z-thresh", type=float, default=2.0)
+    parser.add_argument("--lookback-minutes", type=int, default=10, help="hedge ratio window, as in the dashboard")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=0.5, help="seconds between batched writes")
+    parser.add_argument("--shm", default=None, metavar="PREFIX", help="also publish recent ticks/bars to shared memory")
+    parser.add_argument("--vwap-session", default="1D", help="VWAP reset period: 1D, 1W or any fixed span like 4h")
+    parser.add_argument("--vwap-anchor", default=None, help="anchor VWAP at this UTC time instead of resetting")
+    parser.add_argument("--checkpoint", default=None, metavar="PATH",
+                        help="save analytics state here and restore it on startup")
+    parser.add_argument("--checkpoint-interval", type=float, default=30.0, help="seconds between checkpoints")
+    parser.add_argument("--checkpoint-max-age", type=float, default=900.0,
+                        help="cold start instead of restoring a checkpoint older than this (seconds)")
+    args = parser.parse_args()
+
+    if args.mode == "REPLAY" and not args.replay_file:
+        parser.error("--replay-file is required in REPLAY mode")
+    if {"trade", "aggTrade"} <= set(args.streams):
+        parser.error("--streams takes trade or aggTrade, not both (each trade would be stored twice)")
+    pairs = None
+    if args.pairs:
+        pairs = [tuple(p.upper().split('/', 1)) for p in args.pairs if '/' in p]
+
+    anchor_ns = pd.Timestamp(args.vwap_anchor).value if args.vwap_anchor else None
+    storage = DataStore(db_path=args.db, wal=True)
+    shm = SharedMarketData(args.shm, create=True) if args.shm else None
+    journal = FrameJournal(args.journal) if args.journal and args.mode == "LIVE" else None
+    daemon = IngestionDaemon(storage, args.symbols, pairs, mode=args.mode, replay_file=args.replay_file,
+                             timeframes=args.timeframes, signal_timeframe=args.signal_timeframe,
+                             window=args.window, z_thresh=args.z_thresh, lookback_minutes=args.lookback_minutes,
+                             batch_size=args.batch_size, flush_interval=args.flush_interval, shm=shm,
+                             vwap_session=args.vwap_session, vwap_anchor_ns=anchor_ns,
+                             journal=journal, replay_speed=args.replay_speed, streams=args.streams,
+                             quote_imbalance=args.quote_imbalance, profile_dir=args.profile_dir,
+                             profile_seconds=args.profile_seconds, checkpoint=args.checkpoint,
+                             checkpoint_interval=args.checkpoint_interval,
+                             checkpoint_max_age=args.checkpoint_max_age)
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Append-only journal of raw websocket frames.
+
+Frames are stored exactly as received, each with its receive time (ns since
+the epoch), so a session can be replayed byte for byte later. Layout:
+
+    <dir>/journal-<first recv ns>.qfj     segment files, rotated by size
+        block*                            zlib-compressed runs of frames
+            header  BLOCK_HEADER          magic, raw/compressed length, frame count,
+                                          first/last recv ns, CRC32 of the payload
+            payload zlib(frame*)          frame = FRAME_HEADER (recv ns, length) + bytes
+
+append() only enqueues, so it is safe to call from the event loop; a writer
+thread compresses and writes blocks sequentially, flushes at least every
+`flush_interval` seconds and fsyncs at least every `fsync_interval` seconds.
+A crash loses at most the frames of the last un-fsynced interval; a torn
+final block fails its length or CRC check and readers stop at it. The queue
+is bounded: frames that arrive while it is full, or after a write error
+stopped the writer, are dropped and counted.
+"""
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"QFJB"
+BLOCK_HEADER = struct.Struct("<4sIIIqqI")  # magic, raw len, compressed len, frames, first ns, last ns, crc32
+FRAME_HEADER = struct.Struct("<qI")        # recv ns, frame length
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".qfj"
+
+
+def segment_paths(directory: str) -> List[str]:
+    names = sorted(n for n in os.listdir(directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+class FrameJournal:
+    """
+    Writer side. One journal per capturing process; call close() to flush and fsync.
+    """
+    def __init__(self, directory: str, segment_bytes: int = 64 << 20, block_bytes: int = 256 << 10,
+                 flush_interval: float = 0.5, fsync_interval: float = 1.0, level: int = 1,
+                 max_queued: int = 200_000):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.block_bytes = block_bytes
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.level = level
+        os.makedirs(directory, exist_ok=True)
+
+        self.max_queued = max_queued
+        self.queue = queue.SimpleQueue()
+        self._file = None
+        self._segment_size = 0
+        self._block = bytearray()
+        self._block_frames = 0
+        self._block_first_ns = 0
+        self._block_last_ns = 0
+        self._last_flush = time.monotonic()
+        self._last_fsync = time.monotonic()
+        self.frames = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+        self.blocks = 0
+        self.segments = 0
+        self.dropped = 0
+        self.failed = False
+        self._closed = False
+        self.thread = threading.Thread(target=self._run, name="frame-journal", daemon=True)
+        self.thread.start()
+
+    def append(self, frame, recv_ns: int = None):
+        """
+        Queue one raw frame (str or bytes). Never blocks: with the queue full or the
+        writer failed, the frame is dropped.
+        """
+        if self.failed or self.queue.qsize() >= self.max_queued:
+            self.dropped += 1
+            return
+        if recv_ns is None:
+            recv_ns = time.time_ns()
+        if isinstance(frame, str):
+            frame = frame.encode()
+        self.queue.put((recv_ns, frame))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(None)
+        self.thread.join()
+        logger.info(f"Journal closed: {self.frames} frames, {self.raw_bytes / 1e6:.1f} MB raw, "
+                    f"{self.written_bytes / 1e6:.1f} MB written in {self.segments} segment(s)"
+                    + (f", {self.dropped} frames dropped" if self.dropped else ""))
+
+    # Writer thread
+
+    def _run(self):
+        try:
+            self._write_loop()
+        except OSError as e:
+            # Disk full or failing: stop journaling instead of queueing frames forever
+            logger.error(f"Frame journal stopped, writing to {self.directory} failed: {e}")
+            self.failed = True
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except OSError:
+                    pass
+                self._file = None
+            while True:
+                try:
+                    if self.queue.get_nowait():
+                        self.dropped += 1
+                except queue.Empty:
+                    break
+
+    def _write_loop(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._add(*item)
+            now = time.monotonic()
+            if self._block and (len(self._block) >= self.block_bytes or now - self._last_flush >= self.flush_interval):
+                self._write_block()
+            if self._file is not None and now - self._last_fsync >= self.fsync_interval:
+                self._sync()
+        # Drain what was queued before close()
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item:
+                self._add(*item)
+        if self._block:
+            self._write_block()
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def _add(self, recv_ns: int, frame: bytes):
+        if not self._block_frames:
+            self._block_first_ns = recv_ns
+        self._block_last_ns = recv_ns
+        self._block += FRAME_HEADER.pack(recv_ns, len(frame))
+        self._block += frame
+        self._block_frames += 1
+        self.frames += 1
+        self.raw_bytes += len(frame)
+
+    def _write_block(self):
+        if self._file is None or self._segment_size >= self.segment_bytes:
+            self._rotate(self._block_first_ns)
+        payload = zlib.compress(bytes(self._block), self.level)
+        header = BLOCK_HEADER.pack(MAGIC, len(self._block), len(payload), self._block_frames,
+                                   self._block_first_ns, self._block_last_ns, zlib.crc32(payload))
+        self._file.write(header)
+        self._file.write(payload)
+        # Hand the block to the OS now; fsync makes it durable on the next interval
+        self._file.flush()
+        size = len(header) + len(payload)
+        self._segment_size += size
+        self.written_bytes += size
+        self.blocks += 1
+        self._block = bytearray()
+        self._block_frames = 0
+        self._last_flush = time.monotonic()
+
+    def _rotate(self, first_ns: int):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{first_ns:020d}{SEGMENT_SUFFIX}")
+        self._file = open(path, "ab")
+        self._segment_size = self._file.tell()
+        self.segments += 1
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+
+class JournalReader:
+    """
+    Reads frames back in order, across segments.
+    """
+    def __init__(self, directory: str):
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Journal directory {directory} does not exist")
+        self.directory = directory
+        self.torn_blocks = 0
+
+    def blocks(self, path: str) -> Iterator[Tuple[int, int, bytes]]:
+        """
+        (first ns, last ns, raw payload) of each intact block of a segment.
+        """
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(BLOCK_HEADER.size)
+                if not header:
+                    return
+                if len(header) < BLOCK_HEADER.size:
+                    self.torn_blocks += 1
+                    return
+                magic, raw_len, comp_len, _, first_ns, last_ns, crc = BLOCK_HEADER.unpack(header)
+                payload = f.read(comp_len)
+                if magic != MAGIC or len(payload) < comp_len or zlib.crc32(payload) != crc:
+                    # Torn tail from a crash (or corruption): nothing after it is trusted
+                    self.torn_blocks += 1
+                    logger.warning(f"Stopping at damaged block in {path}")
+                    return
+                yield first_ns, last_ns, zlib.decompress(payload, bufsize=raw_len)
+
+    def frames(self, start_ns: int = None) -> Iterator[Tuple[int, bytes]]:
+        """
+        (recv ns, raw frame) for every journaled frame received at or after start_ns.
+        """
+        for path in segment_paths(self.directory):
+            for _, last_ns, raw in self.blocks(path):
+                if start_ns is not None and last_ns < start_ns:
+                    continue
+                view = memoryview(raw)
+                pos = 0
+                while pos < len(raw):
+                    recv_ns, length = FRAME_HEADER.unpack_from(raw, pos)
+                    pos += FRAME_HEADER.size
+                    if start_ns is None or recv_ns >= start_ns:
+                        yield recv_ns, bytes(view[pos:pos + length])
+                    pos += length
+
+    def replay(self, speed: Optional[float] = None, start_ns: int = None,
+               stop: threading.Event = None) -> Iterator[Tuple[int, bytes]]:
+        """
+        Frames paced by their original receive times divided by `speed`
+        (1.0 = real time); None or 0 yields them as fast as they are consumed.
+        """
+        origin_ns = None
+        started = time.monotonic()
+        for recv_ns, frame in self.frames(start_ns):
+            if stop is not None and stop.is_set():
+                return
+            if speed:
+                if origin_ns is None:
+                    origin_ns = recv_ns
+                delay = (recv_ns - origin_ns) / 1e9 / speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            yield recv_ns, frame
@@ -0,0 +1,153 @@
+import hashlib
+import io
+import logging
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class OHLCLoader:
+    """
+    Streams an uploaded CSV/JSON OHLC file in fixed-size chunks so that large
+    files are parsed within bounded memory.
+
+    Expected columns: timestamp, open, high, low, close[, volume][, symbol].
+    """
+    CHUNK_ROWS = 250_000
+
+    @staticmethod
+    def fingerprint(file, name: str = "") -> str:
+        """
+        Cheap content fingerprint (name, size and the first 1 MB) used to
+        recognise a file that was already ingested.
+        """
+        file.seek(0, io.SEEK_END)
+        size = file.tell()
+        file.seek(0)
+        head = file.read(1 << 20)
+        file.seek(0)
+        digest = hashlib.sha1(head).hexdigest()[:16]
+        return f"upload:{name}:{size}:{digest}"
+
+    @staticmethod
+    def iter_chunks(file, name: str, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        Yield normalised OHLCV chunks indexed by timestamp.
+        CSV and NDJSON are streamed; a JSON array document has to be read whole.
+        """
+        file.seek(0)
+        if name.endswith('.csv'):
+            reader = pd.read_csv(file, chunksize=chunksize)
+        else:
+            first = file.read(1)
+            while first and first.isspace():
+                first = file.read(1)
+            file.seek(0)
+            if first in (b'[', '['):
+                logger.warning("JSON array upload cannot be streamed; use NDJSON for large files.")
+                reader = [pd.read_json(file)]
+            else:
+                reader = pd.read_json(file, lines=True, chunksize=chunksize)
+
+        for chunk in reader:
+            yield OHLCLoader._normalize(chunk)
+
+    @staticmethod
+    def _parse_timestamps(col: pd.Series) -> pd.DatetimeIndex:
+        if pd.api.types.is_numeric_dtype(col):
+            # Epoch seconds or milliseconds
+            unit = 'ms' if col.abs().max() > 1e11 else 's'
+            return pd.DatetimeIndex(pd.to_datetime(col, unit=unit))
+        try:
+            return pd.DatetimeIndex(pd.to_datetime(col))
+        except (ValueError, TypeError):
+            return pd.DatetimeIndex(pd.to_datetime(col, format='mixed'))
+
+    @staticmethod
+    def _normalize(chunk: pd.DataFrame) -> pd.DataFrame:
+        chunk.columns = [str(c).strip().lower() for c in chunk.columns]
+        if 'timestamp' not in chunk.columns:
+            raise ValueError("Upload is missing a 'timestamp' column.")
+        if 'volume' not in chunk.columns:
+            chunk['volume'] = 0.0
+
+        cols = [c for c in OHLCV_COLUMNS if c in chunk.columns]
+        out = chunk[cols].astype('float64')
+        out.index = OHLCLoader._parse_timestamps(chunk['timestamp'])
+        out.index.name = 'timestamp'
+        if 'symbol' in chunk.columns:
+            # A Categorical is assigned by position and stays categorical, unlike to_numpy()
+            out['symbol'] = pd.Categorical(chunk['symbol'])
+        return out
+
+    @staticmethod
+    def symbol_mask(symbols: pd.Series, wanted: str) -> np.ndarray:
+        """
+        Boolean mask of rows whose symbol matches `wanted` (e.g. BTCUSDT) or its
+        base asset (BTC). Matching is done once per category, not per row.
+        """
+        cats = symbols if isinstance(symbols.dtype, pd.CategoricalDtype) else symbols.astype('category')
+        names = cats.cat.categories.astype(str).str.upper()
+        wanted = wanted.upper()
+        match = np.asarray(names.isin([wanted, wanted.replace('USDT', '')]))
+        # Append a False slot so that missing values (code -1) never match
+        return np.append(match, False)[cats.cat.codes.to_numpy()]
+
+    @staticmethod
+    def load(file, name: str, symbols: List[str], storage=None, source: Optional[str] = None,
+             chunksize: int = CHUNK_ROWS) -> Dict[str, pd.DataFrame]:
+        """
+        Parse the file chunk by chunk and return OHLCV frames for `symbols`.
+
+        If `storage` and `source` are given, every chunk (all symbols) is written to
+        the bars table and the requested symbols are read back from it, so later
+        reruns can skip parsing entirely. Otherwise only matching rows are kept.
+        """
+        parts = {s: [] for s in symbols}
+        has_symbol = False
+        rows = 0
+
+        for chunk in OHLCLoader.iter_chunks(file, name, chunksize):
+            rows += len(chunk)
+            has_symbol = 'symbol' in chunk.columns
+            if storage is not None and source:
+                if has_symbol:
+                    for sym, group in chunk.groupby('symbol', observed=True):
+                        storage.store_bars(source, str(sym).upper(), 'raw', group)
+                else:
+                    storage.store_bars(source, '*', 'raw', chunk)
+                continue
+
+            for sym in symbols:
+                part = chunk[OHLCLoader.symbol_mask(chunk['symbol'], sym)] if has_symbol else chunk
+                parts[sym].append(part[OHLCV_COLUMNS])
+
+        logger.info(f"Parsed {rows} upload rows from {name}")
+
+        if storage is not None and source:
+            return OHLCLoader.load_stored(storage, source, symbols)
+
+        result = {}
+        for sym, frames in parts.items():
+            df = pd.concat(frames) if frames else pd.DataFrame(columns=OHLCV_COLUMNS)
+            result[sym] = df.sort_index()
+        return result
+
+    @staticmethod
+    def load_stored(storage, source: str, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Read previously ingested upload bars for `symbols`, matching either the full
+        symbol or its base asset. Files without a symbol column are stored under '*'.
+        """
+        stored = storage.get_bar_symbols(source)
+        result = {}
+        for sym in symbols:
+            sym_u = sym.upper()
+            candidates = [s for s in (sym_u, sym_u.replace('USDT', ''), '*') if s in stored]
+            result[sym] = storage.get_bars(source, candidates[0], 'raw') if candidates else pd.DataFrame()
+        return result
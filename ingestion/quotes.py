@@ -0,0 +1,56 @@
+import time
+from typing import Dict
+
+# Binance stream names MarketDataClient can subscribe to
+STREAMS = ('trade', 'aggTrade', 'bookTicker')
+
+
+def normalize_book_ticker(msg: dict, recv_ns: int = None) -> dict:
+    """
+    bookTicker payload -> {symbol, ts_ns, bid, bid_qty, ask, ask_qty}. Futures
+    messages carry a transaction time; spot ones do not, so those use the receive time.
+    """
+    ts_ms = msg.get('T') or msg.get('E')
+    return {
+        'symbol': msg['s'],
+        'ts_ns': int(ts_ms) * 1_000_000 if ts_ms else (recv_ns or time.time_ns()),
+        'bid': float(msg['b']),
+        'bid_qty': float(msg['B']),
+        'ask': float(msg['a']),
+        'ask_qty': float(msg['A']),
+    }
+
+
+class QuoteFilter:
+    """
+    Change-only filter for top-of-book updates.
+
+    bookTicker pushes every change of best price or size, most of them size
+    flickers. A quote is kept when the best bid or ask price moved, or when the
+    book imbalance bid_qty / (bid_qty + ask_qty) moved by at least
+    `min_imbalance_change` since the last kept quote. The microprice is
+    bid + (ask - bid) * imbalance, so the microprice series of the kept quotes is
+    within min_imbalance_change of a spread of the full one; 0 keeps every change.
+    """
+    def __init__(self, min_imbalance_change: float = 0.05):
+        self.min_imbalance_change = min_imbalance_change
+        self._last: Dict[str, tuple] = {}
+        self.seen = 0
+        self.kept = 0
+
+    @staticmethod
+    def imbalance(quote: dict) -> float:
+        depth = quote['bid_qty'] + quote['ask_qty']
+        return quote['bid_qty'] / depth if depth > 0 else 0.5
+
+    def accept(self, quote: dict) -> bool:
+        self.seen += 1
+        imbalance = self.imbalance(quote)
+        last = self._last.get(quote['symbol'])
+        if last is not None and last[:2] == (quote['bid'], quote['ask']):
+            same_size = last[2:4] == (quote['bid_qty'], quote['ask_qty'])
+            if same_size or abs(imbalance - last[4]) < self.min_imbalance_change:
+                return False
+        self._last[quote['symbol']] = (quote['bid'], quote['ask'], quote['bid_qty'], quote['ask_qty'], imbalance)
+        self.kept += 1
+        return True
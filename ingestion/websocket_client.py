@@ -1,22 +1,51 @@
 import asyncio
 import json
 import logging
+import os
 import threading
 import time
 from datetime import datetime
 import websockets
-from typing import List, Callable, Optional
+from typing import List, Callable, Optional, Sequence
 import pandas as pd
 
+from ingestion.frame_journal import FrameJournal, JournalReader
+from ingestion.quotes import STREAMS, QuoteFilter, normalize_book_ticker
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MarketDataClient:
-    def __init__(self, storage_engine, symbols: List[str], mode: str = 'LIVE', replay_file: Optional[str] = None):
+    def __init__(self, storage_engine, symbols: List[str], mode: str = 'LIVE', replay_file: Optional[str] = None,
+                 on_tick: Optional[Callable[[dict], None]] = None, journal: Optional[FrameJournal] = None,
+                 replay_speed: Optional[float] = None, streams: Sequence[str] = ('trade',),
+                 on_quote: Optional[Callable[[dict], None]] = None, quote_filter: Optional[QuoteFilter] = None):
+        """
+        on_tick: receives each normalized tick instead of it being written to storage
+        one row at a time, e.g. so the ingestion daemon can batch writes.
+        streams: Binance streams per symbol, any of 'trade', 'aggTrade' (same fields,
+        one message per taker order instead of per fill) and 'bookTicker' (top of book).
+        on_quote: receives each top-of-book change kept by quote_filter (default
+        QuoteFilter()); without it quotes are stored in small batches.
+        journal: records every raw LIVE frame before it is parsed.
+        replay_file: NDJSON file, or a journal directory written by FrameJournal.
+        replay_speed: journal replay pacing, 1.0 = original timing; None replays at full speed.
+        """
         self.storage = storage_engine
+        self.on_tick = on_tick
+        self.journal = journal
+        self.replay_speed = replay_speed
         self.symbols = [s.lower() for s in symbols]
         self.mode = mode.upper()
         self.replay_file = replay_file
+        unknown = set(streams) - set(STREAMS)
+        if unknown:
+            raise ValueError(f"Unknown streams {sorted(unknown)}; expected any of {STREAMS}")
+        self.streams = list(streams)
+        self.on_quote = on_quote
+        self.quote_filter = quote_filter or QuoteFilter()
+        self._pending_quotes = []
+        self._last_quote_flush = time.monotonic()
         self.running = False
         self.thread = None
         self._loop = None
@@ -25,7 +54,7 @@ class MarketDataClient:
         if self.running:
             return
         self.running = True
-        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread = threading.Thread(target=self._run_loop, name="market-data-client", daemon=True)
         self.thread.start()
         logger.info(f"Market Data Client started in {self.mode} mode.")
 
@@ -33,6 +62,7 @@ class MarketDataClient:
         self.running = False
         if self.thread:
             self.thread.join(timeout=1)
+        self._flush_quotes()
         logger.info("Market Data Client stopped.")
 
     def _run_loop(self):
@@ -43,7 +73,7 @@ class MarketDataClient:
 
     async def _live_ingestion(self):
         base_url = "wss://fstream.binance.com/stream?streams="
-        streams = "/".join([f"{s}@trade" for s in self.symbols])
+        streams = "/".join([f"{s}@{stream}" for s in self.symbols for stream in self.streams])
         url = f"{base_url}{streams}"
 
         logger.info(f"Connecting to {url}")
@@ -54,21 +84,59 @@ class MarketDataClient:
                     logger.info("Connected to Binance Futures WS")
                     while self.running:
                         msg = await ws.recv()
+                        if self.journal is not None:
+                            self.journal.append(msg, time.time_ns())
                         data = json.loads(msg)
                         if 'data' in data:
-                            self._process_trade_msg(data['data'])
+                            self._dispatch(data['data'])
             except Exception as e:
                 logger.error(f"WebSocket error: {e}")
                 await asyncio.sleep(5)
 
+    def _dispatch(self, msg: dict):
+        """
+        Route a stream payload by event type; trade and aggTrade share their fields.
+        Streams not subscribed are skipped, so a replayed journal holding both trade
+        and aggTrade frames is not counted twice.
+        """
+        # Spot bookTicker payloads have no event type
+        event = msg.get('e') or ('bookTicker' if 'b' in msg and 'a' in msg else None)
+        if event not in self.streams:
+            return
+        if event == 'bookTicker':
+            self._process_quote_msg(msg)
+        else:
+            self._process_trade_msg(msg)
+
+    def _process_quote_msg(self, msg: dict):
+        quote = normalize_book_ticker(msg)
+        if not self.quote_filter.accept(quote):
+            return
+        if self.on_quote is not None:
+            self.on_quote(quote)
+            return
+        self._pending_quotes.append(quote)
+        if len(self._pending_quotes) >= 200 or time.monotonic() - self._last_quote_flush >= 0.5:
+            self._flush_quotes()
+
+    def _flush_quotes(self):
+        quotes, self._pending_quotes = self._pending_quotes, []
+        self._last_quote_flush = time.monotonic()
+        if quotes:
+            self.storage.store_quotes(quotes)
+
     def _process_trade_msg(self, trade: dict):
         
+        # Naive UTC, like the quotes table and every utcnow() lookback
         normalized = {
             'symbol': trade['s'],
-            'ts': datetime.fromtimestamp(trade['T'] / 1000.0).isoformat(),
+            'ts': datetime.utcfromtimestamp(trade['T'] / 1000.0).isoformat(),
             'price': float(trade['p']),
             'size': float(trade['q'])
         }
+        if self.on_tick is not None:
+            self.on_tick(normalized)
+            return
         print(f"TICK: {normalized['symbol']} @ {normalized['price']} ({normalized['size']})")
         self.storage.store_tick(normalized)
 
@@ -81,6 +149,10 @@ class MarketDataClient:
             logger.error("No replay file provided.")
             return
 
+        if os.path.isdir(self.replay_file):
+            self._replay_journal()
+            return
+
         logger.info(f"Starting replay from {self.replay_file}")
         
         try:
@@ -92,8 +164,10 @@ class MarketDataClient:
                     
                     try:
                         record = json.loads(line)
-                        if 'e' in record and record['e'] == 'trade':
-                             self._process_trade_msg(record)
+                        if record.get('e') in STREAMS:
+                             self._dispatch(record)
+                        elif self.on_tick is not None:
+                             self.on_tick(record)
                         else:
                              self.storage.store_tick(record)
                         
@@ -104,3 +178,26 @@ class MarketDataClient:
             logger.error(f"Replay error: {e}")
             
         logger.info("Replay finished.")
+
+    def _replay_journal(self):
+        """
+        Feed journaled raw frames through the same parsing path as the live feed.
+        """
+        reader = JournalReader(self.replay_file)
+        pacing = f"at {self.replay_speed:g}x original pacing" if self.replay_speed else "at full speed"
+        logger.info(f"Starting journal replay from {self.replay_file} {pacing}")
+        frames = 0
+        try:
+            for _, frame in reader.replay(self.replay_speed):
+                if not self.running:
+                    break
+                try:
+                    data = json.loads(frame)
+                except json.JSONDecodeError:
+                    continue
+                if 'data' in data:
+                    self._dispatch(data['data'])
+                frames += 1
+        except Exception as e:
+            logger.error(f"Replay error: {e}")
+        logger.info(f"Journal replay finished: {frames} frames, {reader.torn_blocks} damaged block(s) skipped.")
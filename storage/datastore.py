@@ -1,22 +1,64 @@
+import os
 import sqlite3
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import threading
 import logging
 
+from storage.tick_buffer import TickDelta, empty_delta, quote_price
+
+# (tick size, lot size) used to scale prices and quantities to integers in compact mode.
+# Binance USDT-M futures filters; other symbols fall back to DEFAULT_SCALE.
+KNOWN_SCALES = {
+    'BTCUSDT': (0.1, 0.001),
+    'ETHUSDT': (0.01, 0.001),
+}
+DEFAULT_SCALE = (1e-8, 1e-8)
+
+# Alerts of the same pair and type closer than this belong to one episode
+ALERT_EPISODE_GAP_SECONDS = 120
+
 class DataStore:
-    def __init__(self, db_path="market_data.db"):
+    def __init__(self, db_path="market_data.db", compact: bool = None, read_only: bool = False, wal: bool = False):
+        """
+        compact: store ticks as (symbol id, int64 ns timestamp, price in ticks, size in lots)
+        instead of (TEXT symbol, TEXT ts, REAL, REAL). Defaults to the COMPACT_STORAGE env var.
+        read_only: open an existing database without creating or writing anything, e.g. the
+        dashboard attached to the ingestion daemon's database. The schema comes from the writer.
+        wal: switch the database to write-ahead logging so readers do not block the writer.
+        """
         self.db_path = db_path
+        self.read_only = read_only
+        if compact is None:
+            compact = os.getenv("COMPACT_STORAGE", "0").lower() in ("1", "true", "yes")
         self._lock = threading.Lock()
-        self._init_db()
+        self._symbols = {}
+        if read_only:
+            if not os.path.exists(db_path):
+                raise FileNotFoundError(f"Database {db_path} does not exist; start the ingestion daemon first.")
+            # Follow the writer's tick layout rather than the local setting
+            conn = self._get_conn()
+            try:
+                compact = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ticks_compact'").fetchone() is not None
+            finally:
+                conn.close()
+        self.compact = compact
+        if not read_only:
+            self._init_db(wal)
 
     def _get_conn(self):
+        if self.read_only:
+            return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
         return sqlite3.connect(self.db_path, check_same_thread=False)
 
-    def _init_db(self):
+    def _init_db(self, wal: bool = False):
         with self._lock:
             conn = self._get_conn()
             cursor = conn.cursor()
+            if wal:
+                cursor.execute("PRAGMA journal_mode=WAL")
             
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS ticks (
@@ -38,15 +80,210 @@ class DataStore:
                     value REAL
                 )
             """)
+            # Newest-first pages (rowid breaks timestamp ties) and per-pair history
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts(timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerts_symbol_ts ON alerts(symbol, timestamp)")
+
+            # Hourly counts per pair and type, maintained on insert so summaries never scan alerts
+            new_rollups = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alert_counts'").fetchone() is None
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS alert_counts (
+                    hour TEXT,
+                    symbol TEXT,
+                    alert_type TEXT,
+                    alerts INTEGER,
+                    PRIMARY KEY (hour, symbol, alert_type)
+                )
+            """)
+            # Consecutive alerts of a pair and type collapsed into one row
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS alert_episodes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT,
+                    alert_type TEXT,
+                    start_ts TEXT,
+                    end_ts TEXT,
+                    peak_value REAL,
+                    alerts INTEGER
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_episodes_key ON alert_episodes(symbol, alert_type, end_ts)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_episodes_end ON alert_episodes(end_ts)")
+            if new_rollups:
+                self._backfill_alert_rollups(cursor)
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    source TEXT,
+                    symbol TEXT,
+                    timeframe TEXT,
+                    ts TEXT,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL
+                )
+            """)
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_bars_key ON bars(source, symbol, timeframe, ts)")
+
+            # Running VWAP sums per symbol and session/anchor (see analytics/vwap.py)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS vwap_state (
+                    symbol TEXT,
+                    anchor TEXT,
+                    session_start INTEGER,
+                    last_bar INTEGER,
+                    ref REAL,
+                    sum_v REAL,
+                    sum_dv REAL,
+                    sum_ddv REAL,
+                    PRIMARY KEY (symbol, anchor)
+                )
+            """)
+
+            # Symbol dictionary with tick/lot sizes for the integer-encoded tables
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS symbols (
+                    id INTEGER PRIMARY KEY,
+                    symbol TEXT UNIQUE,
+                    tick_size REAL,
+                    lot_size REAL
+                )
+            """)
+
+            # Top of book, written only when it changes (see ingestion/quotes.py);
+            # prices in ticks and quantities in lots like ticks_compact
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quotes (
+                    symbol_id INTEGER,
+                    ts_ns INTEGER,
+                    bid INTEGER,
+                    bid_qty INTEGER,
+                    ask INTEGER,
+                    ask_qty INTEGER
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_quotes_symbol_ts ON quotes(symbol_id, ts_ns)")
+
+            # Counters shared with other processes; 'generation' is bumped by clear_db
+            cursor.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+
+            if self.compact:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS ticks_compact (
+                        symbol_id INTEGER,
+                        ts_ns INTEGER,
+                        price INTEGER,
+                        qty INTEGER
+                    )
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_compact_symbol_ts ON ticks_compact(symbol_id, ts_ns)")
             
             conn.commit()
             conn.close()
 
+    @staticmethod
+    def _backfill_alert_rollups(cursor):
+        """
+        One-off: build counts and episodes for alerts logged before those tables existed.
+        """
+        cursor.execute("""
+            INSERT INTO alert_counts
+            SELECT substr(timestamp, 1, 13), symbol, alert_type, COUNT(*) FROM alerts
+            GROUP BY 1, 2, 3
+        """)
+        rows = cursor.execute(
+            "SELECT symbol, alert_type, timestamp, value FROM alerts ORDER BY symbol, alert_type, timestamp").fetchall()
+        episodes = []
+        for symbol, alert_type, ts, value in rows:
+            last = episodes[-1] if episodes else None
+            if (last is not None and last[0] == symbol and last[1] == alert_type
+                    and DataStore._seconds_between(last[3], ts) <= ALERT_EPISODE_GAP_SECONDS):
+                last[3] = ts
+                if abs(value) > abs(last[4]):
+                    last[4] = value
+                last[5] += 1
+            else:
+                episodes.append([symbol, alert_type, ts, ts, value, 1])
+        cursor.executemany("INSERT INTO alert_episodes (symbol, alert_type, start_ts, end_ts, peak_value, alerts) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", episodes)
+        if rows:
+            logging.info(f"Backfilled {len(episodes)} alert episodes from {len(rows)} alerts")
+
+    @staticmethod
+    def _seconds_between(start: str, end: str) -> float:
+        return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds()
+
+    def register_symbol(self, symbol: str, tick_size: float = None, lot_size: float = None, create: bool = True):
+        """
+        Return (id, tick_size, lot_size) for a symbol, adding it to the symbol dictionary
+        if needed. With create=False an unknown symbol returns None.
+        """
+        entry = self._symbols.get(symbol)
+        if entry is not None:
+            return entry
+        default_tick, default_lot = KNOWN_SCALES.get(symbol, DEFAULT_SCALE)
+        conn = self._get_conn()
+        try:
+            if create:
+                conn.execute(
+                    "INSERT OR IGNORE INTO symbols (symbol, tick_size, lot_size) VALUES (?, ?, ?)",
+                    (symbol, tick_size or default_tick, lot_size or default_lot)
+                )
+                conn.commit()
+            entry = conn.execute("SELECT id, tick_size, lot_size FROM symbols WHERE symbol = ?", (symbol,)).fetchone()
+        finally:
+            conn.close()
+        if entry is not None:
+            self._symbols[symbol] = entry
+        return entry
+
+    def _encode_ticks(self, ticks: list) -> list:
+        """
+        Tick dicts -> (symbol_id, ts_ns, price_ticks, qty_lots) rows, rounded to the symbol's tick/lot size.
+        """
+        ts_ns = np.array([t['ts'] for t in ticks], dtype='datetime64[ns]').astype(np.int64)
+        rows = []
+        for tick, ts in zip(ticks, ts_ns.tolist()):
+            sid, tick_size, lot_size = self.register_symbol(tick['symbol'])
+            rows.append((sid, ts, int(round(tick['price'] / tick_size)), int(round(tick['size'] / lot_size))))
+        return rows
+
+    def store_ticks(self, ticks: list):
+        """
+        Store a batch of ticks in one transaction.
+        """
+        if not ticks:
+            return
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                if self.compact:
+                    conn.executemany(
+                        "INSERT INTO ticks_compact (symbol_id, ts_ns, price, qty) VALUES (?, ?, ?, ?)",
+                        self._encode_ticks(ticks)
+                    )
+                else:
+                    conn.executemany(
+                        "INSERT INTO ticks (symbol, ts, price, size) VALUES (?, ?, ?, ?)",
+                        [(t['symbol'], t['ts'], t['price'], t['size']) for t in ticks]
+                    )
+                conn.commit()
+            except Exception as e:
+                logging.error(f"Error storing ticks: {e}")
+            finally:
+                conn.close()
+
     def store_tick(self, tick_data: dict):
         """
         Store a single tick.
         tick_data: {symbol, ts, price, size}
         """
+        if self.compact:
+            self.store_ticks([tick_data])
+            return
         with self._lock:
             conn = self._get_conn()
             try:
@@ -60,10 +297,71 @@ class DataStore:
             finally:
                 conn.close()
 
+    def store_quotes(self, quotes: list):
+        """
+        Store a batch of top-of-book quotes {symbol, ts_ns, bid, bid_qty, ask, ask_qty} in one transaction.
+        """
+        if not quotes:
+            return
+        rows = []
+        for q in quotes:
+            sid, tick_size, lot_size = self.register_symbol(q['symbol'])
+            rows.append((sid, int(q['ts_ns']), int(round(q['bid'] / tick_size)), int(round(q['bid_qty'] / lot_size)),
+                         int(round(q['ask'] / tick_size)), int(round(q['ask_qty'] / lot_size))))
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.executemany(
+                    "INSERT INTO quotes (symbol_id, ts_ns, bid, bid_qty, ask, ask_qty) VALUES (?, ?, ?, ?, ?, ?)", rows)
+                conn.commit()
+            except Exception as e:
+                logging.error(f"Error storing quotes: {e}")
+            finally:
+                conn.close()
+
+    def get_quotes(self, symbol: str, lookback_minutes: int = 60) -> pd.DataFrame:
+        """
+        Quotes of the last N minutes with bid, bid_qty, ask, ask_qty, mid and micro columns.
+        """
+        columns = ['bid', 'bid_qty', 'ask', 'ask_qty', 'mid', 'micro']
+        entry = self.register_symbol(symbol, create=False)
+        if entry is None:
+            return pd.DataFrame(columns=columns)
+        _, tick_size, lot_size = entry
+        start_ns = np.datetime64(datetime.utcnow() - timedelta(minutes=lookback_minutes), 'ns').astype(np.int64)
+        query = ("SELECT ts_ns, bid, bid_qty, ask, ask_qty FROM quotes WHERE symbol_id = ? AND ts_ns >= ? "
+                 "ORDER BY ts_ns ASC")
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                rows = conn.execute(query, (entry[0], int(start_ns))).fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+            finally:
+                conn.close()
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        arr = np.array(rows, dtype=np.int64)
+        df = pd.DataFrame({
+            'bid': arr[:, 1] * tick_size,
+            'bid_qty': arr[:, 2] * lot_size,
+            'ask': arr[:, 3] * tick_size,
+            'ask_qty': arr[:, 4] * lot_size,
+        }, index=pd.DatetimeIndex(arr[:, 0].astype('datetime64[ns]'), name='ts'))
+        for source in ('mid', 'micro'):
+            df[source] = quote_price(source, df['bid'].to_numpy(), df['bid_qty'].to_numpy(),
+                                     df['ask'].to_numpy(), df['ask_qty'].to_numpy())
+        return df
+
     def get_ticks(self, symbol: str, lookback_minutes: int = 60) -> pd.DataFrame:
         """
         Retrieve ticks for a symbol from the last N minutes.
         """
+        if self.compact:
+            ts, price, size = self.get_tick_arrays(symbol, lookback_minutes)
+            df = pd.DataFrame({'price': price, 'size': size}, index=pd.DatetimeIndex(ts.astype('datetime64[ns]'), name='ts'))
+            return df if len(df) else pd.DataFrame(columns=['price', 'size'])
+
         start_time = (datetime.utcnow() - timedelta(minutes=lookback_minutes)).isoformat()
         
         query = "SELECT ts, price, size FROM ticks WHERE symbol = ? AND ts >= ? ORDER BY ts ASC"
@@ -79,29 +377,376 @@ class DataStore:
             finally:
                 conn.close()
 
+    def get_tick_arrays(self, symbol: str, lookback_minutes: int = 60):
+        """
+        Ticks as NumPy arrays (int64 ns timestamps, price, size), skipping the DataFrame.
+        """
+        if self.compact:
+            ts, price, qty = self._get_compact_arrays(symbol, lookback_minutes)
+            if not len(ts):
+                return ts, np.empty(0), np.empty(0)
+            _, tick_size, lot_size = self.register_symbol(symbol)
+            return ts, price * tick_size, qty * lot_size
+
+        start_time = (datetime.utcnow() - timedelta(minutes=lookback_minutes)).isoformat()
+        query = "SELECT ts, price, size FROM ticks WHERE symbol = ? AND ts >= ? ORDER BY ts ASC"
+
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                rows = conn.execute(query, (symbol, start_time)).fetchall()
+            finally:
+                conn.close()
+
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        ts, price, size = zip(*rows)
+        ts = np.array(ts, dtype='datetime64[ns]').astype(np.int64)
+        return ts, np.array(price, dtype=np.float64), np.array(size, dtype=np.float64)
+
+    def fetch_since(self, symbol: str, cursor: int = None, lookback_minutes: int = 60,
+                    price_source: str = 'trade', now_ns: int = None) -> TickDelta:
+        """
+        Ticks of a symbol stored after `cursor`, the (generation, rowid) returned by
+        the previous call.
+
+        The increment is a rowid range scan, so it reads only rows inserted since
+        the cursor rather than the lookback window. Without a cursor, or when the
+        database was cleared since (clear_db bumps the generation), the lookback
+        window ending at now_ns (default now) is returned with reset=True. price_source
+        'mid' or 'micro' reads the quotes table instead, with the quote price as
+        price and zero size.
+        """
+        now = datetime.utcnow() if now_ns is None else datetime(1970, 1, 1) + timedelta(microseconds=now_ns // 1000)
+        start = now - timedelta(minutes=lookback_minutes)
+        start_ns = int(np.datetime64(start, 'ns').astype(np.int64))
+        if price_source != 'trade' or self.compact:
+            entry = self.register_symbol(symbol, create=False)
+            if entry is None:
+                return empty_delta(cursor, reset=cursor is None)
+            _, tick_size, lot_size = entry
+        if price_source != 'trade':
+            rows, top, reset = self._fetch_rows('quotes', 'ts_ns, bid, bid_qty, ask, ask_qty', 'symbol_id', 'ts_ns',
+                                                entry[0], start_ns, cursor)
+            if not rows:
+                return empty_delta(top, reset)
+            arr = np.array(rows, dtype=np.float64)
+            price = quote_price(price_source, arr[:, 1] * tick_size, arr[:, 2], arr[:, 3] * tick_size, arr[:, 4])
+            return TickDelta(np.array([r[0] for r in rows], dtype=np.int64), price, np.zeros(len(rows)), top, reset)
+        if self.compact:
+            rows, top, reset = self._fetch_rows('ticks_compact', 'ts_ns, price, qty', 'symbol_id', 'ts_ns',
+                                                entry[0], start_ns, cursor)
+        else:
+            rows, top, reset = self._fetch_rows('ticks', 'ts, price, size', 'symbol', 'ts', symbol, start.isoformat(), cursor)
+
+        if not rows:
+            return empty_delta(top, reset)
+        ts, price, size = zip(*rows)
+        if self.compact:
+            ts = np.array(ts, dtype=np.int64)
+            price = np.array(price, dtype=np.float64) * tick_size
+            size = np.array(size, dtype=np.float64) * lot_size
+        else:
+            ts = np.array(ts, dtype='datetime64[ns]').astype(np.int64)
+            price = np.array(price, dtype=np.float64)
+            size = np.array(size, dtype=np.float64)
+        return TickDelta(ts, price, size, top, reset)
+
+    def tick_cursor(self) -> int:
+        """
+        Rowid of the newest stored tick (0 when there are none), a position for ticks_after.
+        """
+        table = 'ticks_compact' if self.compact else 'ticks'
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                return conn.execute(f"SELECT max(rowid) FROM {table}").fetchone()[0] or 0
+            except sqlite3.OperationalError:
+                return 0
+            finally:
+                conn.close()
+
+    def ticks_after(self, cursor: int, limit: int = 50_000) -> list:
+        """
+        Up to `limit` ticks of all symbols stored after `cursor`, in insertion order,
+        as (rowid, symbol, ts_ns, price, size), e.g. to catch up from a checkpoint.
+        """
+        if self.compact:
+            query = ("SELECT t.rowid, s.symbol, t.ts_ns, t.price * s.tick_size, t.qty * s.lot_size "
+                     "FROM ticks_compact t JOIN symbols s ON s.id = t.symbol_id "
+                     "WHERE t.rowid > ? ORDER BY t.rowid LIMIT ?")
+        else:
+            query = "SELECT rowid, symbol, ts, price, size FROM ticks WHERE rowid > ? ORDER BY rowid LIMIT ?"
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                rows = conn.execute(query, (cursor, limit)).fetchall()
+            except sqlite3.OperationalError:
+                return []
+            finally:
+                conn.close()
+        if rows and not self.compact:
+            ts_ns = np.array([r[2] for r in rows], dtype='datetime64[ns]').astype(np.int64).tolist()
+            rows = [(r[0], r[1], ts, r[3], r[4]) for r, ts in zip(rows, ts_ns)]
+        return rows
+
+    def _fetch_rows(self, table: str, columns: str, key_column: str, ts_column: str, key, start, cursor):
+        """
+        (rows, new cursor, reset) for fetch_since: the lookback window ordered by time
+        when reset, otherwise the rows after the cursor in insertion order.
+        """
+        generation, after = cursor if cursor is not None else (None, None)
+        window = (f"SELECT {columns} FROM {table} WHERE {key_column} = ? AND {ts_column} >= ? AND rowid <= ? "
+                  f"ORDER BY {ts_column} ASC")
+        # Unary + keeps the planner off the symbol index and on the rowid range
+        increment = f"SELECT {columns} FROM {table} WHERE rowid > ? AND rowid <= ? AND +{key_column} = ? ORDER BY rowid"
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                # Bounding both reads by the current top rowid keeps the cursor exact under concurrent inserts
+                top = conn.execute(f"SELECT max(rowid) FROM {table}").fetchone()[0] or 0
+                current = self._generation(conn)
+                reset = cursor is None or generation != current or after > top
+                if reset:
+                    rows = conn.execute(window, (key, start, top)).fetchall()
+                else:
+                    rows = conn.execute(increment, (after, top, key)).fetchall()
+            except sqlite3.OperationalError:
+                # Read-only attach before the writer created the table
+                return [], cursor, cursor is None
+            finally:
+                conn.close()
+        return rows, (current, top), reset
+
+    @staticmethod
+    def _generation(conn) -> int:
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        except sqlite3.OperationalError:
+            # Database created before the meta table
+            return 0
+        return row[0] if row else 0
+
+    def _get_compact_arrays(self, symbol: str, lookback_minutes: int):
+        """
+        Raw integer columns (ts_ns, price ticks, qty lots) from the compact table.
+        """
+        empty = np.empty(0, dtype=np.int64)
+        entry = self.register_symbol(symbol, create=False)
+        if entry is None:
+            return empty, empty, empty
+        start_ns = np.datetime64(datetime.utcnow() - timedelta(minutes=lookback_minutes), 'ns').astype(np.int64)
+        query = "SELECT ts_ns, price, qty FROM ticks_compact WHERE symbol_id = ? AND ts_ns >= ? ORDER BY ts_ns ASC"
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                rows = conn.execute(query, (entry[0], int(start_ns))).fetchall()
+            finally:
+                conn.close()
+        if not rows:
+            return empty, empty, empty
+        arr = np.array(rows, dtype=np.int64)
+        return arr[:, 0].copy(), arr[:, 1].copy(), arr[:, 2].copy()
+
+    def store_bars(self, source: str, symbol: str, timeframe: str, bars: pd.DataFrame):
+        """
+        Upsert OHLCV bars indexed by timestamp.
+        source: origin of the bars, e.g. 'live' or an upload fingerprint.
+        """
+        if bars.empty:
+            return
+        ts = np.datetime_as_string(bars.index.values.astype('datetime64[us]')).tolist()
+        volume = bars['volume'] if 'volume' in bars.columns else pd.Series(0.0, index=bars.index)
+        rows = zip([source] * len(bars), [symbol] * len(bars), [timeframe] * len(bars), ts,
+                   bars['open'].tolist(), bars['high'].tolist(), bars['low'].tolist(),
+                   bars['close'].tolist(), volume.tolist())
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO bars (source, symbol, timeframe, ts, open, high, low, close, volume) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+            except Exception as e:
+                logging.error(f"Error storing bars: {e}")
+            finally:
+                conn.close()
+
+    def get_bars(self, source: str, symbol: str, timeframe: str, start: str = None, end: str = None) -> pd.DataFrame:
+        """
+        Retrieve stored OHLCV bars, optionally bounded by ISO timestamps.
+        """
+        query = "SELECT ts, open, high, low, close, volume FROM bars WHERE source = ? AND symbol = ? AND timeframe = ?"
+        params = [source, symbol, timeframe]
+        if start is not None:
+            query += " AND ts >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND ts <= ?"
+            params.append(end)
+        query += " ORDER BY ts ASC"
+
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                df = pd.read_sql_query(query, conn, params=params)
+                if not df.empty:
+                    df['ts'] = pd.to_datetime(df['ts'], format='ISO8601')
+                    df.set_index('ts', inplace=True)
+                return df
+            finally:
+                conn.close()
+
+    def get_bar_symbols(self, source: str) -> list:
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                rows = conn.execute("SELECT DISTINCT symbol FROM bars WHERE source = ?", (source,)).fetchall()
+                return [r[0] for r in rows]
+            finally:
+                conn.close()
+
+    def save_vwap_states(self, states: list):
+        """
+        Upsert (symbol, anchor, session_start, last_bar, ref, sum_v, sum_dv, sum_ddv) rows.
+        """
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                conn.executemany("INSERT OR REPLACE INTO vwap_state VALUES (?, ?, ?, ?, ?, ?, ?, ?)", states)
+                conn.commit()
+            except Exception as e:
+                logging.error(f"Error storing VWAP state: {e}")
+            finally:
+                conn.close()
+
+    def load_vwap_state(self, symbol: str, anchor: str):
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                return conn.execute("SELECT * FROM vwap_state WHERE symbol = ? AND anchor = ?", (symbol, anchor)).fetchone()
+            except sqlite3.OperationalError:
+                # Database written before the table existed
+                return None
+            finally:
+                conn.close()
+
     def log_alert(self, alert_data: dict):
+        """
+        Insert an alert, bump its hourly count and extend its pair's open episode
+        (or start one) in a single transaction. An optional 'peak' is the largest
+        value seen since the previous alert of the episode.
+        """
+        ts, symbol, alert_type, value = (alert_data['timestamp'], alert_data['symbol'],
+                                         alert_data['type'], alert_data['value'])
+        peak = alert_data.get('peak', value)
         with self._lock:
             conn = self._get_conn()
             try:
                 conn.execute(
                     "INSERT INTO alerts (timestamp, symbol, alert_type, message, value) VALUES (?, ?, ?, ?, ?)",
-                    (alert_data['timestamp'], alert_data['symbol'], 
-                     alert_data['type'], alert_data['message'], alert_data['value'])
+                    (ts, symbol, alert_type, alert_data['message'], value)
                 )
+                conn.execute("""
+                    INSERT INTO alert_counts VALUES (substr(?, 1, 13), ?, ?, 1)
+                    ON CONFLICT (hour, symbol, alert_type) DO UPDATE SET alerts = alerts + 1
+                """, (ts, symbol, alert_type))
+                cutoff = (datetime.fromisoformat(ts) - timedelta(seconds=ALERT_EPISODE_GAP_SECONDS)).isoformat()
+                episode = conn.execute("""
+                    SELECT id FROM alert_episodes WHERE symbol = ? AND alert_type = ? AND end_ts >= ?
+                    ORDER BY end_ts DESC LIMIT 1
+                """, (symbol, alert_type, cutoff)).fetchone()
+                if episode is None:
+                    conn.execute("INSERT INTO alert_episodes (symbol, alert_type, start_ts, end_ts, peak_value, alerts) "
+                                 "VALUES (?, ?, ?, ?, ?, 1)", (symbol, alert_type, ts, ts, peak))
+                else:
+                    conn.execute("""
+                        UPDATE alert_episodes SET end_ts = MAX(end_ts, ?), alerts = alerts + 1,
+                            peak_value = CASE WHEN ABS(?) > ABS(peak_value) THEN ? ELSE peak_value END
+                        WHERE id = ?
+                    """, (ts, peak, peak, episode[0]))
                 conn.commit()
             finally:
                 conn.close()
 
-    def get_latest_alerts(self, limit=50) -> pd.DataFrame:
-        query = "SELECT * FROM alerts ORDER BY timestamp DESC LIMIT ?"
+    def extend_alert_episode(self, symbol: str, alert_type: str, end_ts: str, peak: float):
+        """
+        Record a breach that outlasted the pair's last logged alert without logging another row.
+        """
         with self._lock:
             conn = self._get_conn()
             try:
-                df = pd.read_sql_query(query, conn, params=(limit,))
-                return df
+                conn.execute("""
+                    UPDATE alert_episodes SET end_ts = MAX(end_ts, ?),
+                        peak_value = CASE WHEN ABS(?) > ABS(peak_value) THEN ? ELSE peak_value END
+                    WHERE id = (SELECT id FROM alert_episodes WHERE symbol = ? AND alert_type = ?
+                                ORDER BY end_ts DESC LIMIT 1)
+                """, (end_ts, peak, peak, symbol, alert_type))
+                conn.commit()
             finally:
                 conn.close()
 
+    def _read_page(self, query: str, params: tuple) -> pd.DataFrame:
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                return pd.read_sql_query(query, conn, params=params)
+            except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+                # Read-only attach to a database written before the table existed
+                logging.warning(f"Alert query failed: {e}")
+                return pd.DataFrame()
+            finally:
+                conn.close()
+
+    def get_alerts_page(self, limit: int = 50, before: tuple = None, symbol: str = None) -> pd.DataFrame:
+        """
+        Alerts newest first, `limit` rows older than the keyset cursor `before`
+        = (timestamp, id) of the previous page's last row. Each page is an index
+        range scan, so its cost does not grow with the table.
+        """
+        where, params = [], []
+        if symbol:
+            where.append("symbol = ?")
+            params.append(symbol)
+        if before is not None:
+            where.append("(timestamp, id) < (?, ?)")
+            # ids read back through pandas are numpy ints, which sqlite3 would bind as blobs
+            params.extend((str(before[0]), int(before[1])))
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        query = f"SELECT * FROM alerts {clause} ORDER BY timestamp DESC, id DESC LIMIT ?"
+        return self._read_page(query, (*params, limit))
+
+    def get_latest_alerts(self, limit=50) -> pd.DataFrame:
+        return self.get_alerts_page(limit)
+
+    def get_alert_episodes(self, limit: int = 50, before: tuple = None) -> pd.DataFrame:
+        """
+        Episodes by most recent activity, keyset-paginated on (end_ts, id).
+        """
+        clause, params = "", ()
+        if before is not None:
+            clause, params = "WHERE (end_ts, id) < (?, ?)", (str(before[0]), int(before[1]))
+        query = f"SELECT * FROM alert_episodes {clause} ORDER BY end_ts DESC, id DESC LIMIT ?"
+        return self._read_page(query, (*params, limit))
+
+    def get_alert_summary(self, hours: int = 24) -> dict:
+        """
+        Alert counts per type, per pair and per hour over the last `hours` hours,
+        aggregated in SQL from the hourly rollup (at most hours x pairs x types rows).
+        """
+        since = (datetime.utcnow() - timedelta(hours=hours)).isoformat()[:13]
+        base = "FROM alert_counts WHERE hour >= ?"
+        return {
+            'by_type': self._read_page(f"SELECT alert_type, SUM(alerts) AS alerts {base} GROUP BY alert_type "
+                                       "ORDER BY alerts DESC", (since,)),
+            'by_pair': self._read_page(f"SELECT symbol, SUM(alerts) AS alerts {base} GROUP BY symbol "
+                                       "ORDER BY alerts DESC", (since,)),
+            'by_hour': self._read_page(f"SELECT hour, alert_type, SUM(alerts) AS alerts {base} "
+                                       "GROUP BY hour, alert_type ORDER BY hour", (since,)),
+        }
+
     def clear_db(self):
         """
         Clear all data from the database.
@@ -111,6 +756,16 @@ class DataStore:
             try:
                 conn.execute("DELETE FROM ticks")
                 conn.execute("DELETE FROM alerts")
+                conn.execute("DELETE FROM alert_counts")
+                conn.execute("DELETE FROM alert_episodes")
+                conn.execute("DELETE FROM bars")
+                conn.execute("DELETE FROM vwap_state")
+                conn.execute("DELETE FROM quotes")
+                if self.compact:
+                    conn.execute("DELETE FROM ticks_compact")
+                # Rowids restart from 1, so readers holding a fetch_since cursor need another signal
+                conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
                 conn.commit()
             except Exception as e:
                 logging.error(f"Error clearing DB: {e}")
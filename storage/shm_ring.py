@@ -0,0 +1,321 @@
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from storage.tick_buffer import TickDelta, empty_delta
+
+logger = logging.getLogger(__name__)
+
+TICK_DTYPE = np.dtype([('ts', 'i8'), ('price', 'f8'), ('size', 'f8')])
+BAR_DTYPE = np.dtype([('ts', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'),
+                      ('close', 'f8'), ('volume', 'f8')])
+
+MAGIC = 0x51414E5452494E47  # "QANTRING"
+# Header slots (int64): magic, instance id, capacity, record size, started, committed
+HEADER_SLOTS = 6
+_INSTANCE, _CAPACITY, _ITEMSIZE, _STARTED, _COMMITTED = 1, 2, 3, 4, 5
+
+# Segments created by this process; attaching to them must not touch the resource tracker
+_CREATED = set()
+
+
+class RingRead(NamedTuple):
+    records: np.ndarray
+    start_seq: int
+    next_seq: int
+
+
+class RingColumns(NamedTuple):
+    columns: Dict[str, np.ndarray]
+    start_seq: int
+    next_seq: int
+
+
+class ShmRing:
+    """
+    Single-writer, multi-reader ring of fixed-size records in shared memory.
+
+    The writer bumps `started` before overwriting slots and `committed` after,
+    so a reader can tell which records it copied may have been overwritten
+    meanwhile: anything older than started_after_copy - capacity is dropped.
+    No locks are taken; readers never block the writer. This relies on stores
+    becoming visible in program order, which holds on x86-64.
+    """
+    def __init__(self, name: str, dtype: np.dtype, capacity: int = None, create: bool = False):
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        header_bytes = HEADER_SLOTS * 8
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=header_bytes + capacity * self.dtype.itemsize)
+            _CREATED.add(name)
+            self.header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=self.shm.buf)
+            self.header[:] = [MAGIC, int.from_bytes(os.urandom(7), 'little'), capacity, self.dtype.itemsize, 0, 0]
+        else:
+            if sys.version_info >= (3, 13):
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            else:
+                self.shm = shared_memory.SharedMemory(name=name)
+                if name not in _CREATED:
+                    # Attaching registers the segment with this process's resource tracker,
+                    # which would unlink the writer's segment when the reader exits.
+                    resource_tracker.unregister(self.shm._name, "shared_memory")
+            self.header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=self.shm.buf)
+            if self.header[0] != MAGIC or self.header[_ITEMSIZE] != self.dtype.itemsize:
+                self.shm.close()
+                raise ValueError(f"Shared memory segment {name} is not a ring of {self.dtype}")
+            capacity = int(self.header[_CAPACITY])
+        self.capacity = capacity
+        self.instance = int(self.header[_INSTANCE])
+        self.records = np.ndarray(capacity, dtype=self.dtype, buffer=self.shm.buf, offset=header_bytes)
+
+    @property
+    def committed(self) -> int:
+        return int(self.header[_COMMITTED])
+
+    def append(self, records: np.ndarray):
+        """
+        Writer only. Append a batch; only the newest `capacity` records are kept.
+        """
+        n = len(records)
+        if n == 0:
+            return
+        seq = int(self.header[_COMMITTED])
+        if n > self.capacity:
+            records = records[-self.capacity:]
+            seq += n - self.capacity
+            n = self.capacity
+        end = seq + n
+        self.header[_STARTED] = end
+        pos = seq % self.capacity
+        first = min(n, self.capacity - pos)
+        self.records[pos:pos + first] = records[:first]
+        if first < n:
+            self.records[:n - first] = records[first:]
+        self.header[_COMMITTED] = end
+
+    def _span(self, since: Optional[int], last_n: Optional[int]):
+        committed = int(self.header[_COMMITTED])
+        start = max(committed - self.capacity, 0)
+        if since is not None:
+            start = max(start, since)
+        if last_n is not None:
+            start = max(start, committed - last_n)
+        return start, committed
+
+    def _slices(self, start: int, end: int) -> list:
+        if end <= start:
+            return []
+        a, b = start % self.capacity, end % self.capacity
+        if a < b or b == 0:
+            return [self.records[a:b or self.capacity]]
+        return [self.records[a:], self.records[:b]]
+
+    def view(self, last_n: int = None, since: int = None):
+        """
+        Zero-copy views of recent records (two when they wrap) and their first sequence
+        number. Check intact(start_seq) after using them.
+        """
+        start, end = self._span(since, last_n)
+        return self._slices(start, end), start
+
+    def intact(self, start_seq: int) -> bool:
+        """
+        True if no record from start_seq onwards has been overwritten since it was viewed.
+        """
+        return start_seq >= int(self.header[_STARTED]) - self.capacity
+
+    def seek(self, field: str, value) -> int:
+        """
+        Sequence number of the first record whose `field` is >= value, for a field that
+        increases with the sequence (e.g. timestamps). Searches the live views without copying.
+        """
+        parts, seq = self.view()
+        for part in parts:
+            i = int(np.searchsorted(part[field], value))
+            if i < len(part):
+                return seq + i
+            seq += len(part)
+        return seq
+
+    def read(self, since: int = None, last_n: int = None) -> RingRead:
+        """
+        Copy of records with sequence number >= since (or the last `last_n`), minus any
+        the writer overwrote during the copy. A gap between `since` and start_seq means
+        the reader fell more than a ring behind.
+        """
+        start, end = self._span(since, last_n)
+        parts = self._slices(start, end)
+        out = np.concatenate(parts) if len(parts) > 1 else (parts[0].copy() if parts else np.empty(0, self.dtype))
+        safe = int(self.header[_STARTED]) - self.capacity
+        if safe > start:
+            out = out[safe - start:]
+            start = safe
+        return RingRead(out, start, end)
+
+    def columns(self, since: int = None, last_n: int = None) -> RingColumns:
+        """
+        Like read(), but each field is copied once from the live views into its own
+        contiguous array, instead of copying whole records and slicing fields from them.
+        """
+        start, end = self._span(since, last_n)
+        parts = self._slices(start, end)
+        columns = {field: np.concatenate([part[field] for part in parts]) if parts else np.empty(0, self.dtype[field])
+                   for field in self.dtype.names}
+        if not self.intact(start):
+            safe = int(self.header[_STARTED]) - self.capacity
+            columns = {field: values[safe - start:] for field, values in columns.items()}
+            start = safe
+        return RingColumns(columns, start, end)
+
+    def close(self):
+        self.records = None
+        self.header = None
+        self.shm.close()
+
+    def unlink(self):
+        _CREATED.discard(self.name)
+        self.shm.unlink()
+
+
+class SharedMarketData:
+    """
+    Recent ticks per symbol and closed bars per (symbol, timeframe) in shared-memory rings.
+
+    The ingestion daemon publishes; dashboard processes attach as readers and get
+    DataStore-style get_ticks/get_tick_arrays/get_bars without SQL. Readers attach
+    lazily and re-attach when the writer was restarted.
+    """
+    REATTACH_SECONDS = 1.0
+
+    def __init__(self, prefix: str = "qa", create: bool = False, tick_capacity: int = 1 << 20,
+                 bar_capacity: int = 1 << 14):
+        self.prefix = prefix
+        self.create = create
+        self.tick_capacity = tick_capacity
+        self.bar_capacity = bar_capacity
+        self._rings: Dict[str, ShmRing] = {}
+        self._checked: Dict[str, float] = {}
+
+    def _name(self, symbol: str, timeframe: str = None) -> str:
+        return f"{self.prefix}_b_{symbol}_{timeframe}" if timeframe else f"{self.prefix}_t_{symbol}"
+
+    def _ring(self, name: str, dtype: np.dtype, capacity: int) -> Optional[ShmRing]:
+        ring = self._rings.get(name)
+        if self.create:
+            if ring is None:
+                try:
+                    ring = ShmRing(name, dtype, capacity, create=True)
+                except FileExistsError:
+                    # Left behind by a writer that was killed; take it over
+                    stale = shared_memory.SharedMemory(name=name)
+                    stale.close()
+                    stale.unlink()
+                    ring = ShmRing(name, dtype, capacity, create=True)
+                self._rings[name] = ring
+            return ring
+
+        now = time.monotonic()
+        if ring is not None and now - self._checked.get(name, 0.0) < self.REATTACH_SECONDS:
+            return ring
+        self._checked[name] = now
+        try:
+            fresh = ShmRing(name, dtype)
+        except (FileNotFoundError, ValueError):
+            return ring
+        if ring is not None and ring.instance == fresh.instance:
+            fresh.close()
+            return ring
+        if ring is not None:
+            logger.info(f"Re-attached to restarted ring {name}")
+            ring.close()
+        self._rings[name] = fresh
+        return fresh
+
+    # Writer side
+
+    def publish_ticks(self, symbol: str, ts_ns: np.ndarray, price: np.ndarray, size: np.ndarray):
+        records = np.empty(len(ts_ns), dtype=TICK_DTYPE)
+        records['ts'] = ts_ns
+        records['price'] = price
+        records['size'] = size
+        self._ring(self._name(symbol), TICK_DTYPE, self.tick_capacity).append(records)
+
+    def publish_bars(self, symbol: str, timeframe: str, bars: pd.DataFrame):
+        records = np.empty(len(bars), dtype=BAR_DTYPE)
+        records['ts'] = bars.index.values.astype('datetime64[ns]').astype(np.int64)
+        for col in ('open', 'high', 'low', 'close', 'volume'):
+            records[col] = bars[col].to_numpy()
+        self._ring(self._name(symbol, timeframe), BAR_DTYPE, self.bar_capacity).append(records)
+
+    # Reader side
+
+    def get_tick_arrays(self, symbol: str, lookback_minutes: int = 60):
+        """
+        (int64 ns timestamps, price, size) for the last N minutes, like DataStore.get_tick_arrays.
+        The arrays are contiguous copies, so they stay valid after the writer laps the ring.
+        """
+        ring = self._ring(self._name(symbol), TICK_DTYPE, self.tick_capacity)
+        if ring is None:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        columns = self._tick_window(ring, lookback_minutes).columns
+        return columns['ts'], columns['price'], columns['size']
+
+    @staticmethod
+    def _tick_window(ring: ShmRing, lookback_minutes: int, now_ns: int = None) -> RingColumns:
+        now = datetime.utcnow() if now_ns is None else datetime(1970, 1, 1) + timedelta(microseconds=now_ns // 1000)
+        start_ns = np.datetime64(now - timedelta(minutes=lookback_minutes), 'ns').astype(np.int64)
+        # Ticks arrive in time order per symbol, so only the lookback window is copied
+        return ring.columns(since=ring.seek('ts', start_ns))
+
+    def fetch_since(self, symbol: str, cursor: tuple = None, lookback_minutes: int = 60,
+                    price_source: str = 'trade', now_ns: int = None) -> TickDelta:
+        """
+        Ticks published after `cursor` ((ring instance, sequence number) from the previous
+        call), like DataStore.fetch_since. A restarted writer, or a reader that fell a
+        whole ring behind, gets the lookback window (ending at now_ns, default now) with
+        reset=True. The rings carry trades only, so quote price sources come back empty.
+        """
+        if price_source != 'trade':
+            return empty_delta(cursor, reset=cursor is None)
+        ring = self._ring(self._name(symbol), TICK_DTYPE, self.tick_capacity)
+        if ring is None:
+            return empty_delta(cursor, reset=cursor is None)
+        stale = cursor is None or cursor[0] != ring.instance or cursor[1] > ring.committed
+        read = None if stale else ring.columns(since=cursor[1])
+        reset = read is None or read.start_seq > cursor[1]
+        if reset:
+            read = self._tick_window(ring, lookback_minutes, now_ns)
+        columns = read.columns
+        return TickDelta(columns['ts'], columns['price'], columns['size'], (ring.instance, read.next_seq), reset)
+
+    def get_ticks(self, symbol: str, lookback_minutes: int = 60) -> pd.DataFrame:
+        ts, price, size = self.get_tick_arrays(symbol, lookback_minutes)
+        if not len(ts):
+            return pd.DataFrame(columns=['price', 'size'])
+        return pd.DataFrame({'price': price, 'size': size},
+                            index=pd.DatetimeIndex(ts.astype('datetime64[ns]'), name='ts'))
+
+    def get_bars(self, symbol: str, timeframe: str, last_n: int = None) -> pd.DataFrame:
+        ring = self._ring(self._name(symbol, timeframe), BAR_DTYPE, self.bar_capacity)
+        if ring is None:
+            return pd.DataFrame()
+        columns = ring.columns(last_n=last_n).columns
+        df = pd.DataFrame({col: columns[col] for col in ('open', 'high', 'low', 'close', 'volume')},
+                          index=pd.DatetimeIndex(columns['ts'].astype('datetime64[ns]'), name='ts'))
+        # A partial bar published on shutdown can be followed by its completed version
+        return df[~df.index.duplicated(keep='last')]
+
+    def close(self):
+        for ring in self._rings.values():
+            ring.close()
+            if self.create:
+                ring.unlink()
+        self._rings.clear()
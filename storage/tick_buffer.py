@@ -0,0 +1,188 @@
+import threading
+import time
+from typing import Any, Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+# What a tick buffer's price is: traded prices, or the top-of-book mid / microprice
+PRICE_SOURCES = ('trade', 'mid', 'micro')
+
+
+def quote_price(source: str, bid: np.ndarray, bid_qty: np.ndarray, ask: np.ndarray, ask_qty: np.ndarray) -> np.ndarray:
+    """
+    Mid, or the microprice (bid * ask_qty + ask * bid_qty) / (bid_qty + ask_qty), which
+    leans towards the side with less size; an empty book falls back to the mid.
+    """
+    mid = (bid + ask) / 2.0
+    if source == 'mid':
+        return mid
+    if source != 'micro':
+        raise ValueError(f"Unknown quote price source {source!r}")
+    depth = bid_qty + ask_qty
+    with np.errstate(divide='ignore', invalid='ignore'):
+        micro = (bid * ask_qty + ask * bid_qty) / depth
+    return np.where(depth > 0, micro, mid)
+
+
+class TickDelta(NamedTuple):
+    """
+    Result of fetch_since: ticks in time order within the delta, the cursor to pass
+    next time, and whether the rows are a whole lookback window (first call, or the
+    source was reset) rather than an increment.
+    """
+    ts: np.ndarray
+    price: np.ndarray
+    size: np.ndarray
+    cursor: Any
+    reset: bool
+
+
+def empty_delta(cursor=None, reset: bool = True) -> TickDelta:
+    return TickDelta(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), cursor, reset)
+
+
+class TickBuffer:
+    """
+    The last `lookback_minutes` of one symbol's ticks (or quote prices, see
+    PRICE_SOURCES), kept current with fetch_since.
+
+    Each refresh() reads only the ticks stored since the previous one, appends them
+    and trims what fell out of the lookback, so a refresh reads a few rows instead
+    of the whole window. Arrays only grow at the end and are reallocated (never
+    shifted in place) when full, so views handed out stay valid. A source without
+    fetch_since is re-read whole on every refresh. `clock` (ns since the epoch,
+    default wall time) places the window, e.g. at simulated time in a replay.
+    """
+    MIN_CAPACITY = 1024
+
+    def __init__(self, source, symbol: str, lookback_minutes: int = 10, price_source: str = 'trade',
+                 clock: Callable[[], int] = None):
+        if price_source not in PRICE_SOURCES:
+            raise ValueError(f"Unknown price source {price_source!r}")
+        self.source = source
+        self.symbol = symbol
+        self.lookback_minutes = lookback_minutes
+        self.price_source = price_source
+        self.clock = clock or time.time_ns
+        self._lock = threading.Lock()
+        self._ts = np.empty(0, dtype=np.int64)
+        self._price = np.empty(0)
+        self._size = np.empty(0)
+        self._start = 0
+        self._end = 0
+        self.cursor = None
+        self._last_refresh = None
+        self.refreshes = 0
+        self.resets = 0
+        self.rows_read = 0
+        self.last_rows = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def nbytes(self) -> int:
+        return self._ts.nbytes + self._price.nbytes + self._size.nbytes
+
+    def stale(self, now_ns: int = None) -> bool:
+        """
+        Unused for longer than the lookback: the next refresh re-reads the whole
+        window anyway, so the buffer can be dropped.
+        """
+        now_ns = self.clock() if now_ns is None else now_ns
+        return self._last_refresh is None or now_ns - self._last_refresh > self.lookback_minutes * 60e9
+
+    def refresh(self) -> int:
+        """
+        Pull new ticks from the source; returns the number of rows read.
+        """
+        with self._lock:
+            now = self.clock()
+            # After a long pause the delta would exceed the window; re-read the window instead
+            if self.stale(now):
+                self.cursor = None
+            if self.price_source != 'trade':
+                delta = self.source.fetch_since(self.symbol, self.cursor, self.lookback_minutes, self.price_source,
+                                                now_ns=now)
+            elif hasattr(self.source, 'fetch_since'):
+                delta = self.source.fetch_since(self.symbol, self.cursor, self.lookback_minutes, now_ns=now)
+            else:
+                delta = TickDelta(*self.source.get_tick_arrays(self.symbol, self.lookback_minutes), None, True)
+            self._last_refresh = now
+            if delta.reset:
+                self.resets += 1
+                self._replace(delta.ts, delta.price, delta.size)
+            else:
+                self._append(delta.ts, delta.price, delta.size)
+            self.cursor = delta.cursor
+            self._trim(now)
+            self.refreshes += 1
+            self.last_rows = len(delta.ts)
+            self.rows_read += self.last_rows
+            return self.last_rows
+
+    def arrays(self):
+        """
+        (int64 ns timestamps, price, size) of the window, like DataStore.get_tick_arrays.
+        """
+        with self._lock:
+            window = slice(self._start, self._end)
+            return self._ts[window], self._price[window], self._size[window]
+
+    def frame(self) -> pd.DataFrame:
+        """
+        The window as a DataFrame, like DataStore.get_ticks.
+        """
+        ts, price, size = self.arrays()
+        if not len(ts):
+            return pd.DataFrame(columns=['price', 'size'])
+        return pd.DataFrame({'price': price, 'size': size},
+                            index=pd.DatetimeIndex(ts.astype('datetime64[ns]'), name='ts'))
+
+    def _replace(self, ts, price, size):
+        capacity = max(self.MIN_CAPACITY, 2 * len(ts))
+        self._ts = np.empty(capacity, dtype=np.int64)
+        self._price = np.empty(capacity)
+        self._size = np.empty(capacity)
+        self._start, self._end = 0, len(ts)
+        self._ts[:self._end] = ts
+        self._price[:self._end] = price
+        self._size[:self._end] = size
+
+    def _append(self, ts, price, size):
+        n = len(ts)
+        if not n:
+            return
+        window = slice(self._start, self._end)
+        late = self._end > self._start and ts.min() < self._ts[self._end - 1]
+        if late or np.any(np.diff(ts) < 0):
+            # A late tick: merge in time order (rare, so a full re-sort is fine)
+            all_ts = np.concatenate([self._ts[window], ts])
+            order = np.argsort(all_ts, kind='stable')
+            self._replace(all_ts[order], np.concatenate([self._price[window], price])[order],
+                          np.concatenate([self._size[window], size])[order])
+            return
+        if self._end + n > len(self._ts):
+            self._reallocate(max(self.MIN_CAPACITY, 2 * (len(self) + n)))
+        self._ts[self._end:self._end + n] = ts
+        self._price[self._end:self._end + n] = price
+        self._size[self._end:self._end + n] = size
+        self._end += n
+
+    def _reallocate(self, capacity: int):
+        live = slice(self._start, self._end)
+        ts, price, size = self._ts[live], self._price[live], self._size[live]
+        self._ts = np.empty(capacity, dtype=np.int64)
+        self._price = np.empty(capacity)
+        self._size = np.empty(capacity)
+        self._end -= self._start
+        self._start = 0
+        self._ts[:self._end] = ts
+        self._price[:self._end] = price
+        self._size[:self._end] = size
+
+    def _trim(self, now_ns: int):
+        start_ns = now_ns - self.lookback_minutes * 60_000_000_000
+        self._start += int(np.searchsorted(self._ts[self._start:self._end], start_ns, side='left'))
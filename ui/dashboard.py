@@ -1,7 +1,9 @@
+import os
 import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
+import numpy as np
 import ui.styles as styles
 
 class Dashboard:
@@ -117,7 +119,7 @@ class Dashboard:
         st.plotly_chart(fig, use_container_width=True, key=f"price_chart_combined")
 
     @staticmethod
-    def render_spread_and_zscore(spread: pd.Series, zscore: pd.Series, z_thresh: float):
+    def render_spread_and_zscore(spread: pd.Series, zscore: pd.Series, z_thresh: float, key: str = "spread_chart"):
         if spread.empty and zscore.empty:
             st.info("Insufficient data for spread/z-score.")
             return
@@ -162,7 +164,7 @@ class Dashboard:
             fig.add_hline(y=0, line_dash="dot", line_color="gray", row=2, col=1)
 
         fig.update_layout(height=400, margin=dict(l=0, r=0, t=20, b=0), template="plotly_dark", showlegend=False, uirevision='constant', transition={'duration': 0})
-        st.plotly_chart(fig, use_container_width=True, key="spread_chart")
+        st.plotly_chart(fig, use_container_width=True, key=key)
 
     @staticmethod
     def render_correlation(rolling_corr: pd.Series):
@@ -176,6 +178,27 @@ class Dashboard:
         fig.update_layout(title="Rolling Correlation", height=250, margin=dict(l=0, r=0, t=30, b=0), template="plotly_dark", yaxis_range=[-1.1, 1.1], uirevision='constant', transition={'duration': 0})
         st.plotly_chart(fig, use_container_width=True, key="corr_chart")
 
+    @staticmethod
+    def render_correlation_matrix(corr: pd.DataFrame, stats: dict, bars: int):
+        """
+        Clustered correlation heatmap of a symbol universe with eigenvalue regime stats.
+        """
+        if corr.empty or bars < 2:
+            st.info("Not enough closed bars for the correlation matrix yet.")
+            return
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Mean correlation", f"{stats['mean_corr']:.2f}")
+        c2.metric("Top eigenvalue share", f"{stats['top_share']:.0%}")
+        c3.metric("Effective rank", f"{stats['effective_rank']:.1f}")
+        c4.metric("Factors above noise", stats['n_signal'])
+        fig = go.Figure(go.Heatmap(z=corr.to_numpy(), x=corr.columns, y=corr.index, zmin=-1, zmax=1,
+                                   colorscale='RdBu', reversescale=True))
+        size = min(900, 250 + 12 * len(corr))
+        fig.update_layout(height=size, margin=dict(l=0, r=0, t=30, b=0), template="plotly_dark",
+                          title=f"EWM correlation ({bars} bars)", yaxis_autorange='reversed',
+                          uirevision='constant')
+        st.plotly_chart(fig, use_container_width=True, key="corr_matrix_chart")
+
     @staticmethod
     def render_stats_grid(stats: dict):
         """
@@ -277,6 +300,172 @@ class Dashboard:
             </div>
             """, unsafe_allow_html=True)
 
+    @staticmethod
+    def render_vwap(df: pd.DataFrame, vwap: pd.DataFrame, symbol: str):
+        """
+        Candles of one symbol with its session VWAP and standard-deviation bands.
+        """
+        fig = go.Figure()
+        if not df.empty:
+            fig.add_trace(go.Candlestick(x=df.index, open=df['open'], high=df['high'], low=df['low'],
+                                         close=df['close'], name=symbol))
+        bands = sorted({float(c.split('_', 1)[1]) for c in vwap.columns if c.startswith('upper_')}, reverse=True)
+        for k in bands:
+            fig.add_trace(go.Scatter(x=vwap.index, y=vwap[f'upper_{k:g}'], mode='lines',
+                                     line=dict(width=1, dash='dot', color='gray'), name=f'+{k:g}σ'))
+            fig.add_trace(go.Scatter(x=vwap.index, y=vwap[f'lower_{k:g}'], mode='lines',
+                                     line=dict(width=1, dash='dot', color='gray'), name=f'-{k:g}σ',
+                                     fill='tonexty', fillcolor='rgba(128,128,128,0.08)'))
+        fig.add_trace(go.Scatter(x=vwap.index, y=vwap['vwap'], mode='lines',
+                                 line=dict(width=2, color='orange'), name='VWAP'))
+        fig.update_layout(
+            height=450,
+            margin=dict(l=0, r=0, t=30, b=0),
+            template="plotly_dark",
+            uirevision='constant',
+            title_text=f"{symbol} session VWAP"
+        )
+        fig.update_xaxes(rangeslider_visible=False)
+        st.plotly_chart(fig, use_container_width=True, key="vwap_chart")
+
+    @staticmethod
+    def render_mean_reversion(half_life: float, hurst: float, vr: float, vr_z: float):
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Half-life (bars)", f"{half_life:,.1f}" if np.isfinite(half_life) else "∞" if half_life > 0 else "—")
+        c2.metric("Hurst exponent", f"{hurst:.3f}" if np.isfinite(hurst) else "—")
+        c3.metric("Variance ratio", f"{vr:.3f}" if np.isfinite(vr) else "—",
+                  f"z {vr_z:+.2f}" if np.isfinite(vr_z) else None, delta_color="off")
+
+    @staticmethod
+    def render_mean_reversion_screen(table: pd.DataFrame):
+        """
+        Per-pair mean-reversion diagnostics, most mean-reverting (lowest Hurst) first.
+        """
+        if table.empty:
+            st.info("Not enough overlapping bars to screen the pairs.")
+            return
+        st.dataframe(table.sort_values('hurst').style.format("{:.3f}", na_rep="—"), use_container_width=True)
+
+    @staticmethod
+    def render_volatility(tables: dict):
+        """
+        Annualized volatility estimators (rows) by window (columns), one table per symbol.
+        """
+        cols = st.columns(len(tables))
+        for col, (symbol, table) in zip(cols, tables.items()):
+            with col:
+                st.markdown(f"**{symbol}**")
+                st.dataframe(table.style.format("{:.1%}", na_rep="—"), use_container_width=True)
+
+    @staticmethod
+    def render_pair_grid(rows: list, z_thresh: float):
+        """
+        Compact grid of many pairs' current z-score and correlation.
+        """
+        if not rows:
+            st.info("No pairs configured.")
+            return
+        st.markdown(styles.get_pair_grid_html(rows, z_thresh), unsafe_allow_html=True)
+
+    @staticmethod
+    def render_profile(profile, paths=None, top_n: int = 15):
+        """
+        Result of a sampling profiler capture (diagnostics.sampling_profiler.Profile).
+        """
+        st.caption(f"{profile.samples} samples over {profile.seconds:.1f}s")
+        threads = profile.threads()
+        thread = st.selectbox("Thread", ["All"] + list(threads.index), key="profile_thread")
+        st.dataframe(profile.top(top_n, None if thread == "All" else thread).round(1), use_container_width=True)
+        st.download_button("Collapsed stacks", profile.collapsed(),
+                           file_name=os.path.basename(paths[0]) if paths else "profile.collapsed")
+        if paths:
+            st.caption(f"Saved to {paths[0]}")
+
+    @staticmethod
+    def render_memory(report: pd.DataFrame, budget_bytes: int = None):
+        """
+        Bytes per component (diagnostics.memory.MemoryTracker.report()), in MB.
+        """
+        rss = report.loc['rss', 'bytes']
+        st.caption(f"RSS {rss / 1e6:.0f} MB"
+                   + (f" of a {budget_bytes / 1e6:.0f} MB budget" if budget_bytes else ", no budget set (MEMORY_BUDGET_MB)"))
+        table = report.assign(MB=report['bytes'] / 1e6)[['MB', 'evictable']]
+        st.dataframe(table.round(2), use_container_width=True)
+
+    @staticmethod
+    def render_cache_stats(stats: dict):
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
+            st.markdown(styles.get_metric_card_html("Bar Cache Hit Rate", f"{stats['hit_rate']:.0%}"), unsafe_allow_html=True)
+        with c2:
+            st.markdown(styles.get_metric_card_html("Tick Reads / Lookups", f"{stats['tick_reads']} / {stats['hits'] + stats['misses']}"), unsafe_allow_html=True)
+        with c3:
+            st.markdown(styles.get_metric_card_html("Rows / Tick Read", f"{stats['rows_per_read']:.0f} of {stats['window_rows']:.0f}"), unsafe_allow_html=True)
+        with c4:
+            st.markdown(styles.get_metric_card_html("Time Saved", f"{stats['time_saved_s']:.2f}s"), unsafe_allow_html=True)
+
+    @staticmethod
+    def render_sweep_heatmap(results: pd.DataFrame, metric: str = "sharpe"):
+        """
+        Heatmap of a sweep metric over window x entry threshold.
+        Other dimensions (timeframe, hedge method) are reduced to their best value.
+        """
+        if results.empty:
+            st.info("No sweep results yet.")
+            return
+
+        grid = results.pivot_table(index="entry_z", columns="window", values=metric, aggfunc="max")
+        fig = go.Figure(go.Heatmap(
+            z=grid.values,
+            x=grid.columns,
+            y=grid.index,
+            colorscale="RdYlGn",
+            colorbar=dict(title=metric),
+        ))
+        fig.update_layout(
+            title=f"{metric} by Window / Z-Threshold",
+            xaxis_title="Rolling Window",
+            yaxis_title="Z-Score Threshold",
+            height=450, margin=dict(l=0, r=0, t=30, b=0), template="plotly_dark"
+        )
+        st.plotly_chart(fig, use_container_width=True, key="sweep_heatmap")
+
+    @staticmethod
+    def render_alert_summary(summary: dict):
+        """
+        Alert counts over the summary window: per type, per pair and per hour.
+        """
+        by_type, by_pair, by_hour = summary['by_type'], summary['by_pair'], summary['by_hour']
+        if by_type.empty:
+            st.write("No alerts in the last 24 hours.")
+            return
+        cols = st.columns(len(by_type) + 1)
+        cols[0].metric("Alerts (24h)", f"{int(by_type['alerts'].sum()):,}")
+        for col, row in zip(cols[1:], by_type.itertuples()):
+            col.metric(row.alert_type, f"{int(row.alerts):,}")
+
+        c1, c2 = st.columns([1, 2])
+        with c1:
+            st.dataframe(by_pair.set_index('symbol'), use_container_width=True)
+        with c2:
+            fig = go.Figure()
+            for alert_type, group in by_hour.groupby('alert_type'):
+                fig.add_trace(go.Bar(x=pd.to_datetime(group['hour']), y=group['alerts'], name=alert_type))
+            fig.update_layout(barmode='stack', height=250, margin=dict(l=0, r=0, t=30, b=0),
+                              template="plotly_dark", title="Alerts per hour", uirevision='constant')
+            st.plotly_chart(fig, use_container_width=True, key="alerts_per_hour")
+
+    @staticmethod
+    def render_alert_episodes(episodes: pd.DataFrame):
+        if episodes.empty:
+            st.write("No alert episodes.")
+            return
+        df = episodes.rename(columns={'symbol': 'pair', 'alert_type': 'type', 'start_ts': 'start',
+                                      'end_ts': 'end', 'peak_value': 'peak'})
+        df['duration'] = pd.to_datetime(df['end']) - pd.to_datetime(df['start'])
+        st.dataframe(df[['pair', 'type', 'start', 'end', 'duration', 'peak', 'alerts']],
+                     use_container_width=True, hide_index=True)
+
     @staticmethod
     def render_alerts(alerts_df: pd.DataFrame):
         if alerts_df.empty:
@@ -285,7 +474,7 @@ class Dashboard:
             st.dataframe(alerts_df)
 
     @staticmethod
-    def render_ai_chat(commentary: str, assistant):
+    def render_ai_commentary(commentary: str, pending: bool = False):
         st.markdown("""
         <style>
         .ai-header {
@@ -306,7 +495,9 @@ class Dashboard:
         }
         </style>
         """, unsafe_allow_html=True)
-        
+
+        if pending:
+            commentary = "Analyzing..."
         if commentary:
             st.markdown(f"""
             <div class="ai-header">
@@ -317,5 +508,11 @@ class Dashboard:
             </div>
             """, unsafe_allow_html=True)
 
-        question = st.chat_input("Ask about the market...")
-        return question
+    @staticmethod
+    def render_ai_history(history: list):
+        """
+        Render (question, answer) pairs; answer None means the reply is still pending.
+        """
+        for question, answer in history:
+            st.markdown(f"**You:** {question}")
+            st.markdown(f"**Analyst:** {answer if answer is not None else '_Thinking..._'}")
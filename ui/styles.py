@@ -143,3 +143,33 @@ def get_signal_html(signal_type, signal_text, description=""):
         <div style="font-size: 1rem; margin-top: 5px;">{description}</div>
     </div>
     """
+
+def get_pair_grid_html(rows, z_thresh):
+    """
+    Generates HTML for a compact grid of pair tiles.
+    rows: iterable of dicts with pair, z_score, correlation, hedge_ratio.
+    """
+    tiles = []
+    for row in rows:
+        z = row['z_score']
+        if z > z_thresh:
+            color, signal = "#ff5252", "SELL"
+        elif z < -z_thresh:
+            color, signal = "#00e676", "BUY"
+        else:
+            color, signal = "#90a4ae", "HOLD"
+        tiles.append(f"""
+        <div style="background: #1e1e1e; border-left: 4px solid {color}; border-radius: 6px; padding: 10px 14px;">
+            <div style="font-size: 0.8rem; color: #90a4ae; letter-spacing: 0.5px;">{row['pair']}</div>
+            <div style="display: flex; justify-content: space-between; align-items: baseline;">
+                <span style="font-size: 1.5rem; font-weight: 700; font-family: 'Courier New', monospace; color: {color};">{z:+.2f}</span>
+                <span style="font-weight: 900; color: {color}; letter-spacing: 1px;">{signal}</span>
+            </div>
+            <div style="font-size: 0.8rem; color: #e0e0e0;">corr {row['correlation']:.2f} &middot; hedge {row['hedge_ratio']:.4f}</div>
+        </div>
+        """)
+    return f"""
+    <div style="display: grid; grid-template-columns: repeat(auto-fill, minmax(220px, 1fr)); gap: 10px; margin: 10px 0;">
+        {''.join(tiles)}
+    </div>
+    """